@@ -0,0 +1,64 @@
+"""
+Бенчмарк проверки стандартов для архива репозитория тестов
+
+Собирает tar.gz из синтетических файлов тест-кейсов и прогоняет
+iter_archive_scan с разным числом процессов. Запуск из директории backend:
+    python -m benchmarks.bench_archive_scan
+    python -m benchmarks.bench_archive_scan --files 8000 --workers 0 2 4
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import tarfile
+import time
+
+from benchmarks.bench_duplicates import make_test_case
+from services import standards_scan
+from services.standards_checker import StandardsChecker
+
+
+def make_archive(files: int, seed: int = 1) -> bytes:
+    """tar.gz с файлами test_<n>.py по несколько тест-кейсов в каждом"""
+    rng = random.Random(seed)
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for index in range(files):
+            cases = [make_test_case(rng, index * 10 + i).replace("\n", "\n    ") for i in range(rng.randint(1, 8))]
+            source = "import allure\n\n\nclass TestSuite:\n    " + "\n\n    ".join(cases) + "\n"
+            data = source.encode("utf-8")
+            info = tarfile.TarInfo(f"tests/module_{index % 50}/test_{index}.py")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+async def scan(data: bytes) -> int:
+    count = 0
+    async for event in standards_scan.iter_archive_scan(StandardsChecker.static_only(), io.BytesIO(data)):
+        count += "result" in event
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=8000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, os.cpu_count() or 1])
+    args = parser.parse_args()
+
+    data = make_archive(args.files)
+    print(f"archive: {args.files} files, {len(data) / 1e6:.1f} MB compressed")
+    print(f"{'workers':>8} {'files':>7} {'time, s':>8} {'files/s':>9}")
+    for workers in args.workers:
+        os.environ["STANDARDS_SCAN_WORKERS"] = str(workers)
+        standards_scan.shutdown_scan_pool()
+        started = time.perf_counter()
+        count = asyncio.run(scan(data))
+        elapsed = time.perf_counter() - started
+        print(f"{workers:>8} {count:>7} {elapsed:>8.2f} {count / elapsed:>9.0f}")
+    standards_scan.shutdown_scan_pool()
+
+
+if __name__ == "__main__":
+    main()
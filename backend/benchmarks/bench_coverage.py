@@ -0,0 +1,54 @@
+"""
+Бенчмарк матрицы покрытия требований тест-кейсами
+
+Запуск из директории backend:
+    python -m benchmarks.bench_coverage
+    python -m benchmarks.bench_coverage --requirements 5000 --tests 50000
+"""
+import argparse
+import random
+import time
+
+from benchmarks.bench_duplicates import ACTIONS, ENTITIES, make_suite
+from services.coverage_engine import CoverageEngine, split_requirements
+
+
+UNCOVERED = ["export", "archive", "notify", "audit", "billing", "webhook", "quota", "backup"]
+
+
+def make_requirements(size: int, uncovered_ratio: float = 0.1, seed: int = 2) -> str:
+    """Текст требований из `size` пунктов; часть пунктов не покрыта набором make_suite"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(size):
+        if rng.random() < uncovered_ratio:
+            items.append(f"- Система поддерживает {rng.choice(UNCOVERED)} {rng.choice(UNCOVERED)} {i}")
+        else:
+            items.append(
+                f"- Пользователь может {rng.choice(ACTIONS)} {rng.choice(ENTITIES)} "
+                f"и {rng.choice(ACTIONS)} {rng.choice(ENTITIES)} {i}"
+            )
+    return "\n".join(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requirements", type=int, default=5_000)
+    parser.add_argument("--tests", type=int, default=50_000)
+    parser.add_argument("--features", type=int, default=512)
+    args = parser.parse_args()
+
+    items = split_requirements(make_requirements(args.requirements))
+    suite = make_suite(args.tests)
+
+    started = time.perf_counter()
+    result = CoverageEngine(n_features=args.features).analyze(items, suite)
+    elapsed = time.perf_counter() - started
+
+    print(f"requirements: {len(items)}, tests: {len(suite)}, features: {args.features}")
+    print(f"time: {elapsed:.2f} s, coverage: {result['coverage_percentage']}%, "
+          f"orphan tests: {len(result['orphan_tests'])}")
+
+
+if __name__ == "__main__":
+    main()
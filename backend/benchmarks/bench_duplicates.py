@@ -0,0 +1,69 @@
+"""
+Бенчмарк локального поиска почти-дубликатов на синтетических наборах тест-кейсов
+
+Запуск из директории backend:
+    python -m benchmarks.bench_duplicates
+    python -m benchmarks.bench_duplicates --sizes 1000 10000 50000
+"""
+import argparse
+import random
+import time
+
+from services.duplicate_detector import DuplicateDetector
+
+
+ACTIONS = ["open", "click", "fill", "submit", "select", "upload", "delete", "refresh", "scroll", "hover"]
+ENTITIES = ["user", "order", "invoice", "vm", "disk", "flavor", "project", "token", "cart", "report"]
+CHECKS = ["is_visible", "has_text", "status_code", "count", "is_enabled", "contains"]
+
+
+def make_test_case(rng: random.Random, index: int) -> str:
+    """Синтетический тест-кейс в формате Allure TestOps as Code"""
+    entity = rng.choice(ENTITIES)
+    lines = [
+        f'@allure.title("Case {index}: {entity}")',
+        f'@allure.feature("{entity.title()}")',
+        f"def test_{entity}_{index}(self):",
+    ]
+    for step in range(rng.randint(3, 7)):
+        action = rng.choice(ACTIONS)
+        target = rng.choice(ENTITIES)
+        value = rng.randint(0, 10_000)
+        lines.append(f'    with allure.step("{action} {target} {step}"):')
+        lines.append(f"        page.{action}('{target}_{value}', timeout={rng.randint(1, 30)})")
+    lines.append(f"    assert page.{rng.choice(CHECKS)}('{entity}_{rng.randint(0, 10_000)}')")
+    return "\n".join(lines)
+
+
+def make_suite(size: int, duplicate_ratio: float = 0.05, seed: int = 1) -> list:
+    """Набор тест-кейсов, часть которых — слегка измененные копии других"""
+    rng = random.Random(seed)
+    suite = [make_test_case(rng, i) for i in range(size)]
+    for i in rng.sample(range(size), int(size * duplicate_ratio)):
+        source = suite[rng.randrange(size)]
+        suite[i] = source.replace("timeout=", "timeout=1", 1)
+    return suite
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    print(f"{'cases':>8} {'signatures, s':>14} {'total, s':>9} {'clusters':>9}")
+    for size in args.sizes:
+        suite = make_suite(size)
+
+        started = time.perf_counter()
+        DuplicateDetector(threshold=args.threshold).signatures(suite)
+        signatures_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        clusters = DuplicateDetector(threshold=args.threshold).find_clusters(suite)
+        total_time = time.perf_counter() - started
+
+        print(f"{size:>8} {signatures_time:>14.2f} {total_time:>9.2f} {len(clusters):>9}")
+
+if __name__ == "__main__":
+    main()
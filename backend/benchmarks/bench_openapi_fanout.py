@@ -0,0 +1,75 @@
+"""
+Бенчмарк генерации по группам endpoints (fan-out) с имитацией задержки LLM
+
+Сравнивает последовательную генерацию групп с параллельной
+(iter_fanout_generation) и показывает время слияния модулей. Запуск из
+директории backend:
+    python -m benchmarks.bench_openapi_fanout
+    python -m benchmarks.bench_openapi_fanout --endpoints 300 --latency 2 --concurrency 8
+"""
+import argparse
+import asyncio
+import time
+
+from services.openapi_fanout import group_endpoints, iter_fanout_generation
+from services.openapi_parser import OpenAPIParser
+
+
+def make_spec(endpoints: int, resources: int = 20) -> dict:
+    paths = {}
+    for index in range(endpoints):
+        resource = f"resource{index % resources}"
+        paths[f"/v1/{resource}/{index}"] = {"get": {"tags": [resource], "summary": f"Get {index}"}}
+    return {"openapi": "3.0.0", "info": {"title": "Benchmark API", "version": "1"}, "paths": paths}
+
+
+def fake_llm(latency: float):
+    async def generate_group(group_spec: dict) -> str:
+        await asyncio.sleep(latency)
+        tests = "\n\n\n".join(
+            f"def test_{path.strip('/').replace('/', '_')}(session):\n    assert session.get('{path}').ok"
+            for path in group_spec["paths"]
+        )
+        return f"import pytest\nimport requests\n\n\n@pytest.fixture\ndef session():\n    return requests.Session()\n\n\n{tests}\n"
+    return generate_group
+
+
+async def sequential(spec: dict, generate_group, max_group_size: int) -> None:
+    parser = OpenAPIParser()
+    for group in group_endpoints(spec, "tag", max_group_size):
+        await generate_group(parser.subset_spec(spec, group["operations"]))
+
+
+async def fanout(spec: dict, generate_group, max_group_size: int, concurrency: int) -> str:
+    code = ""
+    async for event in iter_fanout_generation(spec, generate_group, "tag", max_group_size, concurrency):
+        if event.get("done"):
+            code = event["code"]
+    return code
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--endpoints", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=1.0, help="Задержка одного ответа LLM, сек")
+    parser.add_argument("--group-size", type=int, default=15)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    spec = make_spec(args.endpoints)
+    generate_group = fake_llm(args.latency)
+    groups = len(group_endpoints(spec, "tag", args.group_size))
+    print(f"endpoints: {args.endpoints}, groups: {groups}, LLM latency: {args.latency}s")
+
+    started = time.perf_counter()
+    asyncio.run(sequential(spec, generate_group, args.group_size))
+    print(f"sequential:            {time.perf_counter() - started:7.2f} s")
+
+    started = time.perf_counter()
+    code = asyncio.run(fanout(spec, generate_group, args.group_size, args.concurrency))
+    print(f"fan-out x{args.concurrency:<3}          {time.perf_counter() - started:7.2f} s "
+          f"(merged module: {len(code.splitlines())} lines, {code.count('def test_')} tests)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Бенчмарк парсинга больших OpenAPI спецификаций
+
+Сравнивает прежний путь (yaml.safe_load / json.loads, определение формата
+через strip) с OpenAPIParser.parse (LibYAML, orjson, определение формата без
+копирования). Запуск из директории backend:
+    python -m benchmarks.bench_openapi_parse
+    python -m benchmarks.bench_openapi_parse --paths 500 2000 4000
+"""
+import argparse
+import json
+import random
+import time
+
+import yaml
+
+from services import openapi_parser
+from services.openapi_parser import OpenAPIParser
+
+
+def make_spec(paths: int, seed: int = 1) -> dict:
+    """Спецификация с paths ресурсами (GET/POST) и схемой на каждый ресурс"""
+    rng = random.Random(seed)
+    schemas = {}
+    operations = {}
+    for index in range(paths):
+        schemas[f"Model{index}"] = {
+            "type": "object",
+            "description": "Модель ресурса " + "x" * rng.randint(20, 80),
+            "required": ["field_0"],
+            "properties": {
+                f"field_{j}": {
+                    "type": rng.choice(["string", "integer", "boolean"]),
+                    "description": f"Поле {j}",
+                    "example": rng.randint(0, 1000)
+                }
+                for j in range(rng.randint(5, 15))
+            }
+        }
+        ref = {"$ref": f"#/components/schemas/Model{index}"}
+        operations[f"/v1/resources{index}/{{id}}"] = {
+            "get": {
+                "summary": f"Get resource {index}",
+                "operationId": f"getResource{index}",
+                "tags": [f"group{index % 20}"],
+                "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "string"}}],
+                "responses": {"200": {"description": "OK", "content": {"application/json": {"schema": ref}}}}
+            },
+            "post": {
+                "summary": f"Create resource {index}",
+                "operationId": f"createResource{index}",
+                "tags": [f"group{index % 20}"],
+                "requestBody": {"content": {"application/json": {"schema": ref}}},
+                "responses": {"201": {"description": "Created"}}
+            }
+        }
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": "Benchmark API", "version": "1.0.0"},
+        "paths": operations,
+        "components": {"schemas": schemas}
+    }
+
+
+def legacy_parse(content: str) -> dict:
+    """Прежний OpenAPIParser.parse"""
+    stripped = content.strip()
+    if stripped.startswith("{") or stripped.startswith("["):
+        return json.loads(content)
+    return yaml.safe_load(content)
+
+
+def timed(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--paths", type=int, nargs="+", default=[500, 1500])
+    args = parser.parse_args()
+
+    print(f"LibYAML: {openapi_parser.YAML_LOADER is not yaml.SafeLoader}, orjson: {openapi_parser.orjson is not None}")
+    print(f"{'paths':>6} {'format':>6} {'size, MB':>9} {'legacy, s':>10} {'fast, s':>8} {'speedup':>8}")
+    fast = OpenAPIParser()
+    for paths in args.paths:
+        spec = make_spec(paths)
+        documents = {
+            "yaml": yaml.safe_dump(spec, allow_unicode=True, sort_keys=False),
+            "json": json.dumps(spec, ensure_ascii=False, indent=2)
+        }
+        for name, content in documents.items():
+            legacy = timed(legacy_parse, content)
+            new = timed(fast.parse, content)
+            print(
+                f"{paths:>6} {name:>6} {len(content.encode('utf-8')) / 1e6:>9.1f} "
+                f"{legacy:>10.3f} {new:>8.3f} {legacy / new:>7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Бенчмарк разрешения $ref на спецификации с тысячами общих схем
+
+Сравнивает наивное рекурсивное разворачивание без мемоизации (каждая ссылка
+разворачивается заново) с RefResolver: полным развертыванием всех операций,
+повторным развертыванием тем же резолвером и ленивым представлением, через
+которое строится описание одного endpoint для промпта. Запуск из директории backend:
+    python -m benchmarks.bench_ref_resolver
+    python -m benchmarks.bench_ref_resolver --schemas 5000 --paths 2000
+"""
+import argparse
+import random
+import time
+
+from services.ref_resolver import RefResolver, describe_schema, request_body_schema, response_schema
+
+
+def make_spec(schemas: int, paths: int, seed: int = 1) -> dict:
+    """
+    Спецификация, где схемы ссылаются на 1-3 предыдущие схемы, каждая десятая —
+    рекурсивно на себя, а операции — на случайные схемы
+    """
+    rng = random.Random(seed)
+    components = {}
+    for index in range(schemas):
+        properties = {
+            "id": {"type": "string", "format": "uuid"},
+            "name": {"type": "string"},
+        }
+        for link in range(rng.randint(1, 3) if index else 0):
+            properties[f"ref_{link}"] = {"$ref": f"#/components/schemas/Model{rng.randrange(index)}"}
+        if index % 10 == 0:
+            properties["children"] = {"type": "array", "items": {"$ref": f"#/components/schemas/Model{index}"}}
+        components[f"Model{index}"] = {"type": "object", "required": ["id"], "properties": properties}
+
+    operations = {}
+    for index in range(paths):
+        ref = {"$ref": f"#/components/schemas/Model{rng.randrange(schemas)}"}
+        operations[f"/v1/resources{index}"] = {
+            "post": {
+                "summary": f"Create resource {index}",
+                "requestBody": {"content": {"application/json": {"schema": ref}}},
+                "responses": {"200": {"description": "OK", "content": {"application/json": {"schema": ref}}}},
+            }
+        }
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": "Benchmark API", "version": "1.0.0"},
+        "paths": operations,
+        "components": {"schemas": components},
+    }
+
+
+def naive_deref(spec: dict, node, stack=()):
+    """Разворачивание без мемоизации: каждое вхождение ссылки разворачивается заново"""
+    if isinstance(node, dict):
+        ref = node.get("$ref")
+        if isinstance(ref, str):
+            if ref in stack:
+                return {"$ref": ref, "x-circular-ref": True}
+            target = spec
+            for token in ref[2:].split("/"):
+                target = target[token]
+            return naive_deref(spec, target, stack + (ref,))
+        return {key: naive_deref(spec, value, stack) for key, value in node.items()}
+    if isinstance(node, list):
+        return [naive_deref(spec, item, stack) for item in node]
+    return node
+
+
+def timed(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--schemas", type=int, default=3000)
+    parser.add_argument("--paths", type=int, default=1000)
+    parser.add_argument("--naive-paths", type=int, default=50,
+                        help="Сколько операций разворачивать наивно (полный прогон слишком долгий)")
+    args = parser.parse_args()
+
+    spec = make_spec(args.schemas, args.paths)
+    operations = [methods["post"] for methods in spec["paths"].values()]
+    print(f"schemas: {args.schemas}, paths: {args.paths}")
+
+    sample = operations[:args.naive_paths]
+    naive = timed(lambda: [naive_deref(spec, op) for op in sample])
+    print(f"naive deref of {len(sample)} operations:   {naive:8.3f} s "
+          f"(~{naive * len(operations) / max(1, len(sample)):.1f} s for all)")
+
+    resolver = RefResolver(spec)
+    cold = timed(lambda: [resolver.deref(op) for op in operations])
+    print(f"RefResolver, all operations (cold): {cold:8.3f} s, "
+          f"{resolver.expansions} expansions, {resolver.memo_hits} memo hits")
+    warm = timed(lambda: [resolver.deref(op) for op in operations])
+    print(f"RefResolver, all operations (warm): {warm:8.3f} s")
+
+    def describe_one():
+        operation = RefResolver(spec).view()["paths"]["/v1/resources0"]["post"]
+        return describe_schema(request_body_schema(operation)), describe_schema(response_schema(operation["responses"]["200"]))
+
+    lazy = timed(describe_one)
+    print(f"lazy view, one endpoint prompt:     {lazy * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
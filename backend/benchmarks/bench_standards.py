@@ -0,0 +1,83 @@
+"""
+Бенчмарк статических проверок стандартов на больших файлах тест-кейсов
+
+Сравнивает прежнюю проверку (отдельный re.search на каждое правило) с
+однопроходным сканером правил. Запуск из директории backend:
+    python -m benchmarks.bench_standards
+    python -m benchmarks.bench_standards --sizes-mb 1 5 10
+"""
+import argparse
+import random
+import re
+import time
+
+from benchmarks.bench_duplicates import make_test_case
+from services.standards_checker import StandardsChecker
+from services.standards_rules import DEFAULT_RULES
+
+
+def legacy_static_check(test_case: str) -> dict:
+    """Прежний вариант: каждое правило — отдельный проход по тексту"""
+    structure = {
+        "has_class": bool(re.search(r'class\s+\w+', test_case)),
+        "has_test_method": bool(re.search(r'def\s+test_\w+', test_case)),
+        "has_description": test_case.count('"""') >= 2,
+        "has_steps": bool(re.search(r'allure_step|with\s+allure\.step', test_case)),
+        "has_expected_result": bool(re.search(r'assert|expected|should', test_case, re.IGNORECASE))
+    }
+    decorators = [p for p in DEFAULT_RULES["decorators"] if re.search(p, test_case)]
+    aaa = [
+        bool(re.search(r'(setup|arrange|prepare|initialize|create|setup_data)', test_case, re.IGNORECASE)),
+        bool(re.search(r'(action|act|execute|perform|call|invoke)', test_case, re.IGNORECASE)),
+        bool(re.search(r'assert|verify|check|validate', test_case, re.IGNORECASE))
+    ]
+    return {"structure": structure, "decorators": decorators, "aaa": aaa}
+
+
+def make_file(size_mb: float, complete: bool, seed: int = 1) -> str:
+    """Файл из множества тест-классов; при complete=False правила срабатывают только в конце"""
+    rng = random.Random(seed)
+    parts = ["import allure\nimport pytest\n"]
+    total, index = 0, 0
+    while total < size_mb * 1_000_000:
+        case = make_test_case(rng, index).replace("\n", "\n    ")
+        body = f"class TestCase{index}:\n    {case}\n"
+        if not complete:
+            # Без ключевых слов правил: худший случай для сканера — полный проход
+            body = re.sub(r"assert|allure|check|create|call|act|setup", "x", body, flags=re.IGNORECASE)
+        parts.append(body)
+        total += len(body)
+        index += 1
+    if complete:
+        parts.insert(1, '@allure.manual\n@allure.label("owner", "qa")\n@allure.feature("F")\n'
+                        '@allure.story("S")\n@allure.suite("S")\n@pytest.mark.manual\n')
+    return "\n".join(parts)
+
+
+def timed(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes-mb", type=float, nargs="+", default=[1, 5, 10])
+    args = parser.parse_args()
+
+    checker = StandardsChecker()
+    # Текстовый режим структуры, чтобы сравнение было только по правилам
+    checker._ast_max_bytes = lambda: 0
+
+    print(f"{'size, MB':>9} {'file':>10} {'legacy, s':>10} {'scanner, s':>11}")
+    for size in args.sizes_mb:
+        for complete in (True, False):
+            source = make_file(size, complete)
+            legacy = timed(legacy_static_check, source)
+            scanner = timed(checker._static_check, source)
+            label = "complete" if complete else "no-match"
+            print(f"{len(source) / 1e6:>9.1f} {label:>10} {legacy:>10.3f} {scanner:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,34 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
+from typing import Optional, AsyncIterator
+import asyncio
+import json
 import os
 
 from services.test_case_generator import TestCaseGenerator
 from services.automated_test_generator import AutomatedTestGenerator
-from services.test_optimizer import TestOptimizer
+from services.test_optimizer import TestOptimizer, run_optimization, OPTIMIZATION_PARTS
 from services.standards_checker import StandardsChecker
+from services.standards_fixer import StandardsFixer
+from services.standards_scan import (
+    ArchiveTooLargeError,
+    detect_archive_format,
+    iter_archive_scan,
+    shutdown_scan_pool,
+    spool_upload
+)
 from services.openapi_parser import OpenAPIParser
 from services.agent_service import AgentService
 from services.adk_service import ADKService
+from services.llm_service import close_shared_http_client, get_inflight_stats
+from services.llm_cache import get_llm_cache
+from services.standards_cache import get_standards_cache
+from services.incremental_generation import get_generated_tests_cache
+from services.spec_cache import get_spec_cache, content_hash
+from services.spec_registry import get_spec_registry, RegisteredSpec
+from services.spec_fetcher import close_spec_http_client
 from models.schemas import (
     GenerateTestCaseRequest,
     GenerateTestCaseResponse,
@@ -17,7 +36,14 @@ from models.schemas import (
     GenerateAPITestRequest,
     OptimizeRequest,
     CheckStandardsRequest,
+    FixStandardsRequest,
     OpenAPIParseRequest,
+    OpenAPIBatchParseRequest,
+    GenerateFromOpenAPIRequest,
+    GenerateAPITestFanoutRequest,
+    GenerateFromOpenAPIFanoutRequest,
+    IncrementalAPITestRequest,
+    SpecReference,
     AgentChatRequest,
     AgentChatResponse,
     ADKChatRequest,
@@ -46,6 +72,7 @@ test_case_generator = None
 automated_test_generator = None
 test_optimizer = None
 standards_checker = None
+team_standards_checkers = {}
 openapi_parser = OpenAPIParser()  # Не требует API ключа
 agent_service = None
 adk_service = None
@@ -74,14 +101,33 @@ def get_test_optimizer():
         test_optimizer = TestOptimizer()
     return test_optimizer
 
-def get_standards_checker():
-    """Ленивая инициализация проверки стандартов"""
+def get_standards_checker(team: Optional[str] = None):
+    """Ленивая инициализация проверки стандартов (с правилами команды, если указана)"""
     global standards_checker
+    if team:
+        if team not in team_standards_checkers:
+            team_standards_checkers[team] = StandardsChecker.for_team(team)
+        return team_standards_checkers[team]
     if standards_checker is None:
         standards_checker = StandardsChecker()
     return standards_checker
 
 
+def _standards_checker_for_request(team: Optional[str] = None):
+    """
+    Проверка стандартов для команды из запроса
+
+    Неизвестная команда или некорректные правила — ошибка клиента (400),
+    одинаково для всех эндпоинтов проверки и исправления.
+    """
+    try:
+        return get_standards_checker(team)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка проверки: {str(e)}")
+
+
 def get_agent_service():
     """Ленивая инициализация агента"""
     global agent_service
@@ -98,6 +144,68 @@ def get_adk_service():
     return adk_service
 
 
+def _ndjson_code_stream(chunks: AsyncIterator[str]) -> StreamingResponse:
+    """
+    Оборачивает поток фрагментов кода в NDJSON-ответ
+    
+    Каждый фрагмент отправляется событием {"content": ...}, последнее событие
+    {"done": true, "code": ...} содержит собранный код. При ошибке
+    отправляется {"error": ..., "success": false}.
+    """
+    async def event_stream():
+        parts = []
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield json.dumps({"content": chunk}, ensure_ascii=False) + "\n"
+            yield json.dumps(
+                {"done": True, "code": "".join(parts).strip(), "success": True},
+                ensure_ascii=False
+            ) + "\n"
+        except Exception as e:
+            yield json.dumps(
+                {"error": f"Ошибка генерации: {str(e)}", "success": False},
+                ensure_ascii=False
+            ) + "\n"
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+def _ndjson_event_stream(events: AsyncIterator[dict]) -> StreamingResponse:
+    """
+    Отдает готовые события генерации в NDJSON-ответе
+    
+    При ошибке отправляется {"error": ..., "success": false}; если клиент
+    отключился, поток событий закрывается и незавершенная работа отменяется.
+    """
+    async def event_stream():
+        try:
+            async for event in events:
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps(
+                {"error": f"Ошибка генерации: {str(e)}", "success": False},
+                ensure_ascii=False
+            ) + "\n"
+        finally:
+            await events.aclose()
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+@app.on_event("shutdown")
+async def _close_llm_http_pool():
+    """Закрывает общие пулы HTTP-соединений (LLM и загрузка спецификаций) при остановке приложения"""
+    await close_shared_http_client()
+    await close_spec_http_client()
+
+
+@app.on_event("shutdown")
+async def _close_scan_pool():
+    """Останавливает пул процессов сканирования архивов"""
+    shutdown_scan_pool()
+
+
 @app.get("/")
 async def root():
     """Корневой эндпоинт"""
@@ -108,9 +216,19 @@ async def root():
             "generate_test_case": "/api/v1/generate-test-case",
             "generate_ui_test": "/api/v1/generate-ui-test",
             "generate_api_test": "/api/v1/generate-api-test",
+            "generate_test_case_stream": "/api/v1/generate-test-case/stream",
+            "generate_ui_test_stream": "/api/v1/generate-ui-test/stream",
+            "generate_api_test_stream": "/api/v1/generate-api-test/stream",
+            "generate_api_test_fanout": "/api/v1/generate-api-test/fanout",
+            "generate_api_test_incremental": "/api/v1/generate-api-test/incremental",
+            "generate_test_case_from_openapi_fanout": "/api/v1/generate-test-case-from-openapi/fanout",
             "optimize": "/api/v1/optimize",
             "check_standards": "/api/v1/check-standards",
+            "check_standards_stream": "/api/v1/check-standards/stream",
+            "fix_standards": "/api/v1/check-standards/fix",
+            "check_standards_archive": "/api/v1/check-standards/archive",
         "parse_openapi": "/api/v1/parse-openapi",
+        "parse_openapi_batch": "/api/v1/parse-openapi/batch",
         "agent_chat": "/api/v1/agent-chat",
         "adk_chat": "/api/v1/adk/chat"
         }
@@ -139,24 +257,131 @@ async def generate_test_case(request: GenerateTestCaseRequest):
         raise HTTPException(status_code=500, detail=f"Ошибка генерации: {str(e)}")
 
 
+@app.post("/api/v1/generate-test-case/stream")
+async def generate_test_case_stream(request: GenerateTestCaseRequest):
+    """
+    Потоковая генерация ручных тест-кейсов (NDJSON)
+    
+    Отдает код по мере генерации, последнее событие содержит собранный код.
+    """
+    try:
+        generator = get_test_case_generator()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка генерации: {str(e)}")
+    return _ndjson_code_stream(generator.stream_from_requirements(
+        requirements=request.requirements,
+        test_type=request.test_type,
+        feature=request.feature,
+        story=request.story,
+        owner=request.owner
+    ))
+
+
+def _get_registered_spec(spec_id: str):
+    """Спецификация из реестра или 404, если ее нет (вытеснена или сервер перезапущен)"""
+    registered = get_spec_registry().get(spec_id)
+    if registered is None:
+        raise HTTPException(status_code=404, detail=f"Спецификация {spec_id} не найдена, распарсите ее заново")
+    return registered
+
+
+async def _registered_spec_for(request: GenerateFromOpenAPIRequest):
+    """Спецификация из реестра по spec_id либо распарсенная из url/spec_content и зарегистрированная"""
+    if request.spec_id:
+        return _get_registered_spec(request.spec_id)
+    if request.url:
+        return await _register_url_spec(request.url)
+    if request.spec_content:
+        return await _register_content_spec(request.spec_content.encode("utf-8"), request.format)
+    raise HTTPException(
+        status_code=400,
+        detail="Необходимо указать 'spec_id', 'url' или 'spec_content'"
+    )
+
+
+def _spec_for_generation(registered, request: SpecReference, kind: str, formatter=None):
+    """
+    Подмножество спецификации по фильтрам запроса и его описание для промпта
+    
+    Описание форматируется один раз на spec_id, фильтры и вид генерации;
+    без formatter описание не строится.
+    """
+    filters = (
+        request.tag,
+        request.method.upper() if request.method else None,
+        request.path_prefix,
+        request.operation_id
+    )
+    spec = registered.subset_spec(*filters)
+    if formatter is None:
+        return spec, None
+    return spec, registered.memo((kind, *filters), lambda: formatter(spec))
+
+
+def _api_test_spec(request: GenerateAPITestRequest, generator, describe: bool = True):
+    """Спецификация и готовое описание для генерации API тестов (spec_id или openapi_spec)"""
+    if request.spec_id:
+        registered = _get_registered_spec(request.spec_id)
+        formatter = generator._format_openapi_spec if describe else None
+        return _spec_for_generation(registered, request, "api-tests", formatter)
+    if request.openapi_spec is None:
+        raise HTTPException(status_code=400, detail="Необходимо указать 'spec_id' или 'openapi_spec'")
+    if request.tag or request.method or request.path_prefix or request.operation_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Фильтры endpoints применяются только вместе с 'spec_id'"
+        )
+    return request.openapi_spec, None
+
+
 @app.post("/api/v1/generate-test-case-from-openapi", response_model=GenerateTestCaseResponse)
-async def generate_test_case_from_openapi(request: OpenAPIParseRequest):
+async def generate_test_case_from_openapi(request: GenerateFromOpenAPIRequest):
     """
     Генерирует тест-кейсы из OpenAPI спецификации
+    
+    Спецификацию можно передать содержимым, URL или `spec_id` уже
+    распарсенной спецификации; фильтры tag/method/path_prefix/operation_id
+    ограничивают набор endpoints.
     """
     try:
-        if request.url:
-            spec = openapi_parser.parse_from_url(request.url)
-        else:
-            spec = openapi_parser.parse(request.spec_content, request.format)
-        
+        registered = await _registered_spec_for(request)
         generator = get_test_case_generator()
-        code = await generator.generate_from_openapi(spec)
+        spec, description = _spec_for_generation(registered, request, "test-cases", generator._format_openapi_spec)
+        code = await generator.generate_from_openapi(spec, spec_description=description)
         return GenerateTestCaseResponse(code=code, success=True)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка генерации: {str(e)}")
 
 
+@app.post("/api/v1/generate-test-case-from-openapi/fanout")
+async def generate_test_case_from_openapi_fanout(request: GenerateFromOpenAPIFanoutRequest):
+    """
+    Генерация тест-кейсов из OpenAPI по группам endpoints параллельно (NDJSON)
+    
+    События те же, что у /api/v1/generate-api-test/fanout.
+    """
+    try:
+        registered = await _registered_spec_for(request)
+        spec, _ = _spec_for_generation(registered, request, "test-cases")
+        generator = get_test_case_generator()
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка генерации: {str(e)}")
+    return _ndjson_event_stream(generator.stream_from_openapi_fanout(
+        openapi_spec=spec,
+        group_by=request.group_by,
+        max_group_size=request.max_group_size,
+        concurrency=request.concurrency
+    ))
+
+
 @app.post("/api/v1/generate-ui-test")
 async def generate_ui_test(request: GenerateUITestRequest):
     """
@@ -177,6 +402,22 @@ async def generate_ui_test(request: GenerateUITestRequest):
         raise HTTPException(status_code=500, detail=f"Ошибка генерации: {str(e)}")
 
 
+@app.post("/api/v1/generate-ui-test/stream")
+async def generate_ui_test_stream(request: GenerateUITestRequest):
+    """
+    Потоковая генерация UI e2e тестов (NDJSON)
+    """
+    try:
+        generator = get_automated_test_generator()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка генерации: {str(e)}")
+    return _ndjson_code_stream(generator.stream_ui_tests(
+        test_cases=request.test_cases,
+        requirements=request.requirements,
+        framework=request.framework
+    ))
+
+
 @app.post("/api/v1/generate-api-test")
 async def generate_api_test(request: GenerateAPITestRequest):
     """
@@ -187,14 +428,126 @@ async def generate_api_test(request: GenerateAPITestRequest):
     """
     try:
         generator = get_automated_test_generator()
+        spec, description = _api_test_spec(request, generator)
         code = await generator.generate_api_tests(
-            openapi_spec=request.openapi_spec,
+            openapi_spec=spec,
             test_cases=request.test_cases,
-            base_url=request.base_url
+            base_url=request.base_url,
+            spec_description=description
         )
         return {"code": code, "success": True}
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка генерации: {str(e)}")
+
+
+@app.post("/api/v1/generate-api-test/stream")
+async def generate_api_test_stream(request: GenerateAPITestRequest):
+    """
+    Потоковая генерация API тестов (NDJSON)
+    """
+    try:
+        generator = get_automated_test_generator()
+        spec, description = _api_test_spec(request, generator)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка генерации: {str(e)}")
+    return _ndjson_code_stream(generator.stream_api_tests(
+        openapi_spec=spec,
+        test_cases=request.test_cases,
+        base_url=request.base_url,
+        spec_description=description
+    ))
+
+
+def _previous_api_test_spec(request: IncrementalAPITestRequest):
+    """
+    Предыдущая версия спецификации с теми же фильтрами endpoints, что и новая
+
+    None, если предыдущая версия не задана или под фильтры в ней не подходит
+    ни один endpoint: тогда все операции считаются добавленными.
+    """
+    if request.previous_spec_id:
+        registered = _get_registered_spec(request.previous_spec_id)
+    elif request.previous_spec is not None:
+        registered = RegisteredSpec("previous", request.previous_spec)
+    else:
+        return None
+    try:
+        spec, _ = _spec_for_generation(registered, request, "api-tests")
+    except ValueError:
+        return None
+    return spec
+
+
+@app.post("/api/v1/generate-api-test/incremental")
+async def generate_api_test_incremental(request: IncrementalAPITestRequest):
+    """
+    Перегенерация API тестов только для групп endpoints с измененными операциями
+    
+    Операции новой и предыдущей версии (`previous_spec_id` или
+    `previous_spec`) сравниваются по хэшу с учетом развернутых $ref схем.
+    Endpoints группируются как при fan-out (`group_by`, `max_group_size`);
+    к LLM уходят только группы с добавленными и измененными операциями, код
+    остальных берется из кэша сгенерированных тестов (GENERATED_TESTS_CACHE_*).
+    Ответ: {"diff": {"added", "changed", "removed", "unchanged"}, "groups",
+    "regenerated", "reused", "cache_misses", "failed", "code", "success"}.
+    """
+    try:
+        generator = get_automated_test_generator()
+        spec, _ = _api_test_spec(request, generator, describe=False)
+        previous_spec = _previous_api_test_spec(request)
+        return await generator.regenerate_api_tests(
+            previous_spec,
+            spec,
+            test_cases=request.test_cases,
+            base_url=request.base_url,
+            group_by=request.group_by,
+            max_group_size=request.max_group_size,
+            concurrency=request.concurrency
+        )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка генерации: {str(e)}")
+
+
+@app.post("/api/v1/generate-api-test/fanout")
+async def generate_api_test_fanout(request: GenerateAPITestFanoutRequest):
+    """
+    Генерация API тестов по группам endpoints параллельно (NDJSON)
+    
+    Endpoints группируются по тегу или ресурсу (`group_by`), каждая группа
+    генерируется отдельным запросом к LLM, не больше `concurrency` одновременно.
+    Код каждой группы отправляется событием {"group", "operations", "code"}
+    сразу по готовности, последнее событие {"done": true, "code": ...} содержит
+    объединенный модуль без повторяющихся импортов и фикстур.
+    """
+    try:
+        generator = get_automated_test_generator()
+        spec, _ = _api_test_spec(request, generator, describe=False)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка генерации: {str(e)}")
+    return _ndjson_event_stream(generator.stream_api_tests_fanout(
+        openapi_spec=spec,
+        test_cases=request.test_cases,
+        base_url=request.base_url,
+        group_by=request.group_by,
+        max_group_size=request.max_group_size,
+        concurrency=request.concurrency
+    ))
 
 
 @app.post("/api/v1/optimize")
@@ -203,30 +556,27 @@ async def optimize_tests(request: OptimizeRequest):
     Оптимизирует тест-кейсы
     
     Анализирует покрытие, находит дубликаты и предлагает улучшения.
+    Части выполняются параллельно; если одна из них упала или не уложилась
+    в таймаут, возвращаются остальные (`partial: true`, причина в `errors`).
     """
     try:
         optimizer = get_test_optimizer()
-        # Анализ покрытия
-        coverage = await optimizer.analyze_coverage(
+        # Покрытие, дубликаты и улучшения анализируются параллельно
+        timeouts = {}
+        if request.part_timeout:
+            timeouts = {part: request.part_timeout for part in OPTIMIZATION_PARTS}
+        result = await run_optimization(
+            optimizer,
             test_cases=request.test_cases,
-            requirements=request.requirements
+            requirements=request.requirements,
+            defect_history=request.defect_history,
+            timeouts=timeouts
         )
         
-        # Поиск дубликатов
-        duplicates = await optimizer.find_duplicates(request.test_cases)
+        if len(result["errors"]) == len(OPTIMIZATION_PARTS):
+            raise Exception("; ".join(f"{part}: {error}" for part, error in result["errors"].items()))
         
-        # Предложения по улучшению
-        improvements = await optimizer.suggest_improvements(
-            test_cases=request.test_cases,
-            defect_history=request.defect_history
-        )
-        
-        return {
-            "success": True,
-            "coverage": coverage,
-            "duplicates": duplicates,
-            "improvements": improvements
-        }
+        return {"success": True, **result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка оптимизации: {str(e)}")
 
@@ -237,21 +587,171 @@ async def check_standards(request: CheckStandardsRequest):
     Проверяет тест-кейсы на соответствие стандартам Allure
     
     Проверяет структуру, декораторы, паттерн AAA и формирует отчет.
+    LLM проверка качества выполняется только для неоднозначного статического
+    балла или при `deep_review: true`; поле `tier` в результате показывает,
+    какой уровень вынес вердикт.
     """
+    if not request.test_case and not request.test_cases:
+        raise HTTPException(status_code=400, detail="Необходимо указать test_case или test_cases")
+    checker = _standards_checker_for_request(request.team)
     try:
-        checker = get_standards_checker()
         if request.test_case:
-            result = await checker.check_test_case(request.test_case)
-            return {"success": True, "result": result}
-        elif request.test_cases:
-            result = await checker.check_batch(request.test_cases)
-            return {"success": True, "result": result}
+            result = await checker.check_test_case(request.test_case, deep_review=request.deep_review)
         else:
-            raise HTTPException(status_code=400, detail="Необходимо указать test_case или test_cases")
+            result = await checker.check_batch(request.test_cases, deep_review=request.deep_review)
+        return {"success": True, "result": result}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка проверки: {str(e)}")
 
 
+@app.post("/api/v1/check-standards/stream")
+async def check_standards_stream(request: CheckStandardsRequest):
+    """
+    Потоковая проверка тест-кейсов на соответствие стандартам (NDJSON)
+    
+    Результат каждого тест-кейса отправляется событием {"index": ..., "result": ...}
+    сразу после готовности, последнее событие {"done": true, ...} содержит
+    сводную статистику в формате check_batch (без списка results).
+    """
+    test_cases = request.test_cases or ([request.test_case] if request.test_case else [])
+    if not test_cases:
+        raise HTTPException(status_code=400, detail="Необходимо указать test_case или test_cases")
+    checker = _standards_checker_for_request(request.team)
+    
+    async def event_stream():
+        results = []
+        try:
+            async for index, result in checker.iter_batch(test_cases, deep_review=request.deep_review):
+                results.append(result)
+                yield json.dumps({"index": index, "result": result}, ensure_ascii=False) + "\n"
+            yield json.dumps(
+                {"done": True, **checker.summarize(results), "success": True},
+                ensure_ascii=False
+            ) + "\n"
+        except Exception as e:
+            yield json.dumps(
+                {"error": f"Ошибка проверки: {str(e)}", "success": False},
+                ensure_ascii=False
+            ) + "\n"
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+@app.post("/api/v1/check-standards/archive")
+async def check_standards_archive(request: Request, team: Optional[str] = None, pattern: str = "*.py"):
+    """
+    Проверяет статическими правилами все тест-кейсы из tar/zip архива (NDJSON)
+    
+    Архив передается сырым телом запроса и читается по одному файлу, проверки
+    выполняются в пуле процессов. Пример:
+      tar czf tests.tar.gz tests/
+      curl -X POST "http://127.0.0.1:8000/api/v1/check-standards/archive?pattern=test_*.py" \\
+        --data-binary @tests.tar.gz
+    
+    События: {"path", "result"} для каждого файла, {"path", "skipped"} для
+    пропущенного (слишком большой, не UTF-8), последнее — {"done": true, ...}
+    со сводной статистикой в формате check_batch и числом пропущенных файлов.
+    """
+    checker = _standards_checker_for_request(team)
+    try:
+        archive = await spool_upload(request.stream())
+    except ArchiveTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        await asyncio.to_thread(detect_archive_format, archive)
+    except ValueError as e:
+        archive.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    async def event_stream():
+        results = []
+        skipped = 0
+        try:
+            async for event in iter_archive_scan(checker, archive, pattern):
+                if "result" in event:
+                    results.append(event["result"])
+                else:
+                    skipped += 1
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+            yield json.dumps(
+                {"done": True, **checker.summarize(results), "skipped_files": skipped, "success": True},
+                ensure_ascii=False
+            ) + "\n"
+        except Exception as e:
+            yield json.dumps(
+                {"error": f"Ошибка проверки: {str(e)}", "success": False},
+                ensure_ascii=False
+            ) + "\n"
+        finally:
+            archive.close()
+    
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+
+@app.post("/api/v1/check-standards/fix")
+async def fix_standards(request: FixStandardsRequest):
+    """
+    Автоисправление тест-кейса по стандартам Allure без LLM
+    
+    Добавляет недостающие обязательные декораторы (значения берутся из
+    `values`, правил команды или значений по умолчанию) и оборачивает тела
+    тестов без шагов в `with allure.step(...)`. Возвращает исправленный код,
+    unified diff и статический балл до и после исправления.
+    """
+    fixer = StandardsFixer(_standards_checker_for_request(request.team))
+    try:
+        result = fixer.fix(
+            request.test_case,
+            values=request.values,
+            add_decorators=request.add_decorators,
+            wrap_steps=request.wrap_steps
+        )
+        return {"success": True, "result": result}
+    except ValueError as e:
+        # Некорректный шаблон в правилах
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка исправления: {str(e)}")
+
+
+async def _register_url_spec(url: str):
+    """
+    Загружает спецификацию по URL и регистрирует ее
+
+    Ключ — URL и хэш загруженного документа, поэтому повторная загрузка того же
+    документа дает тот же spec_id и с выключенным кэшем спецификаций.
+    """
+    spec, digest = await openapi_parser.fetch_spec(url)
+    return get_spec_registry().register(spec, f"{url}\n{digest}", source=url)
+
+
+async def _register_content_spec(body: bytes, format: str):
+    """
+    Регистрирует спецификацию, переданную содержимым
+
+    Ключ — хэш содержимого; уже зарегистрированный документ не парсится заново.
+    """
+    registry = get_spec_registry()
+    source_key = content_hash(body)
+    registered = registry.find(source_key)
+    if registered is None:
+        spec = await openapi_parser.parse_async(body.decode("utf-8", errors="ignore"), format)
+        registered = registry.register(spec, source_key)
+    return registered
+
+
+def _parsed_spec_response(registered, include_spec: bool, endpoints_limit: int) -> dict:
+    """
+    Ответ парсинга: сводка, первая страница endpoints и spec_id
+
+    Полная спецификация возвращается только при include_spec=true; остальные
+    endpoints — через /api/v1/specs/{spec_id}/endpoints.
+    """
+    info = registered.info(include_spec=include_spec)
+    page = registered.list_endpoints(limit=endpoints_limit) if endpoints_limit > 0 else {"items": []}
+    return {"success": True, **info, "endpoints": page["items"]}
+
+
 @app.post("/api/v1/parse-openapi")
 async def parse_openapi(request: OpenAPIParseRequest):
     """
@@ -268,28 +768,11 @@ async def parse_openapi(request: OpenAPIParseRequest):
             )
         
         if request.url:
-            spec = openapi_parser.parse_from_url(request.url)
+            registered = await _register_url_spec(request.url)
         else:
-            spec = openapi_parser.parse(request.spec_content, request.format)
-        
-        # Валидация
-        validation = openapi_parser.validate_spec(spec)
-        
-        # Извлечение информации
-        endpoints = openapi_parser.extract_endpoints(spec)
-        schemas = openapi_parser.extract_schemas(spec)
-        security = openapi_parser.get_security_schemes(spec)
+            registered = await _register_content_spec(request.spec_content.encode("utf-8"), request.format)
         
-        return {
-            "success": True,
-            "validation": validation,
-            "endpoints": endpoints,
-            "endpoints_count": len(endpoints),
-            "schemas": list(schemas.keys()) if schemas else [],
-            "schemas_count": len(schemas) if schemas else 0,
-            "security_schemes": list(security.keys()) if security else [],
-            "spec": spec
-        }
+        return _parsed_spec_response(registered, request.include_spec, request.endpoints_limit)
     except ValueError as e:
         # ValueError содержит детальное описание проблемы
         raise HTTPException(status_code=400, detail=str(e))
@@ -297,8 +780,45 @@ async def parse_openapi(request: OpenAPIParseRequest):
         raise HTTPException(status_code=500, detail=f"Ошибка парсинга: {str(e)}")
 
 
+@app.post("/api/v1/parse-openapi/batch")
+async def parse_openapi_batch(request: OpenAPIBatchParseRequest):
+    """
+    Загружает и парсит несколько OpenAPI спецификаций по URL параллельно
+    
+    Для каждой спецификации возвращается краткая сводка (без самой
+    спецификации); ошибка одной спецификации не прерывает остальные.
+    """
+    try:
+        loaded = await openapi_parser.parse_many_from_urls(request.urls)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Ошибка парсинга: {str(e)}")
+    
+    results = []
+    for item in loaded:
+        if "error" in item:
+            results.append({"url": item["url"], "success": False, "error": item["error"]})
+            continue
+        summary = get_spec_registry().register(
+            item["spec"], f"{item['url']}\n{item['content_hash']}", source=item["url"]
+        ).info()
+        results.append({
+            "url": item["url"],
+            "success": True,
+            "spec_id": summary["spec_id"],
+            "validation": summary["validation"],
+            "endpoints_count": summary["endpoints_count"],
+            "schemas_count": summary["schemas_count"]
+        })
+    return {"success": all(r["success"] for r in results), "results": results}
+
+
 @app.post("/api/v1/parse-openapi-raw")
-async def parse_openapi_raw(request: Request, format: str = "auto"):
+async def parse_openapi_raw(
+    request: Request,
+    format: str = "auto",
+    include_spec: bool = False,
+    endpoints_limit: int = 50
+):
     """
     Парсит OpenAPI спецификацию, переданную как сырой YAML/JSON без обертки в JSON.
     
@@ -311,35 +831,77 @@ async def parse_openapi_raw(request: Request, format: str = "auto"):
         body = await request.body()
         if not body:
             raise HTTPException(status_code=400, detail="Пустое тело запроса")
-        spec_content = body.decode("utf-8", errors="ignore")
-        
-        # Парсим
-        spec = openapi_parser.parse(spec_content, format)
-        
-        # Валидация
-        validation = openapi_parser.validate_spec(spec)
+        registered = await _register_content_spec(body, format)
         
-        # Извлечение информации
-        endpoints = openapi_parser.extract_endpoints(spec)
-        schemas = openapi_parser.extract_schemas(spec)
-        security = openapi_parser.get_security_schemes(spec)
-        
-        return {
-            "success": True,
-            "validation": validation,
-            "endpoints": endpoints,
-            "endpoints_count": len(endpoints),
-            "schemas": list(schemas.keys()) if schemas else [],
-            "schemas_count": len(schemas) if schemas else 0,
-            "security_schemes": list(security.keys()) if security else [],
-            "spec": spec
-        }
+        return _parsed_spec_response(registered, include_spec, endpoints_limit)
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ошибка парсинга: {str(e)}")
 
 
+@app.get("/api/v1/specs/{spec_id}")
+async def get_spec_info(spec_id: str, include_spec: bool = False):
+    """
+    Сводка по распарсенной спецификации из реестра
+    
+    Полная спецификация возвращается только при include_spec=true.
+    """
+    registered = _get_registered_spec(spec_id)
+    return {"success": True, **registered.info(include_spec=include_spec)}
+
+
+@app.get("/api/v1/specs/{spec_id}/endpoints")
+async def list_spec_endpoints(
+    spec_id: str,
+    tag: Optional[str] = None,
+    method: Optional[str] = None,
+    path_prefix: Optional[str] = None,
+    operation_id: Optional[str] = None,
+    offset: int = 0,
+    limit: int = 50,
+    fields: Optional[str] = None,
+    resolve_refs: bool = False
+):
+    """
+    Постраничный список endpoints спецификации с фильтрами
+    
+    Фильтры tag, method, path_prefix и operation_id пересекаются. `fields` —
+    поля через запятую (по умолчанию path,method,summary,operation_id,tags;
+    parameters, request_body и responses — по запросу, с resolve_refs=true
+    в них разворачиваются $ref).
+    """
+    registered = _get_registered_spec(spec_id)
+    try:
+        page = registered.list_endpoints(
+            tag=tag,
+            method=method,
+            path_prefix=path_prefix,
+            operation_id=operation_id,
+            offset=offset,
+            limit=min(limit, 500),
+            fields=[field.strip() for field in fields.split(",") if field.strip()] if fields else None,
+            resolve_refs=resolve_refs
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"success": True, "spec_id": spec_id, **page}
+
+
+@app.get("/api/v1/admin/spec-registry")
+async def spec_registry_stats():
+    """Спецификации в реестре и статистика повторного использования"""
+    return get_spec_registry().stats()
+
+
+@app.delete("/api/v1/admin/spec-registry")
+async def clear_spec_registry(spec_id: Optional[str] = None):
+    """Удаляет спецификацию из реестра (без spec_id — все)"""
+    return {"success": True, "removed": get_spec_registry().remove(spec_id)}
+
+
 @app.post("/api/v1/agent-chat", response_model=AgentChatResponse)
 async def agent_chat(request: AgentChatRequest):
     """
@@ -380,6 +942,100 @@ async def health():
     return {"status": "healthy"}
 
 
+@app.get("/api/v1/admin/llm-cache")
+async def llm_cache_stats():
+    """Статистика кэша ответов LLM (попадания, промахи, размер) и объединения запросов"""
+    cache = get_llm_cache()
+    if cache is None:
+        return {"enabled": False, "coalescing": get_inflight_stats()}
+    return {"enabled": True, **cache.stats(), "coalescing": get_inflight_stats()}
+
+
+@app.delete("/api/v1/admin/llm-cache")
+async def invalidate_llm_cache(key: Optional[str] = None):
+    """
+    Инвалидирует кэш ответов LLM
+    
+    Без параметра `key` очищает весь кэш (память и диск).
+    """
+    cache = get_llm_cache()
+    if cache is None:
+        return {"success": True, "enabled": False, "removed": 0}
+    removed = cache.invalidate(key)
+    return {"success": True, "enabled": True, "removed": removed}
+
+
+@app.get("/api/v1/admin/standards-cache")
+async def standards_cache_stats():
+    """Статистика кэша результатов проверки стандартов"""
+    cache = get_standards_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.delete("/api/v1/admin/standards-cache")
+async def invalidate_standards_cache(key: Optional[str] = None):
+    """
+    Инвалидирует кэш результатов проверки стандартов
+    
+    Без параметра `key` очищает весь кэш (память и диск). При изменении
+    правил очищать кэш не нужно: версия правил входит в ключ.
+    """
+    cache = get_standards_cache()
+    if cache is None:
+        return {"success": True, "enabled": False, "removed": 0}
+    removed = cache.invalidate(key)
+    return {"success": True, "enabled": True, "removed": removed}
+
+
+@app.get("/api/v1/admin/generated-tests-cache")
+async def generated_tests_cache_stats():
+    """Статистика кэша тестов, сгенерированных по операциям спецификации"""
+    cache = get_generated_tests_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.delete("/api/v1/admin/generated-tests-cache")
+async def invalidate_generated_tests_cache(key: Optional[str] = None):
+    """
+    Инвалидирует кэш тестов, сгенерированных по операциям спецификации
+    
+    Без параметра `key` очищает весь кэш (память и диск); следующая
+    инкрементальная генерация заново сгенерирует все операции.
+    """
+    cache = get_generated_tests_cache()
+    if cache is None:
+        return {"success": True, "enabled": False, "removed": 0}
+    removed = cache.invalidate(key)
+    return {"success": True, "enabled": True, "removed": removed}
+
+
+@app.get("/api/v1/admin/openapi-cache")
+async def openapi_cache_stats():
+    """Статистика кэша OpenAPI спецификаций (попадания 304, промахи, сэкономленные байты)"""
+    cache = get_spec_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+
+@app.delete("/api/v1/admin/openapi-cache")
+async def invalidate_openapi_cache(url: Optional[str] = None):
+    """
+    Инвалидирует кэш OpenAPI спецификаций
+    
+    Без параметра `url` очищает весь кэш.
+    """
+    cache = get_spec_cache()
+    if cache is None:
+        return {"success": True, "enabled": False, "removed": 0}
+    removed = cache.invalidate(url)
+    return {"success": True, "enabled": True, "removed": removed}
+
+
 @app.get("/api/v1/check-config")
 async def check_config():
     """Проверка конфигурации API"""
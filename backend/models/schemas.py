@@ -49,19 +49,81 @@ class GenerateUITestRequest(BaseModel):
     }
 
 
-class GenerateAPITestRequest(BaseModel):
-    """Запрос на генерацию API тестов"""
-    openapi_spec: Dict[str, Any] = Field(..., description="OpenAPI спецификация")
+class SpecReference(BaseModel):
+    """Ссылка на спецификацию, уже распарсенную сервером, и фильтры endpoints"""
+    spec_id: Optional[str] = Field(default=None, description="spec_id из ответа /api/v1/parse-openapi")
+    tag: Optional[str] = Field(default=None, description="Только endpoints с этим тегом")
+    method: Optional[str] = Field(default=None, description="Только endpoints с этим HTTP методом")
+    path_prefix: Optional[str] = Field(default=None, description="Только endpoints с путем, начинающимся с префикса")
+    operation_id: Optional[str] = Field(default=None, description="Только endpoint с этим operationId")
+
+
+class GenerateAPITestRequest(SpecReference):
+    """Запрос на генерацию API тестов (спецификация целиком или spec_id)"""
+    openapi_spec: Optional[Dict[str, Any]] = Field(default=None, description="OpenAPI спецификация")
     test_cases: Optional[str] = Field(default="", description="Существующие тест-кейсы")
     base_url: str = Field(default="", description="Базовый URL API")
 
     model_config = {
         "json_schema_extra": {
-            "example": {
-                "openapi_spec": {"openapi": "3.0.0", "paths": {}},
-                "test_cases": "",
-                "base_url": "https://compute.api.cloud.ru"
-            }
+            "examples": [
+                {
+                    "openapi_spec": {"openapi": "3.0.0", "paths": {}},
+                    "test_cases": "",
+                    "base_url": "https://compute.api.cloud.ru"
+                },
+                {"spec_id": "3f1c0a9d2b7e4c15", "tag": "vms", "base_url": "https://compute.api.cloud.ru"}
+            ]
+        }
+    }
+
+
+class GenerateFromOpenAPIRequest(SpecReference):
+    """Запрос на генерацию тест-кейсов из OpenAPI (содержимое, URL или spec_id)"""
+    spec_content: Optional[str] = Field(default=None, description="Содержимое спецификации")
+    format: str = Field(default="auto", description="Формат (json/yaml/auto)")
+    url: Optional[str] = Field(default=None, description="URL спецификации (альтернатива spec_content)")
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {"url": "https://compute.api.cloud.ru/openapi.json", "format": "auto"},
+                {"spec_id": "3f1c0a9d2b7e4c15", "path_prefix": "/v3/disks"}
+            ]
+        }
+    }
+
+
+class FanoutOptions(BaseModel):
+    """Параметры генерации по группам endpoints (fan-out)"""
+    group_by: Literal["tag", "resource"] = Field(default="tag", description="Группировка endpoints: по тегу или по ресурсу пути")
+    max_group_size: Optional[int] = Field(default=None, ge=1, description="Максимум endpoints в группе (по умолчанию OPENAPI_FANOUT_GROUP_SIZE)")
+    concurrency: Optional[int] = Field(default=None, ge=1, description="Сколько групп генерировать одновременно (по умолчанию OPENAPI_FANOUT_CONCURRENCY)")
+
+
+class GenerateAPITestFanoutRequest(GenerateAPITestRequest, FanoutOptions):
+    """Запрос на генерацию API тестов по группам endpoints"""
+
+
+class GenerateFromOpenAPIFanoutRequest(GenerateFromOpenAPIRequest, FanoutOptions):
+    """Запрос на генерацию тест-кейсов из OpenAPI по группам endpoints"""
+
+
+class IncrementalAPITestRequest(GenerateAPITestRequest, FanoutOptions):
+    """Запрос на перегенерацию API тестов только для групп endpoints с измененными операциями"""
+    previous_spec_id: Optional[str] = Field(default=None, description="spec_id предыдущей версии спецификации")
+    previous_spec: Optional[Dict[str, Any]] = Field(default=None, description="Предыдущая версия спецификации (альтернатива previous_spec_id)")
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "spec_id": "8b2e61f07c3d4a90",
+                    "previous_spec_id": "3f1c0a9d2b7e4c15",
+                    "tag": "vms",
+                    "base_url": "https://compute.api.cloud.ru"
+                }
+            ]
         }
     }
 
@@ -71,6 +133,10 @@ class OptimizeRequest(BaseModel):
     test_cases: List[str] = Field(..., description="Список тест-кейсов")
     requirements: str = Field(..., description="Описание требований")
     defect_history: Optional[str] = Field(default="", description="История дефектов")
+    part_timeout: Optional[float] = Field(
+        default=None,
+        description="Таймаут каждой части анализа в секундах (по умолчанию OPTIMIZER_PART_TIMEOUT)"
+    )
 
     model_config = {
         "json_schema_extra": {
@@ -87,6 +153,14 @@ class CheckStandardsRequest(BaseModel):
     """Запрос на проверку стандартов"""
     test_case: Optional[str] = Field(default=None, description="Один тест-кейс")
     test_cases: Optional[List[str]] = Field(default=None, description="Список тест-кейсов")
+    team: Optional[str] = Field(
+        default=None,
+        description="Команда, чьи правила применить (STANDARDS_RULES_DIR/<team>.json|yaml)"
+    )
+    deep_review: bool = Field(
+        default=False,
+        description="Всегда выполнять LLM проверку качества (иначе только для неоднозначного статического балла)"
+    )
 
     model_config = {
         "json_schema_extra": {
@@ -98,11 +172,36 @@ class CheckStandardsRequest(BaseModel):
     }
 
 
+class FixStandardsRequest(BaseModel):
+    """Запрос на автоисправление тест-кейса по стандартам"""
+    test_case: str = Field(..., description="Код тест-кейса")
+    team: Optional[str] = Field(
+        default=None,
+        description="Команда, чьи правила применить (STANDARDS_RULES_DIR/<team>.json|yaml)"
+    )
+    values: Optional[Dict[str, str]] = Field(
+        default=None,
+        description="Значения для декораторов и шагов: owner, feature, story, suite, step_arrange, step_act, step_assert"
+    )
+    add_decorators: bool = Field(default=True, description="Добавлять недостающие декораторы")
+    wrap_steps: bool = Field(default=True, description="Оборачивать тела тестов без шагов в allure.step")
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {"test_case": "код тест-кейса", "values": {"owner": "QA Team", "feature": "Auth"}}
+            ]
+        }
+    }
+
+
 class OpenAPIParseRequest(BaseModel):
     """Запрос на парсинг OpenAPI"""
     spec_content: Optional[str] = Field(default=None, description="Содержимое спецификации")
     format: str = Field(default="auto", description="Формат (json/yaml/auto)")
     url: Optional[str] = Field(default=None, description="URL спецификации (альтернатива spec_content)")
+    include_spec: bool = Field(default=False, description="Вернуть в ответе всю распарсенную спецификацию")
+    endpoints_limit: int = Field(default=50, ge=0, description="Сколько endpoints вернуть сразу (остальные — через /api/v1/specs/{spec_id}/endpoints)")
     
     def __init__(self, **data):
         super().__init__(**data)
@@ -119,6 +218,19 @@ class OpenAPIParseRequest(BaseModel):
     }
 
 
+class OpenAPIBatchParseRequest(BaseModel):
+    """Запрос на параллельный парсинг нескольких OpenAPI спецификаций"""
+    urls: List[str] = Field(..., min_length=1, description="URL спецификаций")
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {"urls": ["https://compute.api.cloud.ru/openapi.json", "https://vpc.api.cloud.ru/openapi.yaml"]}
+            ]
+        }
+    }
+
+
 class AgentMessage(BaseModel):
     """Сообщение в истории чата агента"""
     role: Literal["user", "assistant", "system"] = Field(..., description="Роль участника диалога")
@@ -1,8 +1,12 @@
 """
 Генератор автоматизированных тестов (UI e2e и API)
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator, Optional
 from .llm_service import LLMService
+from .code_fence import strip_code_fence, strip_code_fence_stream
+from .openapi_fanout import iter_fanout_generation
+from .incremental_generation import regenerate_incrementally
+from .ref_resolver import get_ref_resolver, describe_schema, request_body_schema, response_schema
 
 
 class AutomatedTestGenerator:
@@ -56,15 +60,7 @@ class AutomatedTestGenerator:
         Returns:
             Python код автоматизированных тестов
         """
-        prompt = f"""На основе следующих тест-кейсов сгенерируй автоматизированные e2e UI тесты используя {framework}:
-
-Тест-кейсы:
-{test_cases}
-
-Дополнительные требования:
-{requirements}
-
-Сгенерируй pytest тесты, которые автоматизируют эти сценарии."""
+        prompt = self._build_ui_prompt(test_cases, requirements, framework)
         
         code = await self.llm_service.generate(
             prompt=prompt,
@@ -74,18 +70,14 @@ class AutomatedTestGenerator:
         )
         
         # Очистка от markdown
-        if "```python" in code:
-            code = code.split("```python")[1].split("```")[0]
-        elif "```" in code:
-            code = code.split("```")[1].split("```")[0]
-        
-        return code.strip()
+        return strip_code_fence(code)
     
     async def generate_api_tests(
         self,
         openapi_spec: Dict[str, Any],
         test_cases: str = "",
-        base_url: str = ""
+        base_url: str = "",
+        spec_description: Optional[str] = None
     ) -> str:
         """
         Генерирует API тесты на основе OpenAPI спецификации
@@ -94,39 +86,170 @@ class AutomatedTestGenerator:
             openapi_spec: OpenAPI спецификация
             test_cases: Существующие тест-кейсы (опционально)
             base_url: Базовый URL API
+            spec_description: Готовое описание спецификации (например, из
+                реестра); если задано, openapi_spec не форматируется заново
         
         Returns:
             Python код автоматизированных API тестов
         """
-        spec_description = self._format_openapi_spec(openapi_spec)
+        prompt = self._build_api_prompt(openapi_spec, test_cases, base_url, spec_description)
         
-        # Формируем часть с тест-кейсами отдельно, чтобы избежать проблемы с \n в f-string
-        test_cases_part = ""
-        if test_cases:
-            test_cases_part = f"Существующие тест-кейсы для справки:\n{test_cases}\n"
+        code = await self.llm_service.generate(
+            prompt=prompt,
+            system_prompt=self._get_api_system_prompt(),
+            temperature=0.3,
+            max_tokens=4000
+        )
+        
+        # Очистка от markdown
+        return strip_code_fence(code)
+    
+    def stream_api_tests_fanout(
+        self,
+        openapi_spec: Dict[str, Any],
+        test_cases: str = "",
+        base_url: str = "",
+        group_by: str = "tag",
+        max_group_size: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Генерирует API тесты по группам endpoints параллельно (fan-out)
+        
+        Каждая группа (тег или ресурс) генерируется отдельным запросом к LLM,
+        результаты объединяются в один модуль (см. iter_fanout_generation).
         
-        prompt = f"""На основе следующей OpenAPI спецификации сгенерируй автоматизированные API тесты:
+        Yields:
+            События готовности групп и итоговое событие с объединенным модулем
+        """
+        return iter_fanout_generation(
+            openapi_spec,
+            lambda group_spec: self.generate_api_tests(group_spec, test_cases, base_url),
+            group_by=group_by,
+            max_group_size=max_group_size,
+            concurrency=concurrency
+        )
 
-{spec_description}
+    async def regenerate_api_tests(
+        self,
+        previous_spec: Optional[Dict[str, Any]],
+        openapi_spec: Dict[str, Any],
+        test_cases: str = "",
+        base_url: str = "",
+        group_by: str = "tag",
+        max_group_size: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Перегенерирует API тесты только для групп endpoints с измененными операциями
 
-Базовый URL: {base_url}
+        Группы те же, что и при fan-out генерации; код группы кэшируется по
+        хэшам ее операций с учетом развернутых схем (см. regenerate_incrementally).
+        Ключ кэша включает base_url, тест-кейсы и системный промпт.
 
-{test_cases_part}Сгенерируй pytest тесты с проверками статус-кодов, схем ответов и валидацией данных."""
+        Args:
+            previous_spec: Предыдущая версия спецификации (None — первая генерация)
+            openapi_spec: Новая версия спецификации
+            test_cases: Существующие тест-кейсы (опционально)
+            base_url: Базовый URL API
+            group_by: Группировка endpoints: "tag" или "resource"
+            max_group_size: Максимум endpoints в группе
+            concurrency: Лимит одновременных запросов к LLM
+
+        Returns:
+            Изменения операций, группы со статусом, списки перегенерированных и
+            взятых из кэша операций и объединенный модуль тестов
+        """
+        context = "\0".join([base_url or "", test_cases or "", self._get_api_system_prompt()])
+        return await regenerate_incrementally(
+            previous_spec,
+            openapi_spec,
+            lambda group_spec: self.generate_api_tests(group_spec, test_cases, base_url),
+            kind="api-tests",
+            context=context,
+            group_by=group_by,
+            max_group_size=max_group_size,
+            concurrency=concurrency
+        )
+
+    async def stream_ui_tests(
+        self,
+        test_cases: str,
+        requirements: str = "",
+        framework: str = "selenium"
+    ) -> AsyncIterator[str]:
+        """
+        Потоковая версия generate_ui_tests
         
-        code = await self.llm_service.generate(
-            prompt=prompt,
+        Yields:
+            Фрагменты Python кода без markdown-обрамления
+        """
+        chunks = self.llm_service.generate_stream(
+            prompt=self._build_ui_prompt(test_cases, requirements, framework),
+            system_prompt=self._get_ui_system_prompt(),
+            temperature=0.3,
+            max_tokens=4000
+        )
+        async for text in strip_code_fence_stream(chunks):
+            yield text
+    
+    async def stream_api_tests(
+        self,
+        openapi_spec: Dict[str, Any],
+        test_cases: str = "",
+        base_url: str = "",
+        spec_description: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Потоковая версия generate_api_tests
+        
+        Yields:
+            Фрагменты Python кода без markdown-обрамления
+        """
+        chunks = self.llm_service.generate_stream(
+            prompt=self._build_api_prompt(openapi_spec, test_cases, base_url, spec_description),
             system_prompt=self._get_api_system_prompt(),
             temperature=0.3,
             max_tokens=4000
         )
+        async for text in strip_code_fence_stream(chunks):
+            yield text
+    
+    def _build_ui_prompt(self, test_cases: str, requirements: str, framework: str) -> str:
+        """Промпт для генерации UI e2e тестов"""
+        return f"""На основе следующих тест-кейсов сгенерируй автоматизированные e2e UI тесты используя {framework}:
+
+Тест-кейсы:
+{test_cases}
+
+Дополнительные требования:
+{requirements}
+
+Сгенерируй pytest тесты, которые автоматизируют эти сценарии."""
+    
+    def _build_api_prompt(
+        self,
+        openapi_spec: Dict[str, Any],
+        test_cases: str,
+        base_url: str,
+        spec_description: Optional[str] = None
+    ) -> str:
+        """Промпт для генерации API тестов"""
+        if spec_description is None:
+            spec_description = self._format_openapi_spec(openapi_spec)
         
-        # Очистка от markdown
-        if "```python" in code:
-            code = code.split("```python")[1].split("```")[0]
-        elif "```" in code:
-            code = code.split("```")[1].split("```")[0]
+        # Формируем часть с тест-кейсами отдельно, чтобы избежать проблемы с \n в f-string
+        test_cases_part = ""
+        if test_cases:
+            test_cases_part = f"Существующие тест-кейсы для справки:\n{test_cases}\n"
         
-        return code.strip()
+        return f"""На основе следующей OpenAPI спецификации сгенерируй автоматизированные API тесты:
+
+{spec_description}
+
+Базовый URL: {base_url}
+
+{test_cases_part}Сгенерируй pytest тесты с проверками статус-кодов, схем ответов и валидацией данных."""
     
     def _format_openapi_spec(self, spec: Dict[str, Any]) -> str:
         """Форматирует OpenAPI спецификацию"""
@@ -137,17 +260,25 @@ class AutomatedTestGenerator:
             description += f"{spec['info'].get('description', '')}\n\n"
         
         if 'paths' in spec:
-            for path, methods in spec['paths'].items():
+            # Ленивое представление: $ref разворачиваются только для выводимых схем
+            view = get_ref_resolver(spec).view()
+            for path, methods in view['paths'].items():
                 for method, details in methods.items():
                     if method.lower() in ['get', 'post', 'put', 'delete', 'patch']:
                         description += f"{method.upper()} {path}\n"
                         description += f"  {details.get('summary', '')}\n"
-                        if 'requestBody' in details:
+                        body_schema = request_body_schema(details)
+                        if 'requestBody' in details or body_schema is not None:
                             description += "  Request body required\n"
+                        if body_schema is not None:
+                            description += f"    Schema: {describe_schema(body_schema)}\n"
                         if 'responses' in details:
                             description += "  Responses:\n"
                             for status, response in details['responses'].items():
                                 description += f"    {status}: {response.get('description', '')}\n"
+                                schema = response_schema(response)
+                                if schema is not None:
+                                    description += f"      Schema: {describe_schema(schema)}\n"
         
         return description
 
@@ -0,0 +1,138 @@
+"""
+Удаление markdown-обрамления (```python ... ```) из ответов LLM
+"""
+from typing import AsyncIterator
+
+
+def strip_code_fence(code: str) -> str:
+    """
+    Извлекает код из markdown-блока в полном ответе LLM
+
+    Args:
+        code: Ответ LLM
+
+    Returns:
+        Код без markdown-обрамления
+    """
+    if "```python" in code:
+        code = code.split("```python")[1].split("```")[0]
+    elif "```" in code:
+        code = code.split("```")[1].split("```")[0]
+    return code.strip()
+
+
+def _is_fence(line: str) -> bool:
+    return line.strip().startswith("```")
+
+
+def _looks_like_code(line: str) -> bool:
+    return line.lstrip().startswith(("import ", "from ", "@", "def ", "class ", "#", "async def "))
+
+
+class StreamingCodeFenceStripper:
+    """
+    Потоковое удаление markdown-обрамления
+
+    Принимает фрагменты ответа LLM по мере поступления и сразу возвращает
+    ту часть, которая точно является кодом. Вводный текст до открывающего
+    ``` отбрасывается, как и все после закрывающего. Неполная строка
+    придерживается только если она может оказаться началом ```.
+    """
+
+    # Сколько вводного текста без кода придерживать, прежде чем считать его кодом
+    MAX_PREAMBLE_CHARS = 2000
+
+    def __init__(self):
+        self._state = "before"
+        self._pending = ""
+        self._preamble = ""
+        self._emitted = []
+
+    @property
+    def code(self) -> str:
+        """Весь выданный к этому моменту код"""
+        return "".join(self._emitted).strip()
+
+    def feed(self, chunk: str) -> str:
+        """
+        Обрабатывает очередной фрагмент ответа
+
+        Args:
+            chunk: Фрагмент текста от LLM
+
+        Returns:
+            Текст, который можно сразу отдать клиенту (может быть пустым)
+        """
+        out = []
+        self._pending += chunk
+        while "\n" in self._pending and self._state != "done":
+            line, self._pending = self._pending.split("\n", 1)
+            out.append(self._process_line(line + "\n"))
+
+        if self._state == "done":
+            self._pending = ""
+        elif self._state in ("inside", "plain") and self._pending and not self._may_be_fence(self._pending):
+            out.append(self._pending)
+            self._pending = ""
+        return self._emit("".join(out))
+
+    def finish(self) -> str:
+        """
+        Завершает поток и возвращает оставшийся код
+
+        Если открывающий ``` так и не встретился, весь ответ считается кодом.
+        """
+        out = ""
+        if self._state == "before":
+            out = self._preamble + self._pending
+        elif self._state in ("inside", "plain") and not _is_fence(self._pending):
+            out = self._pending
+        self._preamble = ""
+        self._pending = ""
+        self._state = "done"
+        return self._emit(out)
+
+    def _process_line(self, line: str) -> str:
+        if self._state == "before":
+            if _is_fence(line):
+                self._preamble = ""
+                self._state = "inside"
+                return ""
+            self._preamble += line
+            if _looks_like_code(line) or len(self._preamble) > self.MAX_PREAMBLE_CHARS:
+                self._state = "plain"
+                out, self._preamble = self._preamble, ""
+                return out
+            return ""
+        if _is_fence(line):
+            # В режиме без обрамления ``` открывает блок, внутри блока — закрывает
+            self._state = "inside" if self._state == "plain" else "done"
+            return ""
+        return line
+
+    @staticmethod
+    def _may_be_fence(partial: str) -> bool:
+        stripped = partial.lstrip()
+        return stripped.startswith("```") or "```".startswith(stripped)
+
+    def _emit(self, text: str) -> str:
+        if text:
+            self._emitted.append(text)
+        return text
+
+
+async def strip_code_fence_stream(chunks: AsyncIterator[str]) -> AsyncIterator[str]:
+    """
+    Применяет StreamingCodeFenceStripper к потоку фрагментов ответа LLM
+
+    Yields:
+        Фрагменты кода без markdown-обрамления
+    """
+    stripper = StreamingCodeFenceStripper()
+    async for chunk in chunks:
+        text = stripper.feed(chunk)
+        if text:
+            yield text
+    tail = stripper.finish()
+    if tail:
+        yield tail
@@ -0,0 +1,144 @@
+"""
+Слияние нескольких сгенерированных модулей тестов в один
+"""
+from typing import Dict, List, Set, Tuple
+import ast
+import re
+
+
+def _segment(lines: List[str], node: ast.stmt) -> str:
+    """Исходный код узла верхнего уровня с декораторами и комментариями над ним"""
+    start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])])
+    while start > 1 and lines[start - 2].lstrip().startswith("#"):
+        start -= 1
+    return "\n".join(lines[start - 1:node.end_lineno])
+
+
+def _is_fixture(node: ast.AST) -> bool:
+    for decorator in getattr(node, "decorator_list", []):
+        target = decorator.func if isinstance(decorator, ast.Call) else decorator
+        if ast.unparse(target) in ("pytest.fixture", "fixture"):
+            return True
+    return False
+
+
+def _is_test(node: ast.AST) -> bool:
+    if isinstance(node, ast.ClassDef):
+        return node.name.startswith("Test")
+    return node.name.startswith("test") and not _is_fixture(node)
+
+
+def _assigned_names(node: ast.stmt) -> Set[str]:
+    return {
+        item.id for item in ast.walk(node)
+        if isinstance(item, ast.Name) and isinstance(item.ctx, ast.Store)
+    }
+
+
+def _rename(segment: str, old: str, new: str) -> str:
+    return re.sub(rf"\b(def|class)\s+{re.escape(old)}\b", rf"\1 {new}", segment, count=1)
+
+
+def merge_test_modules(parts: List[Tuple[str, str]]) -> str:
+    """
+    Объединяет модули тестов, сгенерированные по частям, в один модуль
+
+    Импорты собираются в начало без повторов (`from x import a` и
+    `from x import b` сливаются в `from x import a, b`). Фикстуры, функции-
+    помощники, классы не-тестов и константы с одинаковым именем берутся из
+    первого модуля, где они встретились. Тесты с совпадающими именами
+    переименовываются (`test_get_vm_2`). Модуль с синтаксической ошибкой
+    добавляется как есть.
+
+    Args:
+        parts: Пары (название части, код модуля) в нужном порядке
+
+    Returns:
+        Код объединенного модуля
+    """
+    docstring = None
+    future: Dict[str, None] = {}
+    imports: Dict[str, None] = {}
+    from_imports: Dict[Tuple[int, str], Dict[str, None]] = {}
+    defined: Set[str] = set()
+    tests: Set[str] = set()
+    seen_statements: Set[str] = set()
+    sections: List[Tuple[str, List[str]]] = []
+
+    for title, code in parts:
+        try:
+            tree = ast.parse(code)
+        except SyntaxError:
+            sections.append((
+                f"{title} (код не разобран из-за синтаксической ошибки, добавлен без изменений)",
+                [code.strip()]
+            ))
+            continue
+
+        lines = code.splitlines()
+        body = tree.body
+        if body and isinstance(body[0], ast.Expr) and isinstance(getattr(body[0], "value", None), ast.Constant) \
+                and isinstance(body[0].value.value, str):
+            if docstring is None:
+                docstring = _segment(lines, body[0])
+            body = body[1:]
+
+        segments = []
+        for node in body:
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    imports[ast.unparse(ast.Import(names=[alias]))] = None
+            elif isinstance(node, ast.ImportFrom):
+                names = [alias.name + (f" as {alias.asname}" if alias.asname else "") for alias in node.names]
+                if node.module == "__future__":
+                    future.update(dict.fromkeys(names))
+                else:
+                    from_imports.setdefault((node.level, node.module or ""), {}).update(dict.fromkeys(names))
+            elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                segment = _segment(lines, node)
+                if _is_test(node):
+                    name = node.name
+                    number = 2
+                    while name in tests:
+                        name = f"{node.name}_{number}"
+                        number += 1
+                    tests.add(name)
+                    segments.append(_rename(segment, node.name, name) if name != node.name else segment)
+                elif node.name not in defined:
+                    defined.add(node.name)
+                    segments.append(segment)
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                names = _assigned_names(node)
+                if names and names <= defined:
+                    continue
+                defined.update(names)
+                segments.append(_segment(lines, node))
+            else:
+                segment = _segment(lines, node)
+                if segment not in seen_statements:
+                    seen_statements.add(segment)
+                    segments.append(segment)
+        sections.append((title, segments))
+
+    header = []
+    if future:
+        header.append(f"from __future__ import {', '.join(future)}")
+    header.extend(imports)
+    for (level, module), names in from_imports.items():
+        prefix = f"from {'.' * level}{module} import "
+        if "*" in names:
+            # `import *` нельзя перечислять вместе с другими именами
+            header.append(prefix + "*")
+            names = [name for name in names if name != "*"]
+        if names:
+            header.append(prefix + ", ".join(names))
+
+    blocks = []
+    if docstring:
+        blocks.append(docstring)
+    if header:
+        blocks.append("\n".join(header))
+    for title, segments in sections:
+        if segments:
+            blocks.append(f"# --- {title} ---\n" + "\n\n\n".join(segments))
+    return "\n\n\n".join(blocks) + "\n" if blocks else ""
@@ -0,0 +1,218 @@
+"""
+Векторная матрица покрытия требований тест-кейсами (hashing TF-IDF на NumPy)
+"""
+from typing import List, Dict, Any, Tuple
+import re
+import zlib
+import numpy as np
+
+
+_ITEM_SPLIT_RE = re.compile(r"\n+|;|(?<=[.!?])\s+")
+_BULLET_RE = re.compile(r"^\s*(?:[-*•]+|\d+[.)])\s*")
+_TOKEN_RE = re.compile(r"[^\W\d_]+")
+
+# Слова, не несущие смысла для сопоставления требований и тестов
+STOP_WORDS = {
+    "и", "в", "во", "на", "с", "со", "по", "для", "не", "что", "как", "при", "или",
+    "а", "к", "от", "до", "из", "за", "то", "это", "быть", "должен", "должна", "должно",
+    "the", "a", "an", "and", "or", "to", "of", "in", "on", "for", "is", "be", "with",
+    "def", "self", "class", "import", "from", "return", "pass", "none", "true", "false",
+    "assert", "allure", "step", "pytest", "mark", "test", "manual", "label", "title",
+}
+
+
+def split_requirements(requirements: str) -> List[str]:
+    """
+    Разбивает текст требований на атомарные пункты
+
+    Пункты разделяются переводами строк, маркерами списков, `;` и концом предложения.
+    """
+    items = []
+    for raw in _ITEM_SPLIT_RE.split(requirements):
+        item = _BULLET_RE.sub("", raw).strip()
+        if len(_TOKEN_RE.findall(item)) >= 2:
+            items.append(item)
+    return items
+
+
+class HashingTfidfVectorizer:
+    """
+    TF-IDF без словаря: признаки хэшируются в `n_features` измерений со знаком
+
+    Слова обрезаются до `stem_length` символов — грубый стемминг, которого
+    достаточно для русских словоформ («авторизация»/«авторизации»).
+    """
+
+    def __init__(self, n_features: int = 512, stem_length: int = 6, bigrams: bool = False):
+        self.n_features = n_features
+        self.stem_length = stem_length
+        self.bigrams = bigrams
+        self._term_codes: Dict[str, int] = {}
+
+    def _terms(self, text: str) -> List[str]:
+        words = [
+            w[:self.stem_length]
+            for w in _TOKEN_RE.findall(text.lower())
+            if w not in STOP_WORDS
+        ]
+        if self.bigrams:
+            words += [f"{a} {b}" for a, b in zip(words, words[1:])]
+        return words
+
+    def _code(self, term: str) -> int:
+        """Код термина: индекс признака * 2 + бит знака"""
+        h = zlib.crc32(term.encode("utf-8"))
+        code = (h % self.n_features) * 2 + (h >> 31)
+        self._term_codes[term] = code
+        return code
+
+    def term_frequencies(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Знаковые сублинейные частоты признаков батча документов
+
+        Returns:
+            Разреженная матрица в формате (строки, признаки, значения)
+        """
+        codes_cache = self._term_codes
+        codes: List[int] = []
+        lengths = []
+        for text in texts:
+            terms = self._terms(text)
+            codes.extend([codes_cache[t] if t in codes_cache else self._code(t) for t in terms])
+            lengths.append(len(terms))
+
+        width = 2 * self.n_features
+        rows = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+        keys, counts = np.unique(rows * width + np.array(codes, dtype=np.int64), return_counts=True)
+        signs = np.where(keys & 1, 1.0, -1.0)
+        weights = signs * (1.0 + np.log(counts))
+
+        # Термины с разным знаком могут попасть в один признак — суммируем
+        cells, inverse = np.unique(keys >> 1, return_inverse=True)
+        values = np.bincount(inverse, weights=weights).astype(np.float32)
+        return cells // self.n_features, cells % self.n_features, values
+
+    def to_dense(
+        self,
+        frequencies: Tuple[np.ndarray, np.ndarray, np.ndarray],
+        n_rows: int,
+        idf: np.ndarray
+    ) -> np.ndarray:
+        """Плотная L2-нормированная TF-IDF матрица (n_rows, n_features)"""
+        rows, cols, values = frequencies
+        matrix = np.zeros((n_rows, self.n_features), dtype=np.float32)
+        matrix[rows, cols] = values * idf[cols]
+        norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))[:, None]
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+class CoverageEngine:
+    """
+    Матрица сходства «требование × тест-кейс»
+
+    Требования и тест-кейсы векторизуются одним hashing TF-IDF, сходство
+    считается батчами матричных умножений по тест-кейсам, поэтому полная
+    матрица никогда не хранится в памяти.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.15,
+        n_features: int = 512,
+        batch_size: int = 1024,
+        top_k: int = 3
+    ):
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.top_k = top_k
+        self.vectorizer = HashingTfidfVectorizer(n_features=n_features)
+
+    def analyze(self, requirement_items: List[str], test_cases: List[str]) -> Dict[str, Any]:
+        """
+        Считает покрытие требований тест-кейсами
+
+        Args:
+            requirement_items: Атомарные пункты требований (см. split_requirements)
+            test_cases: Список тест-кейсов
+
+        Returns:
+            {
+                "coverage_percentage": доля покрытых пунктов,
+                "requirements": [{"index", "text", "score", "covered", "best_test", "tests"}],
+                "uncovered_requirements": индексы непокрытых пунктов,
+                "orphan_tests": индексы тестов, не покрывающих ни одного пункта,
+                ...
+            }
+        """
+        vectorizer = self.vectorizer
+        n_req, n_tests = len(requirement_items), len(test_cases)
+
+        # Первый проход: частоты терминов и документная частота признаков
+        req_tf = vectorizer.term_frequencies(requirement_items)
+        batches = [
+            (start, len(test_cases[start:start + self.batch_size]),
+             vectorizer.term_frequencies(test_cases[start:start + self.batch_size]))
+            for start in range(0, n_tests, self.batch_size)
+        ]
+        df = np.bincount(req_tf[1], minlength=vectorizer.n_features).astype(np.float64)
+        for _, _, tf in batches:
+            df += np.bincount(tf[1], minlength=vectorizer.n_features)
+        idf = (np.log((1 + n_req + n_tests) / (1 + df)) + 1).astype(np.float32)
+        req_matrix = vectorizer.to_dense(req_tf, n_req, idf)
+
+        k = min(self.top_k, n_tests)
+        best_scores = np.full((n_req, k), -1.0, dtype=np.float32)
+        best_tests = np.full((n_req, k), -1, dtype=np.int64)
+        test_best = np.zeros(n_tests, dtype=np.float32)
+        rows = np.arange(n_req)
+        # Буфер сходства переиспользуется между батчами, чтобы не выделять память заново
+        buffer = np.empty((n_req, min(self.batch_size, n_tests)), dtype=np.float32)
+
+        # Второй проход: сходство батчами и накопление top-k по каждому требованию
+        for start, size, tf in batches:
+            batch = vectorizer.to_dense(tf, size, idf)
+            scores = np.matmul(req_matrix, batch.T, out=buffer[:, :size])
+            if not n_req:
+                continue
+            test_best[start:start + size] = scores.max(axis=0)
+            # top-k батча за k проходов argmax (дешевле argpartition по всей матрице)
+            take = min(k, size)
+            candidates = np.empty((n_req, take), dtype=np.int64)
+            values = np.empty((n_req, take), dtype=np.float32)
+            for j in range(take):
+                candidates[:, j] = scores.argmax(axis=1)
+                values[:, j] = scores[rows, candidates[:, j]]
+                scores[rows, candidates[:, j]] = -np.inf
+            merged_scores = np.concatenate([best_scores, values], axis=1)
+            merged_tests = np.concatenate([best_tests, candidates + start], axis=1)
+            order = np.argsort(-merged_scores, axis=1, kind="stable")[:, :k]
+            best_scores = np.take_along_axis(merged_scores, order, axis=1)
+            best_tests = np.take_along_axis(merged_tests, order, axis=1)
+
+        requirements = []
+        for index, text in enumerate(requirement_items):
+            score = float(best_scores[index, 0]) if k else 0.0
+            requirements.append({
+                "index": index,
+                "text": text,
+                "score": round(max(score, 0.0), 4),
+                "covered": score >= self.threshold,
+                "best_test": int(best_tests[index, 0]) if k else None,
+                "tests": [
+                    int(t) for t, s in zip(best_tests[index], best_scores[index])
+                    if t >= 0 and s >= self.threshold
+                ]
+            })
+
+        covered = sum(1 for r in requirements if r["covered"])
+        return {
+            "requirements_total": n_req,
+            "tests_total": n_tests,
+            "covered_count": covered,
+            "coverage_percentage": round(covered / n_req * 100, 2) if n_req else 0.0,
+            "threshold": self.threshold,
+            "requirements": requirements,
+            "uncovered_requirements": [r["index"] for r in requirements if not r["covered"]],
+            "orphan_tests": np.flatnonzero(test_best < self.threshold).tolist() if n_req else list(range(n_tests))
+        }
@@ -0,0 +1,219 @@
+"""
+Локальный поиск почти-дубликатов тест-кейсов (шинглы + MinHash + LSH)
+"""
+from typing import List, Dict, Any, Tuple
+import re
+import zlib
+import numpy as np
+
+
+_COMMENT_RE = re.compile(r"#[^\n]*")
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# Множители для комбинирования хэшей токенов в хэш шингла
+_SHINGLE_MULTIPLIERS = np.array(
+    [0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9,
+     0xD6E8FEB86659FD93, 0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53,
+     0x94D049BB133111EB, 0xBF58476D1CE4E5B9],
+    dtype=np.uint64
+)
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: Dict[int, int] = {}
+
+    def find(self, x: int) -> int:
+        root = self.parent.setdefault(x, x)
+        while root != self.parent[root]:
+            root = self.parent[root]
+        while self.parent[x] != root:
+            self.parent[x], x = root, self.parent[x]
+        return root
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+class DuplicateDetector:
+    """
+    Поиск почти-дубликатов среди тест-кейсов за почти линейное время
+
+    Каждый тест-кейс нормализуется (без комментариев, в нижнем регистре),
+    разбивается на шинглы из `shingle_size` токенов и сворачивается в
+    MinHash-сигнатуру. Кандидаты в дубликаты находятся LSH-бакетами по полосам
+    сигнатуры и проверяются по оценке сходства Жаккара.
+    """
+
+    # Бакет большего размера сравнивается со своим первым элементом, а не попарно
+    MAX_BUCKET_PAIRWISE = 50
+    # Сколько шинглов обрабатывать за один векторизованный шаг
+    CHUNK_SHINGLES = 8_192
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 128,
+        shingle_size: int = 4,
+        seed: int = 42
+    ):
+        if not 0 < threshold <= 1:
+            raise ValueError("threshold должен быть в диапазоне (0, 1]")
+        if not 1 <= shingle_size <= len(_SHINGLE_MULTIPLIERS):
+            raise ValueError(f"shingle_size должен быть от 1 до {len(_SHINGLE_MULTIPLIERS)}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = self._choose_bands(threshold, num_perm)
+
+        rng = np.random.default_rng(seed)
+        # Multiply-shift хэширование: (a * x + b) >> 32, a нечетное
+        self._perm_a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._perm_b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+        self._token_hashes: Dict[str, int] = {}
+
+    @staticmethod
+    def _choose_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+        """
+        Подбирает число полос и строк так, чтобы порог LSH был чуть ниже threshold
+
+        Ложные кандидаты отсеиваются проверкой, поэтому предпочитаем полноту.
+        """
+        best = (num_perm, 1)
+        for rows in range(1, num_perm + 1):
+            if num_perm % rows:
+                continue
+            bands = num_perm // rows
+            if (1 / bands) ** (1 / rows) <= threshold:
+                best = (bands, rows)
+        return best
+
+    def normalize(self, test_case: str) -> List[str]:
+        """Нормализует тест-кейс в список токенов"""
+        return _TOKEN_RE.findall(_COMMENT_RE.sub(" ", test_case).lower())
+
+    def _shingle_hashes(self, tokens: List[str]) -> np.ndarray:
+        if not tokens:
+            return np.zeros(1, dtype=np.uint64)
+        cache = self._token_hashes
+        for token in set(tokens).difference(cache):
+            cache[token] = zlib.crc32(token.encode("utf-8")) + 1
+        hashes = list(map(cache.__getitem__, tokens))
+
+        token_hashes = np.array(hashes, dtype=np.uint64)
+        k = min(self.shingle_size, len(token_hashes))
+        count = len(token_hashes) - k + 1
+        shingles = np.zeros(count, dtype=np.uint64)
+        for offset in range(k):
+            shingles ^= token_hashes[offset:offset + count] * _SHINGLE_MULTIPLIERS[offset]
+        return np.unique(shingles)
+
+    def signatures(self, test_cases: List[str]) -> np.ndarray:
+        """
+        Вычисляет MinHash-сигнатуры
+
+        Returns:
+            Матрица (len(test_cases), num_perm) типа uint32
+        """
+        result = np.empty((len(test_cases), self.num_perm), dtype=np.uint32)
+        b = self._perm_b[:, None]
+        shift = np.uint64(32)
+        buffer = np.empty(0, dtype=np.uint64)
+
+        start = 0
+        while start < len(test_cases):
+            chunk, lengths, total = [], [], 0
+            end = start
+            while end < len(test_cases) and (total < self.CHUNK_SHINGLES or not chunk):
+                shingles = self._shingle_hashes(self.normalize(test_cases[end]))
+                chunk.append(shingles)
+                lengths.append(len(shingles))
+                total += len(shingles)
+                end += 1
+
+            values = np.concatenate(chunk)
+            offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            # Переиспользуем буфер между шагами, чтобы не выделять память заново
+            if buffer.size < self.num_perm * len(values):
+                buffer = np.empty(self.num_perm * len(values), dtype=np.uint64)
+            hashed = buffer[:self.num_perm * len(values)].reshape(self.num_perm, len(values))
+            np.multiply.outer(self._perm_a, values, out=hashed)
+            hashed += b
+            hashed >>= shift
+            result[start:end] = np.minimum.reduceat(hashed.astype(np.uint32), offsets, axis=1).T
+            start = end
+        return result
+
+    def _candidate_pairs(self, signatures: np.ndarray) -> np.ndarray:
+        n = len(signatures)
+        pairs = set()
+        for band in range(self.bands):
+            block = signatures[:, band * self.rows:(band + 1) * self.rows].astype(np.uint64)
+            keys = np.zeros(n, dtype=np.uint64)
+            for column in range(self.rows):
+                keys = (keys ^ block[:, column]) * np.uint64(0x100000001B3)
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            boundaries = np.flatnonzero(np.diff(sorted_keys)) + 1
+            for bucket in np.split(order, boundaries):
+                if len(bucket) < 2:
+                    continue
+                members = bucket.tolist()
+                if len(members) <= self.MAX_BUCKET_PAIRWISE:
+                    for i, first in enumerate(members):
+                        for second in members[i + 1:]:
+                            pairs.add((first, second) if first < second else (second, first))
+                else:
+                    head = members[0]
+                    for other in members[1:]:
+                        pairs.add((head, other) if head < other else (other, head))
+        if not pairs:
+            return np.empty((0, 2), dtype=np.int64)
+        return np.array(sorted(pairs), dtype=np.int64)
+
+    def find_clusters(self, test_cases: List[str]) -> List[Dict[str, Any]]:
+        """
+        Находит кластеры почти-дубликатов
+
+        Args:
+            test_cases: Список тест-кейсов
+
+        Returns:
+            Кластеры, отсортированные по убыванию сходства:
+            {"test_cases": [индексы], "similarity": среднее сходство, "pairs": [...]}
+        """
+        if len(test_cases) < 2:
+            return []
+
+        signatures = self.signatures(test_cases)
+        candidates = self._candidate_pairs(signatures)
+        if not len(candidates):
+            return []
+
+        similarity = (signatures[candidates[:, 0]] == signatures[candidates[:, 1]]).mean(axis=1)
+        keep = similarity >= self.threshold
+
+        union_find = _UnionFind()
+        cluster_pairs: Dict[int, List[Dict[str, Any]]] = {}
+        verified = [(int(i), int(j), float(s)) for (i, j), s in zip(candidates[keep], similarity[keep])]
+        for i, j, _ in verified:
+            union_find.union(i, j)
+        for i, j, score in verified:
+            cluster_pairs.setdefault(union_find.find(i), []).append({
+                "test_case_1": i,
+                "test_case_2": j,
+                "similarity": round(score, 4)
+            })
+
+        clusters = []
+        for pairs in cluster_pairs.values():
+            members = sorted({p["test_case_1"] for p in pairs} | {p["test_case_2"] for p in pairs})
+            clusters.append({
+                "test_cases": members,
+                "similarity": round(sum(p["similarity"] for p in pairs) / len(pairs), 4),
+                "pairs": pairs
+            })
+        clusters.sort(key=lambda c: (-c["similarity"], c["test_cases"][0]))
+        return clusters
@@ -0,0 +1,181 @@
+"""
+Инкрементальная перегенерация тестов по изменениям OpenAPI спецификации
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import hashlib
+import os
+
+from .code_merge import merge_test_modules
+from .llm_cache import LLMResponseCache
+from .openapi_parser import OpenAPIParser
+from .openapi_fanout import group_endpoints
+from .spec_diff import diff_fingerprints, fingerprint_operations, operation_key
+
+
+_generated_tests_cache: Optional[LLMResponseCache] = None
+
+
+def get_generated_tests_cache() -> Optional[LLMResponseCache]:
+    """
+    Возвращает общий для процесса кэш кода, сгенерированного по группам операций
+
+    Настраивается переменными окружения GENERATED_TESTS_CACHE_ENABLED,
+    GENERATED_TESTS_CACHE_MAX_ENTRIES, GENERATED_TESTS_CACHE_TTL и
+    GENERATED_TESTS_CACHE_DB_PATH.
+
+    Returns:
+        Экземпляр кэша или None, если кэш выключен
+    """
+    global _generated_tests_cache
+    if os.getenv("GENERATED_TESTS_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if _generated_tests_cache is None:
+        _generated_tests_cache = LLMResponseCache(
+            max_entries=int(os.getenv("GENERATED_TESTS_CACHE_MAX_ENTRIES", "8192")),
+            ttl_seconds=float(os.getenv("GENERATED_TESTS_CACHE_TTL", "2592000")),
+            db_path=os.getenv("GENERATED_TESTS_CACHE_DB_PATH") or None,
+            table="generated_tests"
+        )
+    return _generated_tests_cache
+
+
+def make_generation_key(kind: str, fingerprint: str, context: str = "") -> str:
+    """
+    Ключ кэша кода группы операций
+
+    Args:
+        kind: Вид генерации ("api-tests")
+        fingerprint: Хэш группы операций (см. group_fingerprint)
+        context: Все, что еще влияет на результат: base_url, тест-кейсы, промпт
+
+    Returns:
+        SHA-256 от вида генерации, контекста и хэша группы
+    """
+    payload = f"{kind}\0{context}\0{fingerprint}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def group_fingerprint(operations: List[str], fingerprints: Dict[str, str]) -> str:
+    """Хэш группы: состав операций и хэш каждой из них"""
+    payload = "\n".join(f"{operation}\0{fingerprints[operation]}" for operation in operations)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def regenerate_incrementally(
+    previous_spec: Optional[Dict[str, Any]],
+    spec: Dict[str, Any],
+    generate_group: Callable[[Dict[str, Any]], Awaitable[str]],
+    kind: str,
+    context: str = "",
+    group_by: str = "tag",
+    max_group_size: Optional[int] = None,
+    concurrency: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Перегенерирует код только для групп операций с изменениями и собирает модуль
+
+    Операции делятся на группы так же, как при fan-out генерации
+    (group_endpoints); каждая группа генерируется одним запросом к LLM и
+    кэшируется по хэшу входящих в нее операций. Что перегенерировать, решает
+    diff версий: группа с добавленными или измененными операциями генерируется
+    заново, код группы из одних неизмененных операций берется из кэша. Если
+    его там нет (вытеснен или изменился состав группы), группа тоже
+    генерируется, а ее операции попадают в "cache_misses". Удаленные операции
+    в модуль не попадают. Одновременно выполняется не больше `concurrency`
+    генераций (по умолчанию OPENAPI_FANOUT_CONCURRENCY, 8).
+
+    Args:
+        previous_spec: Предыдущая версия спецификации (None — все операции новые)
+        spec: Новая версия спецификации
+        generate_group: Корутина генерации кода по спецификации группы операций
+        kind, context: См. make_generation_key
+        group_by, max_group_size: См. group_endpoints; max_group_size=1 —
+            генерация по одной операции
+        concurrency: Лимит одновременных генераций
+
+    Returns:
+        {"diff": {"added", "changed", "removed", "unchanged"},
+        "groups": [{"name", "operations", "status"}], "regenerated", "reused",
+        "cache_misses", "failed": [{"group", "operations", "error"}], "code",
+        "success"}
+
+    Raises:
+        ValueError: В спецификации нет endpoints
+    """
+    fingerprints = fingerprint_operations(spec)
+    if not fingerprints:
+        raise ValueError("В спецификации нет endpoints для генерации")
+    previous = fingerprint_operations(previous_spec) if previous_spec is not None else {}
+    diff = diff_fingerprints(previous, fingerprints)
+    unchanged = set(diff["unchanged"])
+
+    groups = [
+        {
+            "name": group["name"],
+            "operations": [operation_key(method, path) for path, method in group["operations"]],
+            "pairs": group["operations"]
+        }
+        for group in group_endpoints(spec, group_by, max_group_size)
+    ]
+    cache = get_generated_tests_cache()
+    codes: Dict[int, str] = {}
+    missing: List[int] = []
+    cache_missed: List[int] = []
+    for number, group in enumerate(groups):
+        group["key"] = make_generation_key(kind, group_fingerprint(group["operations"], fingerprints), context)
+        if not all(operation in unchanged for operation in group["operations"]):
+            missing.append(number)
+            continue
+        cached = await cache.aget(group["key"]) if cache is not None else None
+        if cached is None:
+            missing.append(number)
+            cache_missed.append(number)
+        else:
+            codes[number] = cached
+            group["status"] = "reused"
+
+    if concurrency is None:
+        concurrency = int(os.getenv("OPENAPI_FANOUT_CONCURRENCY", "8"))
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    parser = OpenAPIParser()
+
+    async def run(number: int) -> str:
+        group = groups[number]
+        async with semaphore:
+            code = await generate_group(parser.subset_spec(spec, group["pairs"]))
+        if cache is not None:
+            await cache.aset(group["key"], code)
+        return code
+
+    results = await asyncio.gather(*(run(number) for number in missing), return_exceptions=True)
+    failed = []
+    for number, result in zip(missing, results):
+        group = groups[number]
+        if isinstance(result, BaseException):
+            group["status"] = "failed"
+            failed.append({"group": group["name"], "operations": group["operations"], "error": f"Ошибка генерации: {result}"})
+        else:
+            group["status"] = "regenerated"
+            codes[number] = result
+
+    def operations_with(status: str) -> List[str]:
+        return [operation for group in groups if group["status"] == status for operation in group["operations"]]
+
+    merged = merge_test_modules([(groups[number]["name"], codes[number]) for number in sorted(codes)])
+    return {
+        "diff": diff,
+        "groups": [
+            {"name": group["name"], "operations": group["operations"], "status": group["status"]}
+            for group in groups
+        ],
+        "regenerated": operations_with("regenerated"),
+        "reused": operations_with("reused"),
+        "cache_misses": [
+            operation for number in cache_missed if groups[number]["status"] == "regenerated"
+            for operation in groups[number]["operations"]
+        ],
+        "failed": failed,
+        "code": merged,
+        "success": not failed
+    }
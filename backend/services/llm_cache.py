@@ -0,0 +1,235 @@
+"""
+Кэш ответов LLM с адресацией по содержимому запроса
+"""
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+
+def make_cache_key(
+    model: str,
+    system_prompt: Optional[str],
+    prompt: str,
+    temperature: float,
+    max_tokens: int
+) -> str:
+    """
+    Вычисляет ключ кэша по параметрам запроса к LLM
+
+    Промпты нормализуются (обрезаются пробелы по краям), чтобы
+    незначащие различия не давали промахов.
+
+    Returns:
+        SHA-256 хэш нормализованного запроса
+    """
+    payload = json.dumps(
+        [
+            model,
+            (system_prompt or "").strip(),
+            prompt.strip(),
+            round(float(temperature), 4),
+            int(max_tokens)
+        ],
+        ensure_ascii=False,
+        separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Двухуровневый кэш ответов LLM
+
+    Первый уровень — LRU в памяти процесса с ограничением размера и TTL.
+    Второй (опциональный) — SQLite-файл, переживающий перезапуск сервиса.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 86400,
+        db_path: Optional[str] = None,
+        table: str = "llm_cache"
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_path = db_path
+        # Имя таблицы SQLite: один класс хранит и ответы LLM, и результаты проверок
+        self.table = table
+        self._memory: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+            "bypassed": 0
+        }
+
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds > 0 and (now - created_at) > self.ttl_seconds
+
+    def _remember(self, key: str, value: str, created_at: float) -> None:
+        """Кладет значение в LRU, вытесняя самые старые записи"""
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Возвращает ответ из кэша или None
+
+        Args:
+            key: Ключ из make_cache_key
+
+        Returns:
+            Закэшированный ответ или None при промахе
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._is_expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created_at = row
+                    if not self._is_expired(created_at, now):
+                        self._remember(key, value, created_at)
+                        self._stats["disk_hits"] += 1
+                        return value
+                    self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str) -> None:
+        """Сохраняет ответ в кэш"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self._stats["sets"] += 1
+            if self._db is not None:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, value, now)
+                )
+                self._db.commit()
+
+    async def aget(self, key: str) -> Optional[str]:
+        """Асинхронный get: обращение к SQLite выполняется вне event loop"""
+        if self._db is None:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: str) -> None:
+        """Асинхронный set: запись в SQLite выполняется вне event loop"""
+        if self._db is None:
+            self.set(key, value)
+        else:
+            await asyncio.to_thread(self.set, key, value)
+
+    def record_bypass(self) -> None:
+        """Учитывает запрос, выполненный в обход кэша"""
+        with self._lock:
+            self._stats["bypassed"] += 1
+
+    def invalidate(self, key: Optional[str] = None) -> int:
+        """
+        Удаляет записи из кэша
+
+        Args:
+            key: Ключ записи; если не указан — очищается весь кэш
+
+        Returns:
+            Количество удаленных записей
+        """
+        with self._lock:
+            if key is None:
+                removed = len(self._memory)
+                self._memory.clear()
+                if self._db is not None:
+                    removed = max(removed, self._db.execute(f"DELETE FROM {self.table}").rowcount)
+                    self._db.commit()
+                return removed
+
+            removed = 1 if self._memory.pop(key, None) is not None else 0
+            if self._db is not None:
+                removed = max(
+                    removed,
+                    self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,)).rowcount
+                )
+                self._db.commit()
+            return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий/промахов и параметры кэша"""
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            disk_entries = None
+            if self._db is not None:
+                disk_entries = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+            return {
+                **self._stats,
+                "hits": hits,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self._db is not None
+            }
+
+
+_llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> Optional[LLMResponseCache]:
+    """
+    Возвращает общий для процесса кэш ответов LLM
+
+    Настраивается переменными окружения CLOUD_RU_CACHE_ENABLED,
+    CLOUD_RU_CACHE_MAX_ENTRIES, CLOUD_RU_CACHE_TTL и CLOUD_RU_CACHE_DB_PATH.
+
+    Returns:
+        Экземпляр кэша или None, если кэш выключен
+    """
+    global _llm_cache
+    if os.getenv("CLOUD_RU_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache(
+            max_entries=int(os.getenv("CLOUD_RU_CACHE_MAX_ENTRIES", "1024")),
+            ttl_seconds=float(os.getenv("CLOUD_RU_CACHE_TTL", "86400")),
+            db_path=os.getenv("CLOUD_RU_CACHE_DB_PATH") or None
+        )
+    return _llm_cache
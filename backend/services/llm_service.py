@@ -2,13 +2,17 @@
 Сервис для работы с Cloud.ru Evolution Foundation Model
 """
 import os
-import json
-import requests
+import asyncio
 from pathlib import Path
-from openai import OpenAI
-from typing import Optional, Dict, Any
+import httpx
+from openai import AsyncOpenAI
+from typing import Optional, Dict, Any, AsyncIterator
 from dotenv import load_dotenv
 
+from .llm_cache import get_llm_cache, make_cache_key
+from .loop_bound_client import LoopBoundClient
+from .singleflight import SingleFlight
+
 # Загружаем .env из директории backend
 env_path = Path(__file__).parent.parent / '.env'
 load_dotenv(dotenv_path=env_path)
@@ -16,6 +20,52 @@ load_dotenv(dotenv_path=env_path)
 load_dotenv()
 
 
+# Запросы к LLM, выполняющиеся в данный момент (для объединения дубликатов)
+_inflight_requests = SingleFlight()
+
+
+def _http_timeout(total: Optional[float] = None) -> httpx.Timeout:
+    """Таймауты HTTP-клиента из переменных окружения"""
+    read_timeout = total if total is not None else float(os.getenv("CLOUD_RU_TIMEOUT", "120"))
+    connect_timeout = float(os.getenv("CLOUD_RU_CONNECT_TIMEOUT", "10"))
+    return httpx.Timeout(read_timeout, connect=min(connect_timeout, read_timeout))
+
+
+# Общий пул HTTP-соединений для всех экземпляров LLMService.
+# Клиент привязан к event loop, поэтому при смене цикла (например, в тестах
+# с asyncio.run) пул пересоздается, а прежний закрывается.
+def _create_http_client() -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("CLOUD_RU_MAX_CONNECTIONS", "32")),
+        max_keepalive_connections=int(os.getenv("CLOUD_RU_MAX_KEEPALIVE", "16")),
+        keepalive_expiry=float(os.getenv("CLOUD_RU_KEEPALIVE_EXPIRY", "60")),
+    )
+    return httpx.AsyncClient(limits=limits, timeout=_http_timeout())
+
+
+_shared_http_client = LoopBoundClient(_create_http_client)
+
+
+def get_shared_http_client() -> httpx.AsyncClient:
+    """
+    Возвращает общий асинхронный HTTP-клиент с ограниченным пулом соединений
+    
+    Размер пула и keep-alive настраиваются переменными окружения:
+    CLOUD_RU_MAX_CONNECTIONS, CLOUD_RU_MAX_KEEPALIVE, CLOUD_RU_KEEPALIVE_EXPIRY.
+    """
+    return _shared_http_client.get()
+
+
+async def close_shared_http_client() -> None:
+    """Закрывает общий пул соединений (вызывается при остановке приложения)"""
+    await _shared_http_client.aclose()
+
+
+def get_inflight_stats() -> Dict[str, Any]:
+    """Статистика объединения одинаковых одновременных запросов"""
+    return _inflight_requests.stats()
+
+
 class LLMService:
     """Сервис для взаимодействия с Cloud.ru Evolution Foundation Model"""
     
@@ -31,11 +81,22 @@ class LLMService:
         if not api_key:
             raise ValueError("CLOUD_RU_API_KEY не установлен в переменных окружения")
         
-        # Используем OpenAI-совместимый клиент
-        self.client = OpenAI(
-            base_url=base_url,
-            api_key=api_key
-        )
+        self._client: Optional[AsyncOpenAI] = None
+        self._client_http: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def client(self) -> AsyncOpenAI:
+        """Асинхронный OpenAI-совместимый клиент поверх общего пула соединений"""
+        http_client = get_shared_http_client()
+        if self._client is None or self._client_http is not http_client:
+            self._client = AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=self.api_key,
+                http_client=http_client,
+                max_retries=int(os.getenv("CLOUD_RU_MAX_RETRIES", "2"))
+            )
+            self._client_http = http_client
+        return self._client
     
     async def generate(
         self,
@@ -45,7 +106,9 @@ class LLMService:
         max_tokens: int = 300,
         top_p: Optional[float] = None,
         frequency_penalty: Optional[float] = None,
-        presence_penalty: Optional[float] = None
+        presence_penalty: Optional[float] = None,
+        timeout: Optional[float] = None,
+        use_cache: Optional[bool] = None
     ) -> str:
         """
         Генерирует ответ от LLM
@@ -55,77 +118,288 @@ class LLMService:
             system_prompt: Системный промпт (опционально)
             temperature: Температура генерации
             max_tokens: Максимальное количество токенов
+            timeout: Таймаут запроса в секундах (по умолчанию CLOUD_RU_TIMEOUT)
+            use_cache: True/False — принудительно использовать или обойти кэш;
+                None — кэшировать только при temperature <= CLOUD_RU_CACHE_MAX_TEMPERATURE
         
         Returns:
             Сгенерированный текст
         """
+        cache = get_llm_cache()
+        if cache is not None and not self._should_cache(temperature, use_cache):
+            cache.record_bypass()
+            cache = None
+        
+        request_key = make_cache_key(self.model, system_prompt, prompt, temperature, max_tokens)
+        if cache is not None:
+            cached = await cache.aget(request_key)
+            if cached is not None:
+                return cached
+        
         # Используем OpenAI клиент (совместимый формат)
         messages = []
         if system_prompt:
             messages.append({"role": "system", "content": system_prompt})
         messages.append({"role": "user", "content": prompt})
         
+        async def request_completion() -> str:
+            try:
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    timeout=_http_timeout(timeout)
+                )
+            except Exception as e:
+                raise self._translate_error(e)
+            
+            content = response.choices[0].message.content
+            if cache is not None and content:
+                await cache.aset(request_key, content)
+            return content
+        
+        # Одинаковые одновременные запросы ждут один общий вызов. Объединяются
+        # только вызовы, ответ на которые можно брать из кэша: запросы с высокой
+        # температурой должны получать независимые ответы
+        if self._should_cache(temperature, use_cache) and \
+                os.getenv("CLOUD_RU_COALESCE_ENABLED", "true").lower() in ("1", "true", "yes"):
+            flight_key = f"{request_key}:{use_cache}:{timeout}"
+            return await _inflight_requests.do(flight_key, request_completion)
+        return await request_completion()
+    
+    async def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.7,
+        max_tokens: int = 300,
+        timeout: Optional[float] = None,
+        use_cache: Optional[bool] = None
+    ) -> AsyncIterator[str]:
+        """
+        Генерирует ответ от LLM потоково
+        
+        Параметры совпадают с generate. При попадании в кэш ответ отдается
+        одним фрагментом; полный ответ после завершения потока сохраняется в кэш.
+        
+        Yields:
+            Фрагменты текста по мере их поступления от LLM
+        """
+        cache = get_llm_cache()
+        if cache is not None and not self._should_cache(temperature, use_cache):
+            cache.record_bypass()
+            cache = None
+        
+        request_key = make_cache_key(self.model, system_prompt, prompt, temperature, max_tokens)
+        if cache is not None:
+            cached = await cache.aget(request_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
         try:
-            response = self.client.chat.completions.create(
+            stream = await self.client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 temperature=temperature,
-                max_tokens=max_tokens
+                max_tokens=max_tokens,
+                timeout=_http_timeout(timeout),
+                stream=True
             )
-            return response.choices[0].message.content
         except Exception as e:
-            error_msg = str(e)
-            # Более информативные сообщения об ошибках
-            if "404" in error_msg or "Not Found" in error_msg:
-                raise Exception(
-                    f"Модель или endpoint не найдены (404).\n"
-                    f"Проверьте:\n"
-                    f"  - base_url: {self.base_url}\n"
-                    f"  - model: {self.model}\n"
-                    f"  - API ключ установлен: {'Да' if self.api_key else 'Нет'}"
-                )
-            elif "401" in error_msg or "Unauthorized" in error_msg:
-                raise Exception(
-                    "Ошибка аутентификации (401).\n"
-                    "Проверьте правильность CLOUD_RU_API_KEY в файле .env"
-                )
-            elif "403" in error_msg or "Forbidden" in error_msg:
-                raise Exception(
-                    "Доступ запрещен (403).\n"
-                    "API ключ не имеет доступа к Evolution Foundation Model.\n"
-                    "Проверьте права доступа в личном кабинете Cloud.ru"
-                )
-            elif "timeout" in error_msg.lower() or "timed out" in error_msg.lower():
-                raise Exception(
-                    "Таймаут подключения.\n"
-                    "Проверьте подключение к интернету и повторите попытку."
-                )
-            else:
-                raise Exception(f"Ошибка при генерации: {error_msg}")
+            raise self._translate_error(e)
+        
+        parts = []
+        try:
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            raise self._translate_error(e)
+        finally:
+            await stream.close()
+        
+        if cache is not None and parts:
+            await cache.aset(request_key, "".join(parts))
     
+    def _should_cache(self, temperature: float, use_cache: Optional[bool]) -> bool:
+        """Решает, можно ли брать ответ из кэша для данного вызова"""
+        if use_cache is not None:
+            return use_cache
+        max_temperature = float(os.getenv("CLOUD_RU_CACHE_MAX_TEMPERATURE", "0.3"))
+        return temperature <= max_temperature
+    
+    def _translate_error(self, e: Exception) -> Exception:
+        """Преобразует ошибку клиента в понятное сообщение"""
+        error_msg = str(e)
+        # Более информативные сообщения об ошибках
+        if "404" in error_msg or "Not Found" in error_msg:
+            return Exception(
+                f"Модель или endpoint не найдены (404).\n"
+                f"Проверьте:\n"
+                f"  - base_url: {self.base_url}\n"
+                f"  - model: {self.model}\n"
+                f"  - API ключ установлен: {'Да' if self.api_key else 'Нет'}"
+            )
+        elif "401" in error_msg or "Unauthorized" in error_msg:
+            return Exception(
+                "Ошибка аутентификации (401).\n"
+                "Проверьте правильность CLOUD_RU_API_KEY в файле .env"
+            )
+        elif "403" in error_msg or "Forbidden" in error_msg:
+            return Exception(
+                "Доступ запрещен (403).\n"
+                "API ключ не имеет доступа к Evolution Foundation Model.\n"
+                "Проверьте права доступа в личном кабинете Cloud.ru"
+            )
+        elif "timeout" in error_msg.lower() or "timed out" in error_msg.lower():
+            return Exception(
+                "Таймаут подключения.\n"
+                "Проверьте подключение к интернету и повторите попытку."
+            )
+        else:
+            return Exception(f"Ошибка при генерации: {error_msg}")
+    
+    
+    def _start_batch(
+        self,
+        prompts: list[str],
+        system_prompt: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        concurrency: Optional[int],
+        timeout: Optional[float]
+    ) -> list[asyncio.Task]:
+        """Задачи генерации по промптам, не больше `concurrency` запросов одновременно"""
+        if concurrency is None:
+            concurrency = int(os.getenv("CLOUD_RU_BATCH_CONCURRENCY", "8"))
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def run_one(prompt: str) -> str:
+            async with semaphore:
+                return await self.generate(
+                    prompt,
+                    system_prompt,
+                    temperature,
+                    max_tokens,
+                    timeout=timeout
+                )
+        
+        return [asyncio.create_task(run_one(prompt)) for prompt in prompts]
     
     async def generate_batch(
         self,
         prompts: list[str],
         system_prompt: Optional[str] = None,
         temperature: float = 0.2,
-        max_tokens: int = 4000
+        max_tokens: int = 4000,
+        concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
     ) -> list[str]:
         """
         Генерирует ответы для нескольких промптов
         
+        Промпты отправляются параллельно, но не больше `concurrency` запросов
+        за раз. Ошибка любого промпта прерывает пакет: остальные запросы
+        отменяются, исключение пробрасывается. Результаты по каждому промпту
+        со статусом и общим дедлайном — generate_batch_detailed.
+        
         Args:
             prompts: Список промптов
             system_prompt: Системный промпт
             temperature: Температура генерации
             max_tokens: Максимальное количество токенов
+            concurrency: Лимит параллельных запросов (по умолчанию CLOUD_RU_BATCH_CONCURRENCY)
+            timeout: Таймаут одного запроса в секундах (опционально)
         
         Returns:
-            Список сгенерированных текстов
+            Список сгенерированных текстов в порядке промптов
         """
+        tasks = self._start_batch(prompts, system_prompt, temperature, max_tokens, concurrency, timeout)
+        try:
+            return list(await asyncio.gather(*tasks))
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    
+    async def generate_batch_detailed(
+        self,
+        prompts: list[str],
+        system_prompt: Optional[str] = None,
+        temperature: float = 0.2,
+        max_tokens: int = 4000,
+        concurrency: Optional[int] = None,
+        deadline: Optional[float] = None,
+        timeout: Optional[float] = None
+    ) -> list[Dict[str, Any]]:
+        """
+        Генерирует ответы для нескольких промптов с результатом по каждому
+        
+        Как generate_batch, но ошибка одного промпта не прерывает пакет. Если
+        задан `deadline`, по его истечении незавершенные запросы отменяются и
+        возвращаются частичные результаты.
+        
+        Args:
+            prompts: Список промптов
+            system_prompt: Системный промпт
+            temperature: Температура генерации
+            max_tokens: Максимальное количество токенов
+            concurrency: Лимит параллельных запросов (по умолчанию CLOUD_RU_BATCH_CONCURRENCY)
+            deadline: Общий дедлайн пакета в секундах (опционально)
+            timeout: Таймаут одного запроса в секундах (опционально)
+        
+        Returns:
+            Список результатов в порядке промптов:
+            {"index", "status": "ok" | "error" | "timeout", "result", "error"}
+        """
+        tasks = self._start_batch(prompts, system_prompt, temperature, max_tokens, concurrency, timeout)
+        if not tasks:
+            return []
+        
+        try:
+            _, pending = await asyncio.wait(tasks, timeout=deadline)
+        except asyncio.CancelledError:
+            for task in tasks:
+                task.cancel()
+            raise
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        
         results = []
-        for prompt in prompts:
-            result = await self.generate(prompt, system_prompt, temperature, max_tokens)
-            results.append(result)
+        for index, task in enumerate(tasks):
+            if task in pending:
+                results.append({
+                    "index": index,
+                    "status": "timeout",
+                    "result": None,
+                    "error": "Превышен дедлайн пакета"
+                })
+            elif task.exception() is not None:
+                results.append({
+                    "index": index,
+                    "status": "error",
+                    "result": None,
+                    "error": str(task.exception())
+                })
+            else:
+                results.append({
+                    "index": index,
+                    "status": "ok",
+                    "result": task.result(),
+                    "error": None
+                })
         return results
-
@@ -0,0 +1,70 @@
+"""
+HTTP-клиент с пулом соединений, привязанный к event loop
+"""
+from typing import Callable, Optional, Set
+import asyncio
+import httpx
+
+
+async def _aclose_quietly(client: httpx.AsyncClient) -> None:
+    try:
+        await client.aclose()
+    except RuntimeError:
+        # Соединения остались от уже закрытого event loop: закрыть их через него
+        # нельзя, сокеты освободятся вместе с объектами транспорта
+        pass
+
+
+class LoopBoundClient:
+    """
+    Общий httpx.AsyncClient, который пересоздается при смене event loop
+
+    Соединения пула принадлежат циклу, в котором открыты, поэтому в другом
+    цикле (например, в тестах с asyncio.run) нужен новый клиент. Прежний
+    клиент при этом закрывается: в своем цикле, если тот еще работает в другом
+    потоке, иначе — в текущем. Вне event loop возвращается текущий клиент.
+    """
+
+    def __init__(self, factory: Callable[[], httpx.AsyncClient]):
+        self._factory = factory
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing: Set[asyncio.Task] = set()
+
+    def get(self) -> httpx.AsyncClient:
+        """Клиент для текущего event loop (создается при первом обращении)"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        client = self._client
+        if client is not None and not client.is_closed and (loop is None or self._loop is loop):
+            return client
+
+        previous, previous_loop = client, self._loop
+        self._client = self._factory()
+        self._loop = loop
+        if previous is not None and not previous.is_closed:
+            self._retire(previous, previous_loop, loop)
+        return self._client
+
+    def _retire(
+        self,
+        client: httpx.AsyncClient,
+        client_loop: Optional[asyncio.AbstractEventLoop],
+        loop: asyncio.AbstractEventLoop
+    ) -> None:
+        """Закрывает клиент, замененный из-за смены event loop"""
+        if client_loop is not None and client_loop.is_running():
+            asyncio.run_coroutine_threadsafe(_aclose_quietly(client), client_loop)
+            return
+        task = loop.create_task(_aclose_quietly(client))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def aclose(self) -> None:
+        """Закрывает текущий клиент (например, при остановке приложения)"""
+        client, self._client, self._loop = self._client, None, None
+        if client is not None and not client.is_closed:
+            await _aclose_quietly(client)
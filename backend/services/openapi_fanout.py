@@ -0,0 +1,147 @@
+"""
+Параллельная генерация тестов по группам endpoints OpenAPI спецификации
+"""
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import os
+import re
+
+from .openapi_parser import OpenAPIParser
+from .code_merge import merge_test_modules
+
+
+GROUP_BY_OPTIONS = ("tag", "resource")
+
+_VERSION_SEGMENT = re.compile(r"^v\d+(\.\d+)*$", re.IGNORECASE)
+
+
+def resource_name(path: str) -> str:
+    """Ресурс пути: первый сегмент, не являющийся версией или параметром (/v3/vms/{id} -> vms)"""
+    for segment in path.strip("/").split("/"):
+        if not segment or segment.startswith("{") or segment == "api" or _VERSION_SEGMENT.match(segment):
+            continue
+        return segment
+    return "root"
+
+
+def group_endpoints(
+    spec: Dict[str, Any],
+    group_by: str = "tag",
+    max_group_size: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Группирует endpoints спецификации для независимой генерации
+
+    Args:
+        spec: OpenAPI спецификация
+        group_by: "tag" — по первому тегу (endpoints без тегов — по ресурсу),
+            "resource" — по ресурсу пути
+        max_group_size: Максимум endpoints в группе; большие группы делятся на
+            части (по умолчанию OPENAPI_FANOUT_GROUP_SIZE, 15)
+
+    Returns:
+        [{"name", "operations": [(путь, метод), ...]}] в порядке спецификации
+    """
+    if group_by not in GROUP_BY_OPTIONS:
+        raise ValueError(f"Неизвестный способ группировки: {group_by}. Доступные: {', '.join(GROUP_BY_OPTIONS)}")
+    max_group_size = max(1, max_group_size or int(os.getenv("OPENAPI_FANOUT_GROUP_SIZE", "15")))
+
+    groups: Dict[str, List[tuple]] = {}
+    for endpoint in OpenAPIParser().extract_endpoints(spec):
+        if group_by == "tag" and endpoint["tags"]:
+            key = str(endpoint["tags"][0])
+        else:
+            key = resource_name(endpoint["path"])
+        groups.setdefault(key, []).append((endpoint["path"], endpoint["method"]))
+
+    result = []
+    for name, operations in groups.items():
+        chunks = [operations[start:start + max_group_size] for start in range(0, len(operations), max_group_size)]
+        for number, chunk in enumerate(chunks, 1):
+            result.append({
+                "name": name if len(chunks) == 1 else f"{name} ({number}/{len(chunks)})",
+                "operations": chunk
+            })
+    return result
+
+
+async def iter_fanout_generation(
+    spec: Dict[str, Any],
+    generate_group: Callable[[Dict[str, Any]], Awaitable[str]],
+    group_by: str = "tag",
+    max_group_size: Optional[int] = None,
+    concurrency: Optional[int] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Генерирует код по группам endpoints параллельно и объединяет результат
+
+    Каждая группа получает свою спецификацию только с ее операциями (см.
+    OpenAPIParser.subset_spec), поэтому промпт и ответ LLM не упираются в
+    лимит токенов. Одновременно генерируется не больше `concurrency` групп
+    (по умолчанию OPENAPI_FANOUT_CONCURRENCY, 8). Ошибка одной группы не
+    прерывает остальные.
+
+    Args:
+        spec: OpenAPI спецификация
+        generate_group: Корутина генерации кода по спецификации группы
+        group_by, max_group_size: См. group_endpoints
+        concurrency: Лимит одновременных генераций
+
+    Yields:
+        По мере готовности групп — {"group", "index", "groups_total", "operations", "code"}
+        или {..., "error"}; последним — {"done": true, "code": <объединенный модуль>,
+        "groups", "failed", "success"}
+
+    Raises:
+        ValueError: В спецификации нет endpoints
+    """
+    groups = group_endpoints(spec, group_by, max_group_size)
+    if not groups:
+        raise ValueError("В спецификации нет endpoints для генерации")
+    if concurrency is None:
+        concurrency = int(os.getenv("OPENAPI_FANOUT_CONCURRENCY", "8"))
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    parser = OpenAPIParser()
+
+    async def run(group: Dict[str, Any]) -> str:
+        async with semaphore:
+            return await generate_group(parser.subset_spec(spec, group["operations"]))
+
+    tasks = {asyncio.create_task(run(group)): index for index, group in enumerate(groups)}
+    pending = set(tasks)
+    codes: Dict[int, str] = {}
+    failed = []
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=tasks.get):
+                index = tasks[task]
+                group = groups[index]
+                event = {
+                    "group": group["name"],
+                    "index": index,
+                    "groups_total": len(groups),
+                    "operations": [f"{method} {path}" for path, method in group["operations"]]
+                }
+                if task.exception() is not None:
+                    failed.append(group["name"])
+                    event["error"] = f"Ошибка генерации: {task.exception()}"
+                else:
+                    codes[index] = task.result()
+                    event["code"] = codes[index]
+                yield event
+    finally:
+        # Клиент отключился или генерация прервана: незавершенные группы отменяются
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    merged = merge_test_modules([(groups[index]["name"], codes[index]) for index in sorted(codes)])
+    yield {
+        "done": True,
+        "code": merged,
+        "groups": len(groups),
+        "failed": failed,
+        "success": not failed
+    }
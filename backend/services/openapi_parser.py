@@ -1,22 +1,79 @@
 """
 Парсер OpenAPI спецификаций
 """
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set, Tuple, Union
+import asyncio
 import json
+import os
+import re
 import yaml
-import requests
-from urllib.parse import urlparse
+import httpx
+from urllib.parse import urlparse, urljoin
+from .spec_cache import get_spec_cache, content_hash
+from .spec_fetcher import close_spec_http_client, fetch_spec_bytes
+from .ref_resolver import get_ref_resolver
+
+try:
+    import orjson
+except ImportError:  # orjson — необязательное ускорение
+    orjson = None
+
+
+# C-загрузчик LibYAML в несколько раз быстрее чистого Python, если PyYAML собран с ним
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+HTTP_METHODS = ('get', 'post', 'put', 'delete', 'patch', 'head', 'options')
+
+_LEADING_SPACE_STR = re.compile(r"\ufeff?\s*")
+_LEADING_SPACE_BYTES = re.compile(rb"(?:\xef\xbb\xbf)?\s*")
+
+
+def load_yaml(content: Union[str, bytes]) -> Any:
+    """yaml.safe_load через LibYAML, если он доступен"""
+    return yaml.load(content, Loader=YAML_LOADER)
+
+
+def load_json(content: Union[str, bytes]) -> Any:
+    """
+    json.loads через orjson, если он установлен
+
+    orjson строже стандартного модуля (NaN, целые больше 64 бит), поэтому
+    при его ошибке документ разбирается стандартным json: он же дает
+    привычное сообщение об ошибке.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(content)
+
+
+def _not_found_message(url: str) -> str:
+    return (
+        f"OpenAPI спецификация не найдена по URL: {url}\n"
+        f"Возможные причины:\n"
+        f"1. URL неправильный или спецификация находится по другому адресу\n"
+        f"2. Требуется аутентификация для доступа к спецификации\n"
+        f"3. Спецификация может быть доступна по другому пути (например, /swagger.json, /api-docs)\n"
+        f"Попробуйте загрузить спецификацию вручную и передать через 'spec_content'"
+    )
+
+
+def _escape_pointer(token: str) -> str:
+    """Экранирует токен JSON Pointer (RFC 6901)"""
+    return token.replace("~", "~0").replace("/", "~1")
 
 
 class OpenAPIParser:
     """Парсер для OpenAPI 3.0 спецификаций"""
     
-    def parse(self, spec_content: str, format: str = "auto") -> Dict[str, Any]:
+    def parse(self, spec_content: Union[str, bytes], format: str = "auto") -> Dict[str, Any]:
         """
         Парсит OpenAPI спецификацию
         
         Args:
-            spec_content: Содержимое спецификации (JSON или YAML)
+            spec_content: Содержимое спецификации (JSON или YAML), строка или байты UTF-8
             format: Формат ('json', 'yaml', 'auto')
         
         Returns:
@@ -29,19 +86,22 @@ class OpenAPIParser:
             if format == "json":
                 # Пробуем распарсить JSON
                 try:
-                    return json.loads(spec_content)
+                    return load_json(spec_content)
                 except json.JSONDecodeError as e:
                     # Более понятное сообщение об ошибке
+                    head = spec_content[:100]
+                    if isinstance(head, bytes):
+                        head = head.decode("utf-8", errors="replace")
                     raise ValueError(
                         f"Ошибка парсинга JSON: {str(e)}\n"
                         f"Убедитесь, что:\n"
                         f"1. JSON валидный (проверьте на jsonlint.com)\n"
                         f"2. Все кавычки правильно экранированы\n"
                         f"3. Нет незакрытых скобок или запятых\n"
-                        f"Первые 100 символов содержимого: {spec_content[:100]}"
+                        f"Первые 100 символов содержимого: {head}"
                     )
             elif format == "yaml":
-                return yaml.safe_load(spec_content)
+                return load_yaml(spec_content)
             else:
                 raise ValueError(f"Неподдерживаемый формат: {format}")
         except ValueError:
@@ -49,49 +109,244 @@ class OpenAPIParser:
         except Exception as e:
             raise ValueError(f"Ошибка парсинга OpenAPI: {str(e)}")
     
+    async def parse_async(self, spec_content: Union[str, bytes], format: str = "auto") -> Dict[str, Any]:
+        """parse в отдельном потоке, чтобы парсинг большой спецификации не блокировал event loop"""
+        return await asyncio.to_thread(self.parse, spec_content, format)
+    
     def parse_from_url(self, url: str) -> Dict[str, Any]:
         """
-        Парсит OpenAPI спецификацию из URL
+        Синхронная обертка над parse_from_url_async для кода вне event loop
+        
+        Загрузка идет в отдельном event loop; пул соединений этого цикла
+        закрывается до выхода из него.
         
         Args:
             url: URL спецификации
         
         Returns:
-            Распарсенная спецификация
+            Распарсенная спецификация (общая для всех вызывающих, изменять нельзя)
+        
+        Raises:
+            RuntimeError: Вызов из работающего event loop — там нужен
+                `await parse_from_url_async(url)`
         """
-        import requests
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        else:
+            raise RuntimeError(
+                "parse_from_url нельзя вызывать из работающего event loop, используйте await parse_from_url_async(url)"
+            )
+        
+        async def load() -> Dict[str, Any]:
+            try:
+                return await self.parse_from_url_async(url)
+            finally:
+                await close_spec_http_client()
+        
+        return asyncio.run(load())
+    
+    def _parse_body(self, body: bytes, content_type: str, url: str) -> Dict[str, Any]:
+        """Парсит загруженную по URL спецификацию по Content-Type или расширению"""
+        if 'json' in content_type or url.endswith('.json'):
+            return load_json(body)
+        return load_yaml(body)
+    
+    async def parse_from_url_async(self, url: str, resolve_external_refs: bool = True) -> Dict[str, Any]:
+        """
+        Асинхронно загружает и парсит OpenAPI спецификацию из URL
+        
+        То же, что fetch_spec, но без хэша содержимого.
+        """
+        spec, _ = await self.fetch_spec(url, resolve_external_refs)
+        return spec
+    
+    async def fetch_spec(self, url: str, resolve_external_refs: bool = True) -> Tuple[Dict[str, Any], str]:
+        """
+        Асинхронно загружает и парсит OpenAPI спецификацию из URL
         
+        Загрузка идет через общий пул соединений потоком с ограничением размера
+        (OPENAPI_MAX_SPEC_BYTES), парсинг — в отдельном потоке, поэтому event
+        loop не блокируется.
+        
+        Спецификация кэшируется (см. get_spec_cache): повторный вызов отправляет
+        условный запрос с If-None-Match / If-Modified-Since, и при ответе 304
+        возвращается уже распарсенная спецификация. Результат общий для всех
+        вызывающих, изменять его нельзя.
+        
+        Args:
+            url: URL спецификации
+            resolve_external_refs: Загрузить документы, на которые ссылаются
+                внешние $ref (см. _bundle_external_refs)
+        
+        Returns:
+            (распарсенная спецификация, SHA-256 загруженного документа вместе с
+            документами по внешним $ref) — хэш годится как ключ содержимого и
+            без кэша спецификаций
+        """
+        cache = get_spec_cache()
+        entry = cache.get(url) if cache is not None else None
         try:
-            response = requests.get(url, timeout=10)
-            
-            if response.status_code == 404:
-                raise ValueError(
-                    f"OpenAPI спецификация не найдена по URL: {url}\n"
-                    f"Возможные причины:\n"
-                    f"1. URL неправильный или спецификация находится по другому адресу\n"
-                    f"2. Требуется аутентификация для доступа к спецификации\n"
-                    f"3. Спецификация может быть доступна по другому пути (например, /swagger.json, /api-docs)\n"
-                    f"Попробуйте загрузить спецификацию вручную и передать через 'spec_content'"
-                )
-            
-            response.raise_for_status()
-            
-            content_type = response.headers.get('content-type', '')
-            if 'json' in content_type or url.endswith('.json'):
-                return response.json()
+            status, body, headers = await fetch_spec_bytes(url, entry.conditional_headers() if entry else None)
+            if status == 304 and entry is not None:
+                spec = cache.revalidated(entry)
+                digest = entry.content_hash
+            elif status == 404:
+                raise ValueError(_not_found_message(url))
             else:
-                return yaml.safe_load(response.text)
-        except requests.exceptions.RequestException as e:
+                digest = content_hash(body)
+                spec = cache.find_by_content(digest) if cache is not None else None
+                reused = spec is not None
+                if spec is None:
+                    spec = await asyncio.to_thread(self._parse_body, body, headers.get('content-type', ''), url)
+                if cache is not None:
+                    cache.store(
+                        url,
+                        spec,
+                        digest,
+                        len(body),
+                        etag=headers.get('ETag'),
+                        last_modified=headers.get('Last-Modified'),
+                        reused=reused
+                    )
+        except httpx.HTTPError as e:
             raise ValueError(f"Ошибка загрузки OpenAPI из URL {url}: {str(e)}")
+        except ValueError:
+            raise
         except Exception as e:
             raise ValueError(f"Ошибка загрузки OpenAPI из URL: {str(e)}")
+        
+        if resolve_external_refs and isinstance(spec, dict):
+            spec, external_digests = await self._bundle_external_refs(spec, url)
+            if external_digests:
+                # Ключ содержимого меняется и при изменении только документа по внешнему $ref
+                digest = content_hash("\n".join(
+                    [digest] + [f"{ref_url}\0{external_digests[ref_url]}" for ref_url in sorted(external_digests)]
+                ).encode("utf-8"))
+        return spec, digest
+    
+    async def parse_many_from_urls(self, urls: List[str]) -> List[Dict[str, Any]]:
+        """
+        Загружает несколько спецификаций параллельно
+        
+        Одновременно выполняется не больше OPENAPI_FETCH_CONCURRENCY (по
+        умолчанию 8) загрузок. Ошибка одной спецификации не прерывает остальные.
+        
+        Returns:
+            [{"url", "spec", "content_hash"} или {"url", "error"}] в исходном порядке
+        """
+        semaphore = asyncio.Semaphore(max(1, int(os.getenv("OPENAPI_FETCH_CONCURRENCY", "8"))))
+        
+        async def load(url: str) -> Dict[str, Any]:
+            async with semaphore:
+                try:
+                    spec, digest = await self.fetch_spec(url)
+                    return {"url": url, "spec": spec, "content_hash": digest}
+                except ValueError as e:
+                    return {"url": url, "error": str(e)}
+        
+        return list(await asyncio.gather(*(load(url) for url in urls)))
+    
+    def _external_ref_urls(self, node: Any, doc_url: str) -> Set[str]:
+        """URL документов, на которые ссылаются внешние $ref узла"""
+        found: Set[str] = set()
+        stack = [node]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, dict):
+                ref = item.get("$ref")
+                if isinstance(ref, str) and not ref.startswith("#"):
+                    found.add(urljoin(doc_url, ref).partition("#")[0])
+                stack.extend(item.values())
+            elif isinstance(item, list):
+                stack.extend(item)
+        return found
+    
+    def _rewrite_refs(self, node: Any, doc_url: str, root_url: str) -> Any:
+        """Копия узла, в которой все $ref — локальные указатели объединенной спецификации"""
+        def local_pointer(target_url: str, fragment: str) -> str:
+            if target_url == root_url:
+                return f"#{fragment}"
+            return f"#/x-external/{_escape_pointer(target_url)}{fragment}"
+        
+        def rewrite(item: Any) -> Any:
+            if isinstance(item, dict):
+                copied = {key: rewrite(value) for key, value in item.items()}
+                ref = item.get("$ref")
+                if isinstance(ref, str):
+                    if ref.startswith("#"):
+                        copied["$ref"] = local_pointer(doc_url, ref[1:])
+                    else:
+                        target_url, _, fragment = urljoin(doc_url, ref).partition("#")
+                        copied["$ref"] = local_pointer(target_url, fragment)
+                return copied
+            if isinstance(item, list):
+                return [rewrite(value) for value in item]
+            return item
+        
+        return rewrite(node)
     
-    def extract_endpoints(self, spec: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def _bundle_external_refs(self, spec: Dict[str, Any], url: str) -> Tuple[Dict[str, Any], Dict[str, str]]:
+        """
+        Объединяет многофайловую спецификацию в один документ
+        
+        Документы, на которые ссылаются внешние $ref (`common.yaml#/Pet`,
+        `../models/user.json`), загружаются параллельно, в том числе их
+        собственные внешние ссылки. Они кладутся в `x-external` под своим URL,
+        а все $ref переписываются в локальные указатели вида
+        `#/x-external/<URL>/<путь>`. Загружаются только документы с того же
+        хоста (OPENAPI_REF_SAME_ORIGIN=false снимает ограничение), не больше
+        OPENAPI_MAX_REF_DOCUMENTS (по умолчанию 50).
+        
+        Returns:
+            (исходная спецификация, если внешних ссылок нет, иначе объединенная
+            копия; {URL внешнего документа: SHA-256 его содержимого})
+        """
+        pending = self._external_ref_urls(spec, url) - {url}
+        if not pending:
+            return spec, {}
+        
+        origin = urlparse(url)
+        same_origin = os.getenv("OPENAPI_REF_SAME_ORIGIN", "true").lower() in ("1", "true", "yes")
+        max_documents = int(os.getenv("OPENAPI_MAX_REF_DOCUMENTS", "50"))
+        documents: Dict[str, Any] = {}
+        digests: Dict[str, str] = {}
+        while pending:
+            for ref_url in pending:
+                target = urlparse(ref_url)
+                if target.scheme not in ("http", "https") or (
+                    same_origin and (target.scheme, target.netloc) != (origin.scheme, origin.netloc)
+                ):
+                    raise ValueError(f"Внешний $ref на недопустимый адрес: {ref_url}")
+            if len(documents) + len(pending) > max_documents:
+                raise ValueError(f"Спецификация ссылается больше чем на {max_documents} документов")
+            
+            batch = sorted(pending)
+            fetched = await asyncio.gather(
+                *(self.fetch_spec(ref_url, resolve_external_refs=False) for ref_url in batch)
+            )
+            pending = set()
+            for ref_url, (document, document_digest) in zip(batch, fetched):
+                documents[ref_url] = document
+                digests[ref_url] = document_digest
+                pending |= self._external_ref_urls(document, ref_url)
+            pending -= set(documents) | {url}
+        
+        bundled = self._rewrite_refs(spec, url, url)
+        bundled["x-external"] = {
+            ref_url: self._rewrite_refs(document, ref_url, url) for ref_url, document in documents.items()
+        }
+        return bundled, digests
+    
+    def extract_endpoints(self, spec: Dict[str, Any], resolve_refs: bool = False) -> List[Dict[str, Any]]:
         """
         Извлекает список endpoints из спецификации
         
         Args:
             spec: OpenAPI спецификация
+            resolve_refs: Развернуть $ref в parameters, request_body и responses
+                (см. RefResolver; рекурсивные схемы помечаются x-circular-ref)
         
         Returns:
             Список endpoints с методами
@@ -101,9 +356,15 @@ class OpenAPIParser:
         if 'paths' not in spec:
             return endpoints
         
+        resolver = get_ref_resolver(spec) if resolve_refs else None
         for path, methods in spec['paths'].items():
+            if resolver is not None and '$ref' in methods:
+                try:
+                    methods = resolver.target(methods['$ref'])
+                except (KeyError, ValueError):
+                    continue
             for method, details in methods.items():
-                if method.lower() in ['get', 'post', 'put', 'delete', 'patch', 'head', 'options']:
+                if method.lower() in HTTP_METHODS:
                     endpoint_info = {
                         "path": path,
                         "method": method.upper(),
@@ -115,10 +376,43 @@ class OpenAPIParser:
                         "responses": details.get('responses', {}),
                         "tags": details.get('tags', [])
                     }
+                    if resolver is not None:
+                        for key in ("parameters", "request_body", "responses"):
+                            endpoint_info[key] = resolver.deref(endpoint_info[key])
                     endpoints.append(endpoint_info)
         
         return endpoints
     
+    def subset_spec(self, spec: Dict[str, Any], operations: List[Tuple[str, str]]) -> Dict[str, Any]:
+        """
+        Спецификация только с заданными операциями
+        
+        Все разделы, кроме paths, общие с исходной спецификацией (не копируются),
+        поэтому $ref по-прежнему разрешаются. Общие для пути поля (parameters,
+        servers) сохраняются.
+        
+        Args:
+            spec: OpenAPI спецификация
+            operations: Пары (путь, HTTP метод)
+        
+        Returns:
+            Спецификация с отобранными операциями в исходном порядке путей
+        """
+        wanted: Dict[str, Set[str]] = {}
+        for path, method in operations:
+            wanted.setdefault(path, set()).add(method.upper())
+        
+        paths: Dict[str, Dict[str, Any]] = {}
+        for path, path_item in (spec.get('paths') or {}).items():
+            methods = wanted.get(path)
+            if not methods:
+                continue
+            paths[path] = {
+                key: value for key, value in path_item.items()
+                if key.upper() in methods or key.lower() not in HTTP_METHODS
+            }
+        return {**spec, "paths": paths}
+    
     def extract_schemas(self, spec: Dict[str, Any]) -> Dict[str, Any]:
         """
         Извлекает схемы данных из спецификации
@@ -157,13 +451,14 @@ class OpenAPIParser:
             return spec.get('securityDefinitions', {})
         return {}
     
-    def _detect_format(self, content: str) -> str:
-        """Определяет формат содержимого"""
-        content = content.strip()
-        if content.startswith('{') or content.startswith('['):
-            return "json"
-        else:
-            return "yaml"
+    def _detect_format(self, content: Union[str, bytes]) -> str:
+        """Определяет формат по первому значащему символу, не копируя содержимое"""
+        if isinstance(content, bytes):
+            start = _LEADING_SPACE_BYTES.match(content).end()
+            first = content[start:start + 1]
+            return "json" if first in (b"{", b"[") else "yaml"
+        start = _LEADING_SPACE_STR.match(content).end()
+        return "json" if content[start:start + 1] in ("{", "[") else "yaml"
     
     def validate_spec(self, spec: Dict[str, Any]) -> Dict[str, Any]:
         """
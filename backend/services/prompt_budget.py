@@ -0,0 +1,67 @@
+"""
+Оценка размера промптов в токенах и разбиение на части по бюджету
+"""
+from typing import List, Optional
+
+
+# Среднее число символов на токен для смеси русского текста и Python-кода
+CHARS_PER_TOKEN = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """Грубая (с запасом) оценка числа токенов без токенизатора модели"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def pack_by_budget(
+    items: List[str],
+    budget_tokens: int,
+    separator_tokens: int = 4,
+    max_items: Optional[int] = None
+) -> List[List[int]]:
+    """
+    Жадно разбивает элементы на группы, каждая из которых укладывается в бюджет
+
+    Порядок элементов сохраняется. Элемент больше бюджета попадает в отдельную группу.
+
+    Args:
+        items: Тексты элементов
+        budget_tokens: Бюджет группы в токенах
+        separator_tokens: Накладные расходы на каждый элемент (разделитель, метка)
+        max_items: Максимальное число элементов в группе (опционально)
+
+    Returns:
+        Группы индексов элементов
+    """
+    groups: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for index, item in enumerate(items):
+        size = estimate_tokens(item) + separator_tokens
+        if current and (used + size > budget_tokens or len(current) == max_items):
+            groups.append(current)
+            current, used = [], 0
+        current.append(index)
+        used += size
+    if current:
+        groups.append(current)
+    return groups
+
+
+def truncate_to_budget(text: str, budget_tokens: int) -> str:
+    """
+    Обрезает текст так, чтобы оценка его размера не превышала бюджет
+
+    Args:
+        text: Исходный текст
+        budget_tokens: Бюджет в токенах
+
+    Returns:
+        Текст без изменений, если он укладывается в бюджет, иначе его начало
+        с пометкой об обрезке
+    """
+    if estimate_tokens(text) <= budget_tokens:
+        return text
+    marker = "\n[...обрезано]"
+    keep = max(0, (budget_tokens - 1) * CHARS_PER_TOKEN - len(marker))
+    return text[:keep] + marker
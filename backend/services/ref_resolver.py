@@ -0,0 +1,430 @@
+"""
+Разрешение $ref в OpenAPI спецификациях
+"""
+from collections import OrderedDict
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, List, Optional, Tuple
+import os
+import sys
+import threading
+
+
+# Маркер рекурсивной схемы: {"$ref": "#/components/schemas/Node", "x-circular-ref": True}
+CIRCULAR_REF_KEY = "x-circular-ref"
+
+# Развернутое значение не зависит от схем, которые разворачиваются выше по дереву
+_NO_CYCLE = sys.maxsize
+
+
+def _unescape_pointer(token: str) -> str:
+    """Раскрывает экранирование токена JSON Pointer (RFC 6901)"""
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _is_ref(node: Any) -> bool:
+    return isinstance(node, dict) and isinstance(node.get("$ref"), str)
+
+
+class RefResolver:
+    """
+    Разрешает локальные $ref (`#/components/schemas/Pet`) одной спецификации
+
+    Каждый указатель разрешается один раз: найденный узел и его полностью
+    развернутая копия запоминаются и переиспользуются всеми ссылками на него.
+    Рекурсивные схемы не разворачиваются бесконечно: ссылка на схему, которая
+    уже разворачивается выше по дереву, заменяется маркером
+    {"$ref": ..., "x-circular-ref": True}. Внешние ссылки на другие файлы и
+    ненайденные указатели остаются как есть — внешние документы заранее
+    встраивает OpenAPIParser._bundle_external_refs.
+
+    Развернутые значения разделяются между ссылками и с исходной спецификацией,
+    поэтому изменять их нельзя.
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.spec = spec
+        self._targets: Dict[str, Any] = {}
+        self._resolved: Dict[str, Any] = {}
+        self.expansions = 0
+        self.memo_hits = 0
+
+    def for_spec(self, spec: Dict[str, Any]) -> "RefResolver":
+        """
+        Резолвер для производной спецификации с общей памятью разрешенных указателей
+
+        Подходит для подмножеств (OpenAPIParser.subset_spec): все разделы, кроме
+        paths, у них те же объекты, поэтому уже развернутые схемы переиспользуются.
+        """
+        resolver = RefResolver(spec)
+        resolver._targets = self._targets
+        resolver._resolved = self._resolved
+        return resolver
+
+    def target(self, ref: str) -> Any:
+        """
+        Узел, на который указывает $ref; цепочки ссылок проходятся до конца
+
+        Raises:
+            KeyError: Указатель не найден в спецификации
+            ValueError: Внешняя ссылка или цепочка $ref замыкается сама на себя
+        """
+        node = self._targets.get(ref)
+        if node is not None:
+            return node
+
+        chain = []
+        current = ref
+        while True:
+            if current in chain:
+                raise ValueError(f"Циклическая цепочка $ref: {' -> '.join(chain + [current])}")
+            chain.append(current)
+            node = self._targets.get(current)
+            if node is None:
+                node = self._lookup(current)
+            if not _is_ref(node):
+                break
+            current = node["$ref"]
+
+        for item in chain:
+            self._targets[item] = node
+        return node
+
+    def _lookup(self, ref: str) -> Any:
+        if not ref.startswith("#"):
+            raise ValueError(f"Внешний $ref не поддерживается: {ref}")
+        fragment = ref[1:]
+        if fragment and not fragment.startswith("/"):
+            raise KeyError(f"$ref не найден: {ref}")
+
+        node = self.spec
+        for token in fragment.split("/")[1:]:
+            token = _unescape_pointer(token)
+            try:
+                if isinstance(node, list):
+                    node = node[int(token)]
+                elif isinstance(node, dict):
+                    node = node[token]
+                else:
+                    raise KeyError(token)
+            except (KeyError, IndexError, ValueError):
+                raise KeyError(f"$ref не найден: {ref}") from None
+        return node
+
+    def resolve(self, ref: str) -> Any:
+        """Полностью развернутый узел по $ref"""
+        value, _ = self._expand_ref(ref, [])
+        return value
+
+    def deref(self, node: Any) -> Any:
+        """
+        Полностью разворачивает все $ref внутри узла
+
+        Поддеревья без ссылок не копируются, а возвращаются как есть.
+
+        Args:
+            node: Узел спецификации (например, `parameters` или `requestBody` операции)
+
+        Returns:
+            Узел без $ref, кроме маркеров рекурсии и неразрешимых ссылок
+        """
+        value, _ = self._expand(node, [])
+        return value
+
+    def view(self, node: Any = None) -> Any:
+        """Ленивое разыменованное представление узла (по умолчанию — всей спецификации)"""
+        return _wrap(self.spec if node is None else node, self, ())
+
+    def _expand_ref(self, ref: str, stack: List[str]) -> Tuple[Any, int]:
+        """
+        Разворачивает ссылку; возвращает значение и наименьший индекс в stack,
+        на который в нем есть маркер рекурсии
+
+        Значение, зависящее от схем выше по стеку, не запоминается: при
+        разворачивании с другого места оно выглядело бы иначе.
+        """
+        if ref in self._resolved:
+            self.memo_hits += 1
+            return self._resolved[ref], _NO_CYCLE
+        if ref in stack:
+            return {"$ref": ref, CIRCULAR_REF_KEY: True}, stack.index(ref)
+        try:
+            target = self.target(ref)
+        except (KeyError, ValueError):
+            return {"$ref": ref}, _NO_CYCLE
+
+        level = len(stack)
+        stack.append(ref)
+        try:
+            value, depends_on = self._expand(target, stack)
+        finally:
+            stack.pop()
+        self.expansions += 1
+        if depends_on >= level:
+            self._resolved[ref] = value
+            return value, _NO_CYCLE
+        return value, depends_on
+
+    def _expand(self, node: Any, stack: List[str]) -> Tuple[Any, int]:
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str):
+                # Как и в OpenAPI 3.0, поля рядом с $ref игнорируются
+                return self._expand_ref(ref, stack)
+            lowest = _NO_CYCLE
+            changed = False
+            result = {}
+            for key, item in node.items():
+                value, depends_on = self._expand(item, stack)
+                result[key] = value
+                changed = changed or value is not item
+                lowest = min(lowest, depends_on)
+            return (result if changed else node), lowest
+
+        if isinstance(node, list):
+            lowest = _NO_CYCLE
+            changed = False
+            result = []
+            for item in node:
+                value, depends_on = self._expand(item, stack)
+                result.append(value)
+                changed = changed or value is not item
+                lowest = min(lowest, depends_on)
+            return (result if changed else node), lowest
+
+        return node, _NO_CYCLE
+
+
+class DereferencedView(Mapping):
+    """
+    Ленивое разыменованное представление словаря спецификации
+
+    $ref разрешается только при обращении к значению, поэтому в огромной
+    спецификации разворачиваются лишь те ветки, по которым прошел вызывающий
+    код. Вложенные словари и списки тоже возвращаются как представления.
+
+    Attributes:
+        ref: $ref, через который получен узел (None, если узел не по ссылке)
+        circular: Ссылка ведет на схему, которая уже встречалась выше по пути
+    """
+
+    __slots__ = ("_node", "_resolver", "_refs", "ref", "circular")
+
+    def __init__(self, node: Dict[str, Any], resolver: RefResolver,
+                 refs: Tuple[str, ...] = (), ref: Optional[str] = None, circular: bool = False):
+        self._node = node
+        self._resolver = resolver
+        self._refs = refs
+        self.ref = ref
+        self.circular = circular
+
+    def __getitem__(self, key: str) -> Any:
+        return _wrap(self._node[key], self._resolver, self._refs)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._node
+
+    def __iter__(self):
+        return iter(self._node)
+
+    def __len__(self) -> int:
+        return len(self._node)
+
+    def __repr__(self) -> str:
+        return f"DereferencedView(ref={self.ref!r}, keys={list(self._node)[:10]!r})"
+
+    @property
+    def raw(self) -> Dict[str, Any]:
+        """Исходный словарь спецификации (с неразрешенными $ref внутри)"""
+        return self._node
+
+    def to_dict(self) -> Any:
+        """Полностью развернутая копия узла (см. RefResolver.deref)"""
+        return self._resolver.deref(self._node)
+
+
+class DereferencedList(Sequence):
+    """Ленивое разыменованное представление списка спецификации"""
+
+    __slots__ = ("_node", "_resolver", "_refs")
+
+    def __init__(self, node: List[Any], resolver: RefResolver, refs: Tuple[str, ...] = ()):
+        self._node = node
+        self._resolver = resolver
+        self._refs = refs
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [_wrap(item, self._resolver, self._refs) for item in self._node[index]]
+        return _wrap(self._node[index], self._resolver, self._refs)
+
+    def __len__(self) -> int:
+        return len(self._node)
+
+    @property
+    def raw(self) -> List[Any]:
+        return self._node
+
+    def to_list(self) -> Any:
+        return self._resolver.deref(self._node)
+
+
+def _wrap(value: Any, resolver: RefResolver, refs: Tuple[str, ...]) -> Any:
+    ref = None
+    circular = False
+    if _is_ref(value):
+        try:
+            target = resolver.target(value["$ref"])
+        except (KeyError, ValueError):
+            target = None
+        if target is not None:
+            ref = value["$ref"]
+            circular = ref in refs
+            refs = refs + (ref,)
+            value = target
+
+    if isinstance(value, dict):
+        return DereferencedView(value, resolver, refs, ref, circular)
+    if isinstance(value, list):
+        return DereferencedList(value, resolver, refs)
+    return value
+
+
+# Резолверы последних спецификаций: повторные запросы к закэшированной
+# спецификации (см. spec_cache) переиспользуют уже разрешенные указатели
+_resolvers: "OrderedDict[Tuple[Any, ...], RefResolver]" = OrderedDict()
+_resolvers_lock = threading.Lock()
+
+
+def _shared_sections(spec: Dict[str, Any]) -> Tuple[Tuple[str, Any], ...]:
+    """Разделы спецификации, кроме paths, которые подмножества берут у исходной без копирования"""
+    return tuple(
+        (name, value) for name, value in spec.items()
+        if name != "paths" and isinstance(value, (dict, list))
+    )
+
+
+def get_ref_resolver(spec: Dict[str, Any]) -> RefResolver:
+    """
+    Возвращает общий резолвер для объекта спецификации
+
+    Хранит резолверы OPENAPI_RESOLVER_CACHE_SIZE (по умолчанию 8) последних
+    спецификаций. Ключ — объекты разделов, кроме paths (components, definitions
+    и т.д.), поэтому подмножества одной спецификации (subset_spec, группы
+    fan-out) получают резолвер с общей памятью развернутых схем и не вытесняют
+    резолвер исходной. Спецификация, переданная сюда, не должна изменяться.
+    """
+    sections = _shared_sections(spec)
+    key = tuple((name, id(value)) for name, value in sections) or (id(spec),)
+    with _resolvers_lock:
+        resolver = _resolvers.get(key)
+        if resolver is not None and sections:
+            # id мог достаться новому объекту после сборки мусора
+            if any(resolver.spec.get(name) is not value for name, value in sections):
+                resolver = None
+        elif resolver is not None and resolver.spec is not spec:
+            resolver = None
+        if resolver is None:
+            resolver = RefResolver(spec)
+            _resolvers[key] = resolver
+        _resolvers.move_to_end(key)
+        limit = max(1, int(os.getenv("OPENAPI_RESOLVER_CACHE_SIZE", "8")))
+        while len(_resolvers) > limit:
+            _resolvers.popitem(last=False)
+    return resolver if resolver.spec is spec else resolver.for_spec(spec)
+
+
+def _ref_name(ref: Optional[str]) -> str:
+    return _unescape_pointer(ref.rsplit("/", 1)[-1]) if ref else ""
+
+
+def describe_schema(schema: Any, max_depth: int = 3, max_properties: int = 20) -> str:
+    """
+    Короткое текстовое описание схемы для промпта LLM
+
+    Пример: `Pet{id*: integer(int64), tags: array[Tag{name*: string}]}`,
+    `*` — обязательное поле. Принимает как ленивое представление, так и
+    развернутый словарь; рекурсивные схемы помечаются `(рекурсия)`.
+
+    Args:
+        schema: Схема (DereferencedView или dict)
+        max_depth: Глубина вложенности объектов и массивов в описании
+        max_properties: Сколько полей объекта показывать
+    """
+    if not isinstance(schema, Mapping):
+        return "any"
+    name = _ref_name(getattr(schema, "ref", None) or schema.get("$ref"))
+    if getattr(schema, "circular", False) or schema.get(CIRCULAR_REF_KEY):
+        return f"{name or 'schema'} (рекурсия)"
+    if "$ref" in schema:
+        return name or "any"
+
+    for key, separator in (("allOf", " & "), ("oneOf", " | "), ("anyOf", " | ")):
+        parts = schema.get(key)
+        if parts:
+            text = separator.join(
+                describe_schema(part, max_depth, max_properties) for part in parts[:max_properties]
+            )
+            return f"{name}({text})" if name else f"({text})"
+
+    schema_type = schema.get("type") or ("object" if "properties" in schema else "any")
+    if isinstance(schema_type, Sequence) and not isinstance(schema_type, str):
+        schema_type = "|".join(str(item) for item in schema_type)
+
+    if schema_type == "array":
+        text = f"array[{describe_schema(schema.get('items'), max_depth - 1, max_properties)}]"
+    elif schema_type == "object" and "properties" in schema:
+        if max_depth <= 0:
+            text = "{...}"
+        else:
+            required = set(schema.get("required") or [])
+            fields = []
+            for index, (field, field_schema) in enumerate((schema.get("properties") or {}).items()):
+                if index == max_properties:
+                    fields.append("...")
+                    break
+                marker = "*" if field in required else ""
+                fields.append(f"{field}{marker}: {describe_schema(field_schema, max_depth - 1, max_properties)}")
+            text = "{" + ", ".join(fields) + "}"
+        return f"{name}{text}" if name else f"object{text}"
+    else:
+        text = str(schema_type)
+        if schema.get("format"):
+            text += f"({schema['format']})"
+        if schema.get("enum"):
+            text += " enum[" + ", ".join(str(value) for value in list(schema["enum"])[:10]) + "]"
+    return f"{name}: {text}" if name else text
+
+
+def _json_media_schema(content: Any) -> Any:
+    """Схема из `content`: предпочитается JSON, иначе первый тип с схемой"""
+    if not isinstance(content, Mapping):
+        return None
+    fallback = None
+    for media_type, media in content.items():
+        if not isinstance(media, Mapping) or "schema" not in media:
+            continue
+        if "json" in media_type:
+            return media["schema"]
+        if fallback is None:
+            fallback = media["schema"]
+    return fallback
+
+
+def request_body_schema(operation: Any) -> Any:
+    """Схема тела запроса операции (requestBody в OpenAPI 3, параметр in: body в Swagger 2)"""
+    body = operation.get("requestBody")
+    if isinstance(body, Mapping):
+        return _json_media_schema(body.get("content"))
+    for parameter in operation.get("parameters") or []:
+        if isinstance(parameter, Mapping) and parameter.get("in") == "body":
+            return parameter.get("schema")
+    return None
+
+
+def response_schema(response: Any) -> Any:
+    """Схема ответа (content в OpenAPI 3, schema в Swagger 2)"""
+    if not isinstance(response, Mapping):
+        return None
+    if "content" in response:
+        return _json_media_schema(response["content"])
+    return response.get("schema")
@@ -0,0 +1,64 @@
+"""
+Объединение одинаковых одновременных запросов (single-flight)
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Выполняет не более одного вызова на ключ в каждый момент времени
+
+    Вызывающие с одинаковым ключом, пришедшие пока первый вызов еще
+    выполняется, ждут его же результат. Исключение получают все ожидающие.
+    Отмена одного ожидающего не отменяет общий вызов для остальных; когда
+    отменились все ожидающие, общий вызов тоже отменяется.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[asyncio.Task, int] = {}
+        self._stats = {"calls": 0, "coalesced": 0, "cancelled": 0}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполняет fn() или присоединяется к уже идущему вызову с тем же ключом
+
+        Args:
+            key: Нормализованный ключ запроса
+            fn: Фабрика корутины, выполняющей запрос
+
+        Returns:
+            Результат общего вызова
+        """
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self._stats["calls"] += 1
+        else:
+            self._stats["coalesced"] += 1
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    # Результат больше никому не нужен
+                    self._stats["cancelled"] += 1
+                    task.cancel()
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Помечаем исключение как полученное, даже если все ожидающие отменились
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики вызовов и объединенных запросов"""
+        return {**self._stats, "inflight": len(self._inflight)}
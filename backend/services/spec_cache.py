@@ -0,0 +1,177 @@
+"""
+Кэш OpenAPI спецификаций, загруженных по URL, с условной перепроверкой
+"""
+from typing import Dict, Any, Optional
+from collections import OrderedDict
+import hashlib
+import os
+import threading
+import time
+
+
+class SpecCacheEntry:
+    """Загруженная спецификация и валидаторы для условного запроса"""
+
+    def __init__(
+        self,
+        url: str,
+        spec: Dict[str, Any],
+        content_hash: str,
+        size: int,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ):
+        self.url = url
+        self.spec = spec
+        self.content_hash = content_hash
+        self.size = size
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.time()
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Заголовки If-None-Match / If-Modified-Since для перепроверки"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def content_hash(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+class SpecCache:
+    """
+    LRU распарсенных спецификаций по URL
+
+    Запись перепроверяется на сервере при каждом обращении: ответ 304 стоит
+    одного короткого запроса без загрузки и парсинга. Если сервер не
+    поддерживает валидаторы и отдает 200, спецификация с тем же хэшем
+    содержимого (по этому или другому URL) не парсится повторно.
+
+    Распарсенная спецификация общая для всех вызывающих и не должна изменяться.
+    """
+
+    def __init__(self, max_entries: int = 16):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, SpecCacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "content_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "bytes_saved": 0,
+            "bytes_downloaded": 0
+        }
+
+    def get(self, url: str) -> Optional[SpecCacheEntry]:
+        """Запись для URL (без учета в статистике: ее еще нужно перепроверить)"""
+        with self._lock:
+            return self._entries.get(url)
+
+    def revalidated(self, entry: SpecCacheEntry) -> Dict[str, Any]:
+        """
+        Учитывает ответ 304 на условный запрос
+
+        Returns:
+            Спецификация из кэша
+        """
+        with self._lock:
+            if entry.url in self._entries:
+                self._entries.move_to_end(entry.url)
+            self._stats["hits"] += 1
+            self._stats["bytes_saved"] += entry.size
+            return entry.spec
+
+    def find_by_content(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Уже распарсенная спецификация с тем же хэшем содержимого"""
+        with self._lock:
+            for entry in self._entries.values():
+                if entry.content_hash == digest:
+                    return entry.spec
+            return None
+
+    def store(
+        self,
+        url: str,
+        spec: Dict[str, Any],
+        digest: str,
+        size: int,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        reused: bool = False
+    ) -> None:
+        """
+        Сохраняет загруженную спецификацию (ответ 200)
+
+        Args:
+            reused: Спецификация взята из find_by_content, парсинг не понадобился
+        """
+        with self._lock:
+            self._stats["content_hits" if reused else "misses"] += 1
+            self._stats["bytes_downloaded"] += size
+            self._entries[url] = SpecCacheEntry(
+                url=url,
+                spec=spec,
+                content_hash=digest,
+                size=size,
+                etag=etag,
+                last_modified=last_modified
+            )
+            self._entries.move_to_end(url)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, url: Optional[str] = None) -> int:
+        """
+        Удаляет записи из кэша
+
+        Args:
+            url: URL спецификации; если не указан — очищается весь кэш
+
+        Returns:
+            Количество удаленных записей
+        """
+        with self._lock:
+            if url is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            return 1 if self._entries.pop(url, None) is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий/промахов, сэкономленные байты и параметры кэша"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["content_hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": round((self._stats["hits"] + self._stats["content_hits"]) / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "cached_bytes": sum(entry.size for entry in self._entries.values())
+            }
+
+
+_spec_cache: Optional[SpecCache] = None
+
+
+def get_spec_cache() -> Optional[SpecCache]:
+    """
+    Возвращает общий для процесса кэш спецификаций
+
+    Настраивается переменными окружения OPENAPI_CACHE_ENABLED и OPENAPI_CACHE_MAX_ENTRIES.
+
+    Returns:
+        Экземпляр кэша или None, если кэш выключен
+    """
+    global _spec_cache
+    if os.getenv("OPENAPI_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if _spec_cache is None:
+        _spec_cache = SpecCache(max_entries=int(os.getenv("OPENAPI_CACHE_MAX_ENTRIES", "16")))
+    return _spec_cache
@@ -0,0 +1,102 @@
+"""
+Сравнение версий OpenAPI спецификации по операциям
+"""
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+
+from .openapi_parser import OpenAPIParser
+from .ref_resolver import get_ref_resolver
+
+
+# Поля endpoint, от которых зависят сгенерированные тесты
+_FINGERPRINT_FIELDS = (
+    "summary", "description", "operation_id", "tags",
+    "parameters", "request_body", "responses"
+)
+
+
+def operation_key(method: str, path: str) -> str:
+    """Ключ операции: `GET /v3/vms/{id}`"""
+    return f"{method.upper()} {path}"
+
+
+def _spec_context(spec: Dict[str, Any], resolver: Any) -> Dict[str, Any]:
+    """Общие для всех операций части спецификации, которые попадают в промпт генерации"""
+    info = spec.get("info") or {}
+    components = spec.get("components") or {}
+    return {
+        "openapi": spec.get("openapi") or spec.get("swagger"),
+        "title": info.get("title"),
+        "description": info.get("description"),
+        "security": resolver.deref(spec.get("security")),
+        "security_schemes": resolver.deref(components.get("securitySchemes") or spec.get("securityDefinitions"))
+    }
+
+
+def fingerprint_operations(spec: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Хэш каждой операции спецификации с учетом развернутых схем
+
+    Хэш меняется при изменении самой операции (в том числе ее security),
+    общих параметров пути, любой схемы, на которую операция ссылается (в
+    том числе транзитивно), и общего контекста спецификации: версии OpenAPI,
+    info.title / info.description, корневого security и схем
+    аутентификации. Порядок ключей в документе на него не влияет.
+
+    Args:
+        spec: OpenAPI спецификация
+
+    Returns:
+        {ключ операции: SHA-256} в порядке спецификации
+    """
+    resolver = get_ref_resolver(spec)
+    paths = spec.get("paths") or {}
+    context = _spec_context(spec, resolver)
+    fingerprints = {}
+    for endpoint in OpenAPIParser().extract_endpoints(spec, resolve_refs=True):
+        path_item = paths.get(endpoint["path"])
+        payload = {field: endpoint[field] for field in _FINGERPRINT_FIELDS}
+        payload["context"] = context
+        if isinstance(path_item, dict):
+            payload["path_parameters"] = resolver.deref(path_item.get("parameters") or [])
+            operation = next(
+                (item for key, item in path_item.items() if key.upper() == endpoint["method"]), None
+            )
+            if isinstance(operation, dict):
+                payload["security"] = resolver.deref(operation.get("security"))
+        serialized = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+        fingerprints[operation_key(endpoint["method"], endpoint["path"])] = hashlib.sha256(
+            serialized.encode("utf-8")
+        ).hexdigest()
+    return fingerprints
+
+
+def diff_fingerprints(previous: Dict[str, str], current: Dict[str, str]) -> Dict[str, List[str]]:
+    """
+    Классифицирует операции по двум наборам хэшей
+
+    Returns:
+        {"added", "changed", "removed", "unchanged"} — списки ключей операций
+    """
+    return {
+        "added": [key for key in current if key not in previous],
+        "changed": [key for key in current if key in previous and previous[key] != current[key]],
+        "removed": [key for key in previous if key not in current],
+        "unchanged": [key for key in current if previous.get(key) == current[key]]
+    }
+
+
+def diff_specs(previous_spec: Optional[Dict[str, Any]], spec: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Изменения операций между версиями спецификации
+
+    Args:
+        previous_spec: Предыдущая версия (None — все операции новые)
+        spec: Новая версия
+
+    Returns:
+        {"added", "changed", "removed", "unchanged"} — списки ключей операций
+    """
+    previous = fingerprint_operations(previous_spec) if previous_spec is not None else {}
+    return diff_fingerprints(previous, fingerprint_operations(spec))
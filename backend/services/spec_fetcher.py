@@ -0,0 +1,77 @@
+"""
+Асинхронная загрузка OpenAPI спецификаций через общий пул соединений
+"""
+from typing import Dict, Optional, Tuple
+import os
+import httpx
+
+from .loop_bound_client import LoopBoundClient
+
+
+def _create_spec_http_client() -> httpx.AsyncClient:
+    max_connections = int(os.getenv("OPENAPI_FETCH_MAX_CONNECTIONS", "16"))
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        timeout=httpx.Timeout(float(os.getenv("OPENAPI_FETCH_TIMEOUT", "10"))),
+        follow_redirects=True
+    )
+
+
+# Пул соединений для загрузки спецификаций; как и пул LLM, привязан к event loop
+_spec_http_client = LoopBoundClient(_create_spec_http_client)
+
+
+def get_spec_http_client() -> httpx.AsyncClient:
+    """
+    Возвращает общий HTTP-клиент для загрузки спецификаций
+
+    Настраивается переменными окружения OPENAPI_FETCH_TIMEOUT (сек, по умолчанию 10)
+    и OPENAPI_FETCH_MAX_CONNECTIONS (по умолчанию 16).
+    """
+    return _spec_http_client.get()
+
+
+async def close_spec_http_client() -> None:
+    """Закрывает пул соединений (вызывается при остановке приложения)"""
+    await _spec_http_client.aclose()
+
+
+def _max_spec_bytes() -> int:
+    return int(os.getenv("OPENAPI_MAX_SPEC_BYTES", str(50 * 1024 * 1024)))
+
+
+async def fetch_spec_bytes(
+    url: str,
+    headers: Optional[Dict[str, str]] = None
+) -> Tuple[int, bytes, httpx.Headers]:
+    """
+    Загружает спецификацию потоком с ограничением размера
+
+    Args:
+        url: URL спецификации
+        headers: Дополнительные заголовки (например, условные If-None-Match)
+
+    Returns:
+        (HTTP статус, тело, заголовки ответа); для 304 и 404 тело пустое
+
+    Raises:
+        ValueError: Ответ больше OPENAPI_MAX_SPEC_BYTES (по умолчанию 50 МБ)
+        httpx.HTTPError: Сетевая ошибка или ошибочный статус ответа
+    """
+    max_bytes = _max_spec_bytes()
+    async with get_spec_http_client().stream("GET", url, headers=headers) as response:
+        if response.status_code in (304, 404):
+            return response.status_code, b"", response.headers
+        response.raise_for_status()
+
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > max_bytes:
+            raise ValueError(f"Спецификация {url} больше {max_bytes} байт")
+        chunks = []
+        size = 0
+        async for chunk in response.aiter_bytes():
+            size += len(chunk)
+            if size > max_bytes:
+                raise ValueError(f"Спецификация {url} больше {max_bytes} байт")
+            chunks.append(chunk)
+        return response.status_code, b"".join(chunks), response.headers
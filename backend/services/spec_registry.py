@@ -0,0 +1,326 @@
+"""
+Реестр распарсенных OpenAPI спецификаций с индексом endpoints
+"""
+from typing import Dict, Any, Callable, Hashable, Iterable, List, Optional
+from collections import OrderedDict
+from bisect import bisect_left
+import hashlib
+import os
+import threading
+import time
+import uuid
+
+from .openapi_parser import OpenAPIParser
+from .ref_resolver import get_ref_resolver
+
+
+# Поля endpoint, которые можно запросить; по умолчанию отдаются только легкие
+ENDPOINT_FIELDS = (
+    "path", "method", "summary", "description", "operation_id",
+    "tags", "parameters", "request_body", "responses"
+)
+DEFAULT_ENDPOINT_FIELDS = ("path", "method", "summary", "operation_id", "tags")
+_REF_FIELDS = ("parameters", "request_body", "responses")
+
+# Сколько производных значений (подмножеств, описаний для промптов) хранить на спецификацию
+_MEMO_SIZE = 64
+
+
+class EndpointIndex:
+    """
+    Индекс endpoints спецификации по тегу, методу, префиксу пути и operationId
+
+    Фильтры пересекаются; результат сохраняет порядок endpoints в спецификации.
+    """
+
+    def __init__(self, endpoints: List[Dict[str, Any]]):
+        self.endpoints = endpoints
+        self._by_tag: Dict[str, List[int]] = {}
+        self._by_method: Dict[str, List[int]] = {}
+        self._by_operation_id: Dict[str, List[int]] = {}
+        for position, endpoint in enumerate(endpoints):
+            for tag in endpoint.get("tags") or []:
+                self._by_tag.setdefault(str(tag), []).append(position)
+            self._by_method.setdefault(endpoint["method"], []).append(position)
+            if endpoint.get("operation_id"):
+                self._by_operation_id.setdefault(endpoint["operation_id"], []).append(position)
+        # Отсортированные пути: префикс — это непрерывный диапазон
+        self._paths = sorted((endpoint["path"], position) for position, endpoint in enumerate(endpoints))
+
+    def tags(self) -> Dict[str, int]:
+        """Число endpoints по каждому тегу"""
+        return {tag: len(positions) for tag, positions in self._by_tag.items()}
+
+    def _by_path_prefix(self, prefix: str) -> List[int]:
+        start = bisect_left(self._paths, (prefix,))
+        positions = []
+        for path, position in self._paths[start:]:
+            if not path.startswith(prefix):
+                break
+            positions.append(position)
+        return positions
+
+    def find(
+        self,
+        tag: Optional[str] = None,
+        method: Optional[str] = None,
+        path_prefix: Optional[str] = None,
+        operation_id: Optional[str] = None
+    ) -> List[int]:
+        """Позиции endpoints, подходящих под все заданные фильтры"""
+        candidates: Optional[set] = None
+        for positions in (
+            self._by_tag.get(tag, []) if tag else None,
+            self._by_method.get(method.upper(), []) if method else None,
+            self._by_path_prefix(path_prefix) if path_prefix else None,
+            self._by_operation_id.get(operation_id, []) if operation_id else None,
+        ):
+            if positions is None:
+                continue
+            candidates = set(positions) if candidates is None else candidates.intersection(positions)
+            if not candidates:
+                return []
+        if candidates is None:
+            return list(range(len(self.endpoints)))
+        return sorted(candidates)
+
+
+class RegisteredSpec:
+    """Спецификация в реестре: сама спецификация, индекс endpoints и сводка"""
+
+    def __init__(self, spec_id: str, spec: Dict[str, Any], source: Optional[str] = None):
+        parser = OpenAPIParser()
+        self.spec_id = spec_id
+        self.spec = spec
+        self.source = source
+        self.index = EndpointIndex(parser.extract_endpoints(spec))
+        schemas = parser.extract_schemas(spec) or {}
+        security = parser.get_security_schemes(spec) or {}
+        self.summary = {
+            "validation": parser.validate_spec(spec),
+            "title": (spec.get("info") or {}).get("title", ""),
+            "endpoints_count": len(self.index.endpoints),
+            "schemas": list(schemas.keys()),
+            "schemas_count": len(schemas),
+            "security_schemes": list(security.keys()),
+            "tags": self.index.tags()
+        }
+        self.registered_at = time.time()
+        self._memo: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+
+    def memo(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        Значение, производное от спецификации, вычисленное один раз
+
+        Например, описание подмножества endpoints для промпта: повторная
+        генерация по тому же spec_id и фильтрам не форматирует спецификацию заново.
+        """
+        with self._memo_lock:
+            if key in self._memo:
+                self._memo.move_to_end(key)
+                return self._memo[key]
+        value = factory()
+        with self._memo_lock:
+            self._memo[key] = value
+            while len(self._memo) > _MEMO_SIZE:
+                self._memo.popitem(last=False)
+        return value
+
+    def subset_spec(
+        self,
+        tag: Optional[str] = None,
+        method: Optional[str] = None,
+        path_prefix: Optional[str] = None,
+        operation_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Спецификация только с endpoints, подходящими под фильтры
+
+        Все разделы, кроме paths, общие с исходной спецификацией (не копируются),
+        поэтому $ref по-прежнему разрешаются. Без фильтров возвращается сама
+        спецификация.
+
+        Raises:
+            ValueError: Под фильтры не подходит ни один endpoint
+        """
+        if not (tag or method or path_prefix or operation_id):
+            return self.spec
+        method = method.upper() if method else None
+        return self.memo(
+            ("subset", tag, method, path_prefix, operation_id),
+            lambda: self._build_subset(self.index.find(tag, method, path_prefix, operation_id))
+        )
+
+    def _build_subset(self, positions: List[int]) -> Dict[str, Any]:
+        if not positions:
+            raise ValueError("Под заданные фильтры не подходит ни один endpoint спецификации")
+        operations = [
+            (self.index.endpoints[position]["path"], self.index.endpoints[position]["method"])
+            for position in positions
+        ]
+        return OpenAPIParser().subset_spec(self.spec, operations)
+
+    def list_endpoints(
+        self,
+        tag: Optional[str] = None,
+        method: Optional[str] = None,
+        path_prefix: Optional[str] = None,
+        operation_id: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 50,
+        fields: Optional[Iterable[str]] = None,
+        resolve_refs: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Страница endpoints по фильтрам
+
+        Args:
+            tag, method, path_prefix, operation_id: Фильтры (пересекаются)
+            offset: Сколько подходящих endpoints пропустить
+            limit: Размер страницы
+            fields: Поля endpoint из ENDPOINT_FIELDS (по умолчанию DEFAULT_ENDPOINT_FIELDS)
+            resolve_refs: Развернуть $ref в parameters/request_body/responses
+
+        Returns:
+            {"total", "offset", "limit", "fields", "items"}
+
+        Raises:
+            ValueError: Неизвестное поле или некорректные offset/limit
+        """
+        fields = list(fields) if fields else list(DEFAULT_ENDPOINT_FIELDS)
+        unknown = [field for field in fields if field not in ENDPOINT_FIELDS]
+        if unknown:
+            raise ValueError(
+                f"Неизвестные поля endpoint: {', '.join(unknown)}. Доступные: {', '.join(ENDPOINT_FIELDS)}"
+            )
+        if offset < 0 or limit < 1:
+            raise ValueError("offset должен быть >= 0, limit — >= 1")
+
+        positions = self.index.find(tag, method, path_prefix, operation_id)
+        resolver = get_ref_resolver(self.spec) if resolve_refs else None
+        items = []
+        for position in positions[offset:offset + limit]:
+            endpoint = self.index.endpoints[position]
+            item = {}
+            for field in fields:
+                value = endpoint.get(field)
+                if resolver is not None and field in _REF_FIELDS:
+                    value = resolver.deref(value)
+                item[field] = value
+            items.append(item)
+        return {"total": len(positions), "offset": offset, "limit": limit, "fields": fields, "items": items}
+
+    def info(self, include_spec: bool = False) -> Dict[str, Any]:
+        """Сводка по спецификации; сама спецификация — только по запросу"""
+        result = {"spec_id": self.spec_id, **self.summary}
+        if include_spec:
+            result["spec"] = self.spec
+        return result
+
+
+def make_spec_id(source_key: Optional[str]) -> str:
+    """spec_id по ключу источника (хэш содержимого) или случайный, если ключа нет"""
+    if source_key is None:
+        return uuid.uuid4().hex[:16]
+    return hashlib.sha256(source_key.encode("utf-8")).hexdigest()[:16]
+
+
+class SpecRegistry:
+    """
+    LRU распарсенных спецификаций по spec_id
+
+    spec_id выводится из содержимого спецификации, поэтому повторный парсинг
+    того же документа возвращает уже построенный индекс. Спецификации в
+    реестре общие для всех запросов и не должны изменяться.
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, RegisteredSpec]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"registered": 0, "reused": 0, "evictions": 0}
+
+    def register(self, spec: Dict[str, Any], source_key: Optional[str] = None, source: Optional[str] = None) -> RegisteredSpec:
+        """
+        Добавляет спецификацию в реестр и строит индекс endpoints
+
+        Args:
+            spec: Распарсенная спецификация
+            source_key: Ключ содержимого (например, SHA-256 исходного документа);
+                одинаковый ключ возвращает уже зарегистрированную спецификацию
+            source: Откуда получена спецификация (URL), только для информации
+        """
+        spec_id = make_spec_id(source_key)
+        with self._lock:
+            entry = self._entries.get(spec_id)
+            if entry is not None:
+                self._entries.move_to_end(spec_id)
+                self._stats["reused"] += 1
+                return entry
+
+        # Индекс строится вне блокировки: для большой спецификации это заметное время
+        entry = RegisteredSpec(spec_id, spec, source)
+        with self._lock:
+            self._entries[spec_id] = entry
+            self._entries.move_to_end(spec_id)
+            self._stats["registered"] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+        return entry
+
+    def find(self, source_key: str) -> Optional[RegisteredSpec]:
+        """
+        Уже зарегистрированная спецификация с тем же ключом содержимого
+
+        Позволяет не парсить документ, который уже есть в реестре.
+        """
+        entry = self.get(make_spec_id(source_key))
+        if entry is not None:
+            with self._lock:
+                self._stats["reused"] += 1
+        return entry
+
+    def get(self, spec_id: str) -> Optional[RegisteredSpec]:
+        with self._lock:
+            entry = self._entries.get(spec_id)
+            if entry is not None:
+                self._entries.move_to_end(spec_id)
+            return entry
+
+    def remove(self, spec_id: Optional[str] = None) -> int:
+        """Удаляет спецификацию (без spec_id — все); возвращает число удаленных"""
+        with self._lock:
+            if spec_id is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+            return 1 if self._entries.pop(spec_id, None) is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "specs": [
+                    {"spec_id": entry.spec_id, "title": entry.summary["title"], "source": entry.source}
+                    for entry in self._entries.values()
+                ]
+            }
+
+
+_spec_registry: Optional[SpecRegistry] = None
+
+
+def get_spec_registry() -> SpecRegistry:
+    """
+    Возвращает общий реестр спецификаций
+
+    Размер задается OPENAPI_REGISTRY_MAX_ENTRIES (по умолчанию 32).
+    """
+    global _spec_registry
+    if _spec_registry is None:
+        _spec_registry = SpecRegistry(max(1, int(os.getenv("OPENAPI_REGISTRY_MAX_ENTRIES", "32"))))
+    return _spec_registry
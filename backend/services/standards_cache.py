@@ -0,0 +1,85 @@
+"""
+Кэш результатов проверки стандартов по нормализованному коду тест-кейса
+"""
+from typing import List, Optional
+import hashlib
+import io
+import os
+import tokenize
+from .llm_cache import LLMResponseCache
+
+
+# Токены, которые не влияют на ключ: комментарии и незначащие переводы строк
+_SKIPPED_TOKENS = {tokenize.COMMENT, tokenize.NL, tokenize.ENDMARKER}
+
+
+def normalize_source(source: str) -> str:
+    """
+    Нормализует код тест-кейса для ключа кэша
+
+    Код разбирается на токены: комментарии, пустые строки и пробелы между
+    токенами не влияют на результат, а строковые литералы и докстринги
+    сохраняются как есть. Уровень вложенности сохраняется: в Python отступы
+    значимы. Код, который не разбирается на токены, возвращается без изменений.
+    """
+    lines: List[str] = []
+    current: List[str] = []
+    depth = 0
+    try:
+        for token in tokenize.generate_tokens(io.StringIO(source).readline):
+            if token.type == tokenize.INDENT:
+                depth += 1
+            elif token.type == tokenize.DEDENT:
+                depth -= 1
+            elif token.type == tokenize.NEWLINE:
+                if current:
+                    lines.append("\t" * depth + " ".join(current))
+                current = []
+            elif token.type not in _SKIPPED_TOKENS:
+                current.append(token.string)
+    except (tokenize.TokenError, SyntaxError):
+        return source
+    if current:
+        lines.append("\t" * depth + " ".join(current))
+    return "\n".join(lines)
+
+
+def make_result_key(test_case: str, rules_version: str) -> str:
+    """
+    Ключ кэша результата проверки
+
+    Args:
+        test_case: Код тест-кейса
+        rules_version: Версия набора правил (RuleSet.version)
+
+    Returns:
+        SHA-256 от версии правил и нормализованного кода
+    """
+    payload = f"{rules_version}\0{normalize_source(test_case)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+_standards_cache: Optional[LLMResponseCache] = None
+
+
+def get_standards_cache() -> Optional[LLMResponseCache]:
+    """
+    Возвращает общий для процесса кэш результатов проверки стандартов
+
+    Настраивается переменными окружения STANDARDS_CACHE_ENABLED,
+    STANDARDS_CACHE_MAX_ENTRIES, STANDARDS_CACHE_TTL и STANDARDS_CACHE_DB_PATH.
+
+    Returns:
+        Экземпляр кэша или None, если кэш выключен
+    """
+    global _standards_cache
+    if os.getenv("STANDARDS_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+    if _standards_cache is None:
+        _standards_cache = LLMResponseCache(
+            max_entries=int(os.getenv("STANDARDS_CACHE_MAX_ENTRIES", "4096")),
+            ttl_seconds=float(os.getenv("STANDARDS_CACHE_TTL", "604800")),
+            db_path=os.getenv("STANDARDS_CACHE_DB_PATH") or None,
+            table="standards_cache"
+        )
+    return _standards_cache
@@ -1,73 +1,207 @@
 """
 Модуль проверки тест-кейсов на соответствие стандартам
 """
-from typing import Dict, Any, List
-import re
+from typing import Dict, Any, List, Optional, AsyncIterator, Tuple, Set, Sequence
+import asyncio
+import ast
+import json
+import os
 from .llm_service import LLMService
+from .test_fingerprint import ParsedTestCase, dotted_name, is_step_call
+from .standards_rules import DEFAULT_RULES, RuleSet, load_team_rules
+from .prompt_budget import pack_by_budget
+from .standards_cache import get_standards_cache, make_result_key
+from .llm_cache import LLMResponseCache
 
 
 class StandardsChecker:
     """Проверка тест-кейсов на соответствие стандартам Allure"""
     
-    def __init__(self):
+    # Правила по умолчанию; экземпляр может получить правила команды
+    rules_config: Dict[str, Any] = DEFAULT_RULES
+    required_decorators: Sequence[str] = tuple(DEFAULT_RULES["decorators"])
+    _rule_set: Optional[RuleSet] = None
+    
+    def __init__(self, rules: Optional[Dict[str, Any]] = None):
         self.llm_service = LLMService()
-        self.required_decorators = [
-            r'@allure\.manual',
-            r'@allure\.label\("owner"',
-            r'@allure\.feature\(',
-            r'@allure\.story\(',
-            r'@allure\.suite\(',
-            r'@pytest\.mark\.manual'
-        ]
+        self.rules_config = rules or DEFAULT_RULES
+        self.required_decorators = list(self.rules_config["decorators"])
+    
+    @classmethod
+    def for_team(cls, team: str) -> "StandardsChecker":
+        """Проверка с правилами команды (см. load_team_rules)"""
+        return cls(rules=load_team_rules(team))
+
+    @classmethod
+    def static_only(cls, rules: Optional[Dict[str, Any]] = None) -> "StandardsChecker":
+        """Проверка только статическими правилами, без LLMService (для процессов пула)"""
+        checker = cls.__new__(cls)
+        checker.llm_service = None
+        checker.rules_config = rules or DEFAULT_RULES
+        checker.required_decorators = list(checker.rules_config["decorators"])
+        return checker
+
+    @property
+    def rule_set(self) -> RuleSet:
+        """Скомпилированные правила; пересобираются при изменении required_decorators"""
+        if self._rule_set is None or self._rule_set.decorators != list(self.required_decorators):
+            self._rule_set = RuleSet({**self.rules_config, "decorators": list(self.required_decorators)})
+        return self._rule_set
+    
+    def _ast_max_bytes(self) -> int:
+        return int(os.getenv("STANDARDS_AST_MAX_BYTES", "1000000"))
     
     async def check_test_case(
         self,
-        test_case: str
+        test_case: str,
+        deep_review: bool = False
     ) -> Dict[str, Any]:
         """
         Проверяет тест-кейс на соответствие стандартам
         
+        Сначала выполняются статические проверки. LLM проверка качества
+        запускается, только если балл попал в зону неопределенности
+        (см. needs_llm_review) или запрошена глубокая проверка.
+        
         Args:
             test_case: Код тест-кейса
+            deep_review: Всегда выполнять LLM проверку
         
         Returns:
-            Результат проверки с рекомендациями
+            Результат проверки с рекомендациями; поле tier — "static" или "llm",
+            cached — результат взят из кэша (см. get_standards_cache)
+        """
+        cache = get_standards_cache()
+        key = make_result_key(test_case, self.rule_set.version) if cache is not None else None
+        if cache is not None:
+            cached = await self._cached_result(cache, key, deep_review)
+            if cached is not None:
+                return cached
+        
+        static = self._static_check(test_case)
+        if not self.needs_llm_review(static["score"], deep_review):
+            result = self._build_result(static, None)
+        else:
+            # LLM проверка качества
+            quality_check = await self._llm_quality_check(test_case)
+            result = self._build_result(static, quality_check)
+        
+        await self._remember_result(cache, key, result)
+        return result
+    
+    async def _cached_result(
+        self,
+        cache: LLMResponseCache,
+        key: str,
+        deep_review: bool
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Результат из кэша, если он годится для запроса
+        
+        Ключ включает версию правил, поэтому изменение правил (в том числе
+        required_decorators) делает старые записи недостижимыми. Статический
+        вердикт не используется, если теперь для его балла нужна LLM проверка.
+        """
+        value = await cache.aget(key)
+        if value is None:
+            return None
+        result = json.loads(value)
+        if result["tier"] == "static" and self.needs_llm_review(result["score"], deep_review):
+            return None
+        return {**result, "cached": True}
+    
+    async def _remember_result(
+        self,
+        cache: Optional[LLMResponseCache],
+        key: Optional[str],
+        result: Dict[str, Any]
+    ) -> None:
+        """Сохраняет результат в кэш; результаты с ошибкой LLM не кэшируются"""
+        if cache is None or (result["quality_analysis"] or {}).get("error"):
+            return
+        await cache.aset(key, json.dumps(result, ensure_ascii=False))
+    
+    def needs_llm_review(self, score: float, deep_review: bool = False) -> bool:
+        """
+        Нужна ли LLM проверка для статического балла
+        
+        Балл ниже STANDARDS_UNCERTAIN_MIN (по умолчанию 50) — явный провал,
+        не ниже STANDARDS_UNCERTAIN_MAX (по умолчанию 90) — явный успех; LLM
+        нужна только между ними. STANDARDS_LLM_TIERING=false возвращает
+        LLM проверку для всех тест-кейсов.
+        """
+        if deep_review or os.getenv("STANDARDS_LLM_TIERING", "true").lower() != "true":
+            return True
+        low = float(os.getenv("STANDARDS_UNCERTAIN_MIN", "50"))
+        high = float(os.getenv("STANDARDS_UNCERTAIN_MAX", "90"))
+        return low <= score < high
+    
+    def _static_check(self, test_case: str) -> Dict[str, Any]:
+        """
+        Статические проверки без LLM: структура, декораторы, AAA и балл
+        
+        Все текстовые правила проверяются одним вызовом RuleSet.scan. Структура
+        берется из AST; для больших файлов и невалидного Python — из текстовых правил.
         """
+        parsed = ParsedTestCase(test_case) if len(test_case) <= self._ast_max_bytes() else None
+        sections = ("decorators", "aaa", "hints") if parsed and parsed.ok else ("decorators", "aaa", "structure")
+        hits = self.rule_set.scan(test_case, self.rule_set.rule_ids(*sections))
+        
         # Структурная проверка
-        structure_check = self._check_structure(test_case)
+        structure_check = self._check_structure(test_case, parsed, hits)
         
         # Проверка декораторов
-        decorators_check = self._check_decorators(test_case)
+        decorators_check = self._check_decorators(test_case, hits)
         
         # Проверка AAA паттерна
-        aaa_check = self._check_aaa_pattern(test_case)
-        
-        # LLM проверка качества
-        quality_check = await self._llm_quality_check(test_case)
-        
-        # Общая оценка
-        score = self._calculate_score(structure_check, decorators_check, aaa_check)
+        aaa_check = self._check_aaa_pattern(test_case, hits)
         
         return {
-            "score": score,
+            "score": self._calculate_score(structure_check, decorators_check, aaa_check),
             "structure": structure_check,
             "decorators": decorators_check,
-            "aaa_pattern": aaa_check,
+            "aaa_pattern": aaa_check
+        }
+    
+    def _build_result(
+        self,
+        static: Dict[str, Any],
+        quality_check: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Итоговый результат проверки тест-кейса (без LLM проверки — tier "static")"""
+        return {
+            **static,
+            "tier": "static" if quality_check is None else "llm",
+            "cached": False,
             "quality_analysis": quality_check,
             "recommendations": self._generate_recommendations(
-                structure_check, decorators_check, aaa_check, quality_check
+                static["structure"], static["decorators"], static["aaa_pattern"], quality_check
             )
         }
     
-    def _check_structure(self, test_case: str) -> Dict[str, Any]:
+    def _check_structure(
+        self,
+        test_case: str,
+        parsed: Optional[ParsedTestCase] = None,
+        hits: Optional[Set[str]] = None
+    ) -> Dict[str, Any]:
         """Проверяет структуру тест-кейса"""
-        checks = {
-            "has_class": bool(re.search(r'class\s+\w+', test_case)),
-            "has_test_method": bool(re.search(r'def\s+test_\w+', test_case)),
-            "has_description": bool(re.search(r'""".*"""', test_case, re.DOTALL)),
-            "has_steps": bool(re.search(r'allure_step|with\s+allure\.step', test_case)),
-            "has_expected_result": bool(re.search(r'assert|expected|should', test_case, re.IGNORECASE))
-        }
+        if parsed is None and len(test_case) <= self._ast_max_bytes():
+            parsed = ParsedTestCase(test_case)
+        rule_set = self.rule_set
+        
+        if parsed is not None and parsed.ok:
+            if hits is None:
+                hits = rule_set.scan(test_case, rule_set.rule_ids("hints"))
+            checks = self._structure_from_ast(parsed, hits)
+        else:
+            # Невалидный Python и слишком большие файлы проверяем по тексту
+            if hits is None:
+                hits = rule_set.scan(test_case, rule_set.rule_ids("structure"))
+            checks = {
+                name: f"structure:{name}" in hits
+                for name in rule_set.rules.get("structure", {})
+            }
         
         return {
             "passed": all(checks.values()),
@@ -75,13 +209,47 @@ class StandardsChecker:
             "missing": [k for k, v in checks.items() if not v]
         }
     
-    def _check_decorators(self, test_case: str) -> Dict[str, Any]:
+    def _structure_from_ast(self, parsed: ParsedTestCase, hits: Set[str]) -> Dict[str, bool]:
+        """Структурные признаки за один обход AST"""
+        has_class = has_test_method = has_description = has_steps = has_assert = False
+        
+        for node in ast.walk(parsed.tree):
+            if isinstance(node, ast.Assert):
+                has_assert = True
+            elif isinstance(node, (ast.With, ast.AsyncWith)):
+                if any(is_step_call(item.context_expr) for item in node.items):
+                    has_steps = True
+            elif isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                if isinstance(node, ast.ClassDef):
+                    has_class = True
+                elif not isinstance(node, ast.Module) and node.name.startswith("test_"):
+                    has_test_method = True
+                if ast.get_docstring(node):
+                    has_description = True
+                for decorator in getattr(node, "decorator_list", []):
+                    if dotted_name(decorator).startswith("allure.description"):
+                        has_description = True
+                    if is_step_call(decorator):
+                        has_steps = True
+        
+        return {
+            "has_class": has_class,
+            "has_test_method": has_test_method,
+            "has_description": has_description,
+            "has_steps": has_steps,
+            "has_expected_result": has_assert or "hints:expected_result" in hits
+        }
+    
+    def _check_decorators(self, test_case: str, hits: Optional[Set[str]] = None) -> Dict[str, Any]:
         """Проверяет наличие обязательных декораторов"""
+        rule_set = self.rule_set
+        if hits is None:
+            hits = rule_set.scan(test_case, rule_set.rule_ids("decorators"))
+        
         found_decorators = []
         missing_decorators = []
-        
-        for decorator_pattern in self.required_decorators:
-            if re.search(decorator_pattern, test_case):
+        for decorator_pattern in rule_set.decorators:
+            if f"decorators:{decorator_pattern}" in hits:
                 found_decorators.append(decorator_pattern)
             else:
                 missing_decorators.append(decorator_pattern)
@@ -90,25 +258,19 @@ class StandardsChecker:
             "passed": len(missing_decorators) == 0,
             "found": found_decorators,
             "missing": missing_decorators,
-            "coverage": len(found_decorators) / len(self.required_decorators) * 100
+            "coverage": len(found_decorators) / len(rule_set.decorators) * 100 if rule_set.decorators else 100.0
         }
     
-    def _check_aaa_pattern(self, test_case: str) -> Dict[str, Any]:
+    def _check_aaa_pattern(self, test_case: str, hits: Optional[Set[str]] = None) -> Dict[str, Any]:
         """Проверяет соответствие паттерну AAA"""
-        # Ищем Arrange (подготовка данных)
-        has_arrange = bool(re.search(
-            r'(setup|arrange|prepare|initialize|create|setup_data)',
-            test_case, re.IGNORECASE
-        ))
+        rule_set = self.rule_set
+        if hits is None:
+            hits = rule_set.scan(test_case, rule_set.rule_ids("aaa"))
         
-        # Ищем Act (действие)
-        has_act = bool(re.search(
-            r'(action|act|execute|perform|call|invoke)',
-            test_case, re.IGNORECASE
-        ))
-        
-        # Ищем Assert (проверка)
-        has_assert = bool(re.search(r'assert|verify|check|validate', test_case, re.IGNORECASE))
+        # Arrange (подготовка данных), Act (действие), Assert (проверка)
+        has_arrange = "aaa:has_arrange" in hits
+        has_act = "aaa:has_act" in hits
+        has_assert = "aaa:has_assert" in hits
         
         return {
             "passed": has_arrange and has_act and has_assert,
@@ -144,6 +306,65 @@ class StandardsChecker:
             "is_valid": "соответствует" in analysis.lower() or "коррект" in analysis.lower()
         }
     
+    async def _llm_quality_check_packed(self, test_cases: Dict[int, str]) -> Dict[int, Dict[str, Any]]:
+        """
+        LLM проверка качества нескольких тест-кейсов одним запросом
+        
+        Модель возвращает JSON-массив вердиктов по id тест-кейса. Вердикты с
+        неизвестным id, без обязательных полей или повторные отбрасываются —
+        для таких кейсов вызывающий код делает одиночную проверку.
+        
+        Args:
+            test_cases: {id: код тест-кейса}
+        
+        Returns:
+            {id: {"analysis", "is_valid", "packed": True}} для корректно разобранных вердиктов
+        """
+        cases_text = "\n\n".join(
+            f"---ТЕСТ-КЕЙС id={case_id}---\n{test_case}" for case_id, test_case in test_cases.items()
+        )
+        prompt = f"""Проверь качество тест-кейсов на соответствие стандартам Allure TestOps.
+
+Для каждого тест-кейса проверь:
+1. Корректность структуры
+2. Полноту декораторов
+3. Соответствие паттерну AAA
+4. Качество именования
+5. Полноту шагов и проверок
+
+{cases_text}
+
+Ответь только JSON-массивом без пояснений и разметки, по одному объекту на каждый тест-кейс:
+[{{"id": <id тест-кейса>, "is_valid": true или false, "analysis": "краткая оценка и рекомендации"}}]"""
+        
+        per_case_tokens = int(os.getenv("STANDARDS_LLM_PACK_TOKENS_PER_CASE", "250"))
+        answer = await self.llm_service.generate(
+            prompt=prompt,
+            system_prompt="Ты эксперт по стандартам Allure TestOps. Проверяй тест-кейсы на соответствие. Отвечай строго в формате JSON.",
+            temperature=0.2,
+            max_tokens=min(4000, 200 + per_case_tokens * len(test_cases))
+        )
+        
+        try:
+            verdicts = json.loads(answer[answer.index("["):answer.rindex("]") + 1])
+        except ValueError:
+            return {}
+        if not isinstance(verdicts, list):
+            return {}
+        
+        parsed: Dict[int, Dict[str, Any]] = {}
+        for verdict in verdicts:
+            if not isinstance(verdict, dict):
+                continue
+            case_id = verdict.get("id")
+            if (
+                isinstance(case_id, int) and case_id in test_cases and case_id not in parsed
+                and isinstance(verdict.get("is_valid"), bool)
+                and isinstance(verdict.get("analysis"), str) and verdict["analysis"].strip()
+            ):
+                parsed[case_id] = {"analysis": verdict["analysis"], "is_valid": verdict["is_valid"], "packed": True}
+        return parsed
+    
     def _calculate_score(
         self,
         structure: Dict[str, Any],
@@ -185,34 +406,153 @@ class StandardsChecker:
         
         return recommendations
     
+    async def iter_batch(
+        self,
+        test_cases: List[str],
+        concurrency: Optional[int] = None,
+        deep_review: bool = False
+    ) -> AsyncIterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Проверяет несколько тест-кейсов, отдавая результаты по мере готовности
+        
+        Кейсы, найденные в кэше результатов, отдаются сразу. Для остальных
+        выполняются статические проверки; кейсы, которым не нужна LLM (см.
+        needs_llm_review), отдаются сразу. Остальные кейсы
+        упаковываются в общие промпты по бюджету STANDARDS_LLM_PACK_TOKENS
+        (0 — по одному кейсу на запрос), запросы идут параллельно, не больше
+        `concurrency` за раз. Кейсы, которые модель пропустила в ответе,
+        проверяются по одному. Ошибка LLM для одного кейса не прерывает пакет:
+        она попадает в `quality_analysis.error`.
+        
+        Args:
+            test_cases: Список тест-кейсов
+            concurrency: Лимит параллельных LLM проверок (по умолчанию STANDARDS_LLM_CONCURRENCY)
+            deep_review: Выполнять LLM проверку для всех тест-кейсов
+        
+        Yields:
+            (индекс тест-кейса, результат проверки) в порядке готовности
+        """
+        if concurrency is None:
+            concurrency = int(os.getenv("STANDARDS_LLM_CONCURRENCY", "8"))
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        cache = get_standards_cache()
+        keys: List[Optional[str]] = [None] * len(test_cases)
+        pending = list(range(len(test_cases)))
+        if cache is not None:
+            version = self.rule_set.version
+            keys = await asyncio.to_thread(
+                lambda: [make_result_key(test_case, version) for test_case in test_cases]
+            )
+            pending = []
+            for index, key in enumerate(keys):
+                cached = await self._cached_result(cache, key, deep_review)
+                if cached is None:
+                    pending.append(index)
+                else:
+                    yield index, cached
+        
+        static_results = dict(zip(pending, await asyncio.to_thread(
+            lambda: [self._static_check(test_cases[index]) for index in pending]
+        )))
+        
+        escalated = []
+        for index in pending:
+            static = static_results[index]
+            if self.needs_llm_review(static["score"], deep_review):
+                escalated.append(index)
+            else:
+                result = self._build_result(static, None)
+                await self._remember_result(cache, keys[index], result)
+                yield index, result
+        
+        async def check_one(index: int) -> Tuple[int, Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    quality_check = await self._llm_quality_check(test_cases[index])
+                except Exception as e:
+                    quality_check = {"analysis": "", "is_valid": False, "error": str(e)}
+            return index, self._build_result(static_results[index], quality_check)
+        
+        async def check_pack(group: List[int]) -> List[Tuple[int, Dict[str, Any]]]:
+            if len(group) == 1:
+                return [await check_one(group[0])]
+            async with semaphore:
+                try:
+                    verdicts = await self._llm_quality_check_packed({i: test_cases[i] for i in group})
+                except Exception:
+                    verdicts = {}
+            packed = [(i, self._build_result(static_results[i], verdicts[i])) for i in group if i in verdicts]
+            # Кейсы, пропущенные или испорченные моделью, проверяются по одному
+            fallback = await asyncio.gather(*(check_one(i) for i in group if i not in verdicts))
+            return packed + list(fallback)
+        
+        pack_tokens = int(os.getenv("STANDARDS_LLM_PACK_TOKENS", "6000"))
+        if pack_tokens > 0:
+            groups = [
+                [escalated[i] for i in group]
+                for group in pack_by_budget(
+                    [test_cases[i] for i in escalated],
+                    pack_tokens,
+                    max_items=int(os.getenv("STANDARDS_LLM_PACK_MAX_CASES", "15"))
+                )
+            ]
+        else:
+            groups = [[index] for index in escalated]
+        
+        tasks = [asyncio.create_task(check_pack(group)) for group in groups]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                for index, result in await next_done:
+                    await self._remember_result(cache, keys[index], result)
+                    yield index, result
+        finally:
+            # Клиент отключился от потока — незавершенные проверки не нужны
+            for task in tasks:
+                task.cancel()
+    
     async def check_batch(
         self,
-        test_cases: List[str]
+        test_cases: List[str],
+        concurrency: Optional[int] = None,
+        deep_review: bool = False
     ) -> Dict[str, Any]:
         """
         Проверяет несколько тест-кейсов
         
         Args:
             test_cases: Список тест-кейсов
+            concurrency: Лимит параллельных LLM проверок (по умолчанию STANDARDS_LLM_CONCURRENCY)
+            deep_review: Выполнять LLM проверку для всех тест-кейсов
         
         Returns:
             Сводный отчет
         """
-        results = []
-        for test_case in test_cases:
-            result = await self.check_test_case(test_case)
-            results.append(result)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(test_cases)
+        async for index, result in self.iter_batch(test_cases, concurrency, deep_review):
+            results[index] = result
         
+        return {
+            **self.summarize(results),
+            "results": results
+        }
+    
+    @staticmethod
+    def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Сводная статистика по результатам проверок"""
         avg_score = sum(r["score"] for r in results) / len(results) if results else 0
         
         return {
-            "total_tests": len(test_cases),
+            "total_tests": len(results),
             "average_score": round(avg_score, 2),
-            "results": results,
             "summary": {
                 "passed": sum(1 for r in results if r["score"] >= 70),
                 "needs_improvement": sum(1 for r in results if 50 <= r["score"] < 70),
                 "failed": sum(1 for r in results if r["score"] < 50)
-            }
+            },
+            "tiers": {
+                "static": sum(1 for r in results if r["tier"] == "static"),
+                "llm": sum(1 for r in results if r["tier"] == "llm")
+            },
+            "cached": sum(1 for r in results if r.get("cached"))
         }
-
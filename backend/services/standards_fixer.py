@@ -0,0 +1,299 @@
+"""
+Детерминированное автоисправление тест-кейсов по результатам проверки стандартов
+"""
+from typing import Dict, Any, List, Optional, Set, Tuple, Union
+import ast
+import difflib
+from .standards_checker import StandardsChecker
+from .standards_rules import resolve_fix_templates
+from .test_fingerprint import ParsedTestCase, is_step_call
+
+
+FunctionNode = Union[ast.FunctionDef, ast.AsyncFunctionDef]
+
+
+def _quote(value: str) -> str:
+    """Экранирует значение для подстановки в строку в двойных кавычках"""
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _is_test_function(node: ast.AST) -> bool:
+    return isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name.startswith("test_")
+
+
+def _has_step(node: ast.AST) -> bool:
+    """Есть ли внутри функции шаг allure (with allure.step или декоратор)"""
+    for child in ast.walk(node):
+        if isinstance(child, (ast.With, ast.AsyncWith)):
+            if any(is_step_call(item.context_expr) for item in child.items):
+                return True
+        elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if any(is_step_call(decorator) for decorator in child.decorator_list):
+                return True
+    return False
+
+
+class StandardsFixer:
+    """
+    Исправляет типовые нарушения стандартов без LLM
+
+    Добавляет недостающие обязательные декораторы (с импортами allure/pytest)
+    и оборачивает тела тестов без шагов в блоки `with allure.step(...)` по
+    схеме Arrange / Act / Assert. Исходный текст правится построчно по
+    позициям из AST, поэтому форматирование и комментарии сохраняются.
+    """
+
+    def __init__(self, checker: Optional[StandardsChecker] = None):
+        self.checker = checker or StandardsChecker()
+
+    def fix(
+        self,
+        test_case: str,
+        values: Optional[Dict[str, str]] = None,
+        add_decorators: bool = True,
+        wrap_steps: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Исправляет тест-кейс
+
+        Args:
+            test_case: Код тест-кейса
+            values: Значения для шаблонов декораторов и названий шагов
+                (owner, feature, story, suite, step_arrange, step_act, step_assert)
+            add_decorators: Добавлять недостающие декораторы
+            wrap_steps: Оборачивать тела тестов без шагов в allure.step
+
+        Returns:
+            Исправленный код, unified diff, список исправлений и баллы до/после
+
+        Raises:
+            ValueError: Шаблон декоратора ссылается на неизвестное значение
+        """
+        static_before = self.checker._static_check(test_case)
+        parsed = ParsedTestCase(test_case)
+        if not parsed.ok:
+            return {
+                "changed": False,
+                "fixed_source": test_case,
+                "diff": "",
+                "applied": [],
+                "skipped": [f"Синтаксическая ошибка: {parsed.syntax_error}"],
+                "score_before": static_before["score"],
+                "score_after": static_before["score"]
+            }
+
+        templates, values = resolve_fix_templates(self.checker.rules_config, values)
+
+        lines = test_case.splitlines(keepends=True)
+        newline = "\r\n" if "\r\n" in test_case else "\n"
+        insertions: Dict[int, List[str]] = {}
+        indented: Set[int] = set()
+        applied: List[str] = []
+        skipped: List[str] = []
+        tree = parsed.tree
+
+        if add_decorators and static_before["decorators"]["missing"]:
+            self._add_decorators(
+                tree, lines, static_before["decorators"]["missing"], templates, values,
+                newline, insertions, applied, skipped
+            )
+        if wrap_steps:
+            self._wrap_steps(tree, lines, values, newline, insertions, indented, applied, skipped)
+
+        unit = self._indent_unit(tree, lines)
+        for index in sorted(indented):
+            lines[index] = unit + lines[index]
+        for index in sorted(insertions, reverse=True):
+            lines[index:index] = insertions[index]
+        fixed_source = "".join(lines)
+
+        static_after = self.checker._static_check(fixed_source) if applied else static_before
+        diff = "".join(difflib.unified_diff(
+            test_case.splitlines(keepends=True),
+            fixed_source.splitlines(keepends=True),
+            fromfile="original.py",
+            tofile="fixed.py"
+        ))
+        return {
+            "changed": fixed_source != test_case,
+            "fixed_source": fixed_source,
+            "diff": diff,
+            "applied": applied,
+            "skipped": skipped,
+            "score_before": static_before["score"],
+            "score_after": static_after["score"]
+        }
+
+    def _add_decorators(
+        self,
+        tree: ast.Module,
+        lines: List[str],
+        missing: List[str],
+        templates: Dict[str, str],
+        values: Dict[str, str],
+        newline: str,
+        insertions: Dict[int, List[str]],
+        applied: List[str],
+        skipped: List[str]
+    ) -> None:
+        """Добавляет недостающие декораторы тест-классам (или тест-функциям модуля)"""
+        classes = [
+            node for node in tree.body
+            if isinstance(node, ast.ClassDef)
+            and (node.name.startswith("Test") or any(_is_test_function(item) for item in node.body))
+        ]
+        targets = classes or [node for node in tree.body if _is_test_function(node)]
+        if not targets:
+            skipped.append("Декораторы: не найден тест-класс или тест-функция")
+            return
+
+        decorators = []
+        for pattern in missing:
+            if pattern in templates:
+                decorators.append((pattern, templates[pattern]))
+            else:
+                skipped.append(f"Декоратор {pattern}: нет шаблона в правилах (fixes.decorators)")
+        if not decorators:
+            return
+
+        for target in targets:
+            anchor = target.decorator_list[0] if target.decorator_list else target
+            indent = lines[anchor.lineno - 1][:anchor.col_offset]
+            resolved = {
+                key: _quote(str(value).replace("{name}", target.name)) for key, value in values.items()
+            }
+            insertions.setdefault(anchor.lineno - 1, []).extend(
+                indent + template.format(**resolved) + newline for _, template in decorators
+            )
+        applied.extend(
+            f"Добавлен декоратор {template.split('(')[0]} ({len(targets)} шт.)" for _, template in decorators
+        )
+
+        # Импорты модулей, которые используют добавленные декораторы
+        imported = {
+            alias.asname or alias.name
+            for node in tree.body if isinstance(node, ast.Import)
+            for alias in node.names
+        }
+        needed = sorted({template[1:].split(".")[0] for _, template in decorators} - imported)
+        if needed:
+            position = self._imports_position(tree)
+            insertions.setdefault(position, [])[:0] = [f"import {module}{newline}" for module in needed]
+            applied.extend(f"Добавлен import {module}" for module in needed)
+
+    @staticmethod
+    def _imports_position(tree: ast.Module) -> int:
+        """Строка (с 0) для новых импортов: после docstring модуля и `from __future__`"""
+        position = 0
+        for index, node in enumerate(tree.body):
+            is_docstring = (
+                index == 0 and isinstance(node, ast.Expr)
+                and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+            )
+            is_future = isinstance(node, ast.ImportFrom) and node.module == "__future__"
+            if not (is_docstring or is_future):
+                break
+            position = node.end_lineno
+        return position
+
+    def _wrap_steps(
+        self,
+        tree: ast.Module,
+        lines: List[str],
+        values: Dict[str, str],
+        newline: str,
+        insertions: Dict[int, List[str]],
+        indented: Set[int],
+        applied: List[str],
+        skipped: List[str]
+    ) -> None:
+        """Оборачивает тела тестов без шагов в блоки allure.step"""
+        functions: List[FunctionNode] = [node for node in tree.body if _is_test_function(node)]
+        for node in tree.body:
+            if isinstance(node, ast.ClassDef):
+                functions += [item for item in node.body if _is_test_function(item)]
+
+        string_lines = self._string_continuation_lines(tree)
+        wrapped = []
+        for function in functions:
+            if _has_step(function):
+                continue
+            body = function.body
+            if (
+                body and isinstance(body[0], ast.Expr)
+                and isinstance(body[0].value, ast.Constant) and isinstance(body[0].value.value, str)
+            ):
+                body = body[1:]
+            if not body:
+                continue
+            if body[0].lineno == function.lineno:
+                skipped.append(f"Шаги {function.name}: тело на одной строке с def")
+                continue
+
+            indent = lines[body[0].lineno - 1][:body[0].col_offset]
+            for title, group in self._aaa_groups(body, values):
+                first = group[0].lineno - 1
+                insertions.setdefault(first, []).append(
+                    f'{indent}with allure.step("{_quote(title)}"):{newline}'
+                )
+                for index in range(first, group[-1].end_lineno):
+                    if lines[index].strip() and index not in string_lines:
+                        indented.add(index)
+            wrapped.append(function.name)
+
+        if wrapped:
+            applied.append(f"Тела тестов обернуты в allure.step: {', '.join(wrapped)}")
+            imported = {
+                alias.asname or alias.name
+                for node in tree.body if isinstance(node, ast.Import)
+                for alias in node.names
+            }
+            already_added = any(line == f"import allure{newline}" for group in insertions.values() for line in group)
+            if "allure" not in imported and not already_added:
+                insertions.setdefault(self._imports_position(tree), []).insert(0, f"import allure{newline}")
+                applied.append("Добавлен import allure")
+
+    @staticmethod
+    def _aaa_groups(body: List[ast.stmt], values: Dict[str, str]) -> List[Tuple[str, List[ast.stmt]]]:
+        """
+        Делит тело теста на шаги Arrange / Act / Assert
+
+        Проверки в конце тела — Assert, последняя инструкция перед ними — Act,
+        все предыдущие — Arrange. Если граница шагов проходит внутри строки
+        (инструкции через `;`), тело становится одним шагом Act.
+        """
+        split = len(body)
+        while split > 0 and isinstance(body[split - 1], ast.Assert):
+            split -= 1
+        arrange, act, check = body[:max(split - 1, 0)], body[max(split - 1, 0):split], body[split:]
+        groups = [
+            (values["step_arrange"], arrange),
+            (values["step_act"], act),
+            (values["step_assert"], check)
+        ]
+        groups = [(title, group) for title, group in groups if group]
+        for (_, previous), (_, following) in zip(groups, groups[1:]):
+            if previous[-1].end_lineno >= following[0].lineno:
+                return [(values["step_act"], body)]
+        return groups
+
+    @staticmethod
+    def _string_continuation_lines(tree: ast.Module) -> Set[int]:
+        """Строки (с 0) внутри многострочных строковых литералов: их отступ менять нельзя"""
+        result: Set[int] = set()
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.Constant, ast.JoinedStr)) and node.end_lineno > node.lineno:
+                if isinstance(node, ast.JoinedStr) or isinstance(node.value, (str, bytes)):
+                    result.update(range(node.lineno, node.end_lineno))
+        return result
+
+    @staticmethod
+    def _indent_unit(tree: ast.Module, lines: List[str]) -> str:
+        """Единица отступа файла: по первому вложенному блоку, по умолчанию 4 пробела"""
+        for node in ast.walk(tree):
+            if isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) and node.body:
+                inner = node.body[0]
+                if inner.lineno != node.lineno and inner.col_offset > node.col_offset:
+                    line = lines[inner.lineno - 1]
+                    return line[node.col_offset:inner.col_offset]
+        return "    "
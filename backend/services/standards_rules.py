@@ -0,0 +1,203 @@
+"""
+Декларативные правила статической проверки стандартов
+"""
+from typing import Dict, Any, List, Optional, Set, FrozenSet, Tuple
+import copy
+import hashlib
+import json
+import os
+import re
+import string
+import yaml
+
+
+# Правила по умолчанию. Паттерн — строка или {"pattern": ..., "ignore_case": bool}
+DEFAULT_RULES: Dict[str, Any] = {
+    # Обязательные декораторы; в результате проверки они перечисляются как есть
+    "decorators": [
+        r'@allure\.manual',
+        r'@allure\.label\("owner"',
+        r'@allure\.feature\(',
+        r'@allure\.story\(',
+        r'@allure\.suite\(',
+        r'@pytest\.mark\.manual'
+    ],
+    # Признаки разделов Arrange / Act / Assert
+    "aaa": {
+        "has_arrange": {"pattern": r'setup|arrange|prepare|initialize|create|setup_data', "ignore_case": True},
+        "has_act": {"pattern": r'action|act|execute|perform|call|invoke', "ignore_case": True},
+        "has_assert": {"pattern": r'assert|verify|check|validate', "ignore_case": True}
+    },
+    # Структура по тексту: используется, когда AST недоступен (синтаксическая ошибка или большой файл)
+    "structure": {
+        "has_class": r'class\s+\w+',
+        "has_test_method": r'def\s+test_\w+',
+        "has_description": r'(?m:^[ \t]*[rRuU]?(?:"""|\'\'\'))|@allure\.description',
+        "has_steps": r'allure_step|with\s+allure\.step',
+        "has_expected_result": {"pattern": r'assert|expected|should', "ignore_case": True}
+    },
+    # Текстовые подсказки, дополняющие проверку по AST
+    "hints": {
+        "expected_result": {"pattern": r'expected|should', "ignore_case": True}
+    },
+    # Автоисправление (StandardsFixer): шаблон декоратора для паттерна из "decorators"
+    # и значения по умолчанию; {name} в значении — имя класса или функции теста
+    "fixes": {
+        "decorators": {
+            r'@allure\.manual': '@allure.manual',
+            r'@allure\.label\("owner"': '@allure.label("owner", "{owner}")',
+            r'@allure\.feature\(': '@allure.feature("{feature}")',
+            r'@allure\.story\(': '@allure.story("{story}")',
+            r'@allure\.suite\(': '@allure.suite("{suite}")',
+            r'@pytest\.mark\.manual': '@pytest.mark.manual'
+        },
+        "values": {
+            "owner": "QA Team",
+            "feature": "Ручные тесты",
+            "story": "{name}",
+            "suite": "{name}",
+            "step_arrange": "Arrange: подготовить данные",
+            "step_act": "Act: выполнить действие",
+            "step_assert": "Assert: проверить результат"
+        }
+    }
+}
+
+
+# Разделы правил, которые читает проверка (остальные, например "fixes", на вердикт не влияют)
+CHECK_SECTIONS = ("decorators", "aaa", "structure", "hints")
+
+
+def _compile_rule(rule: Any) -> Tuple[re.Pattern, bool]:
+    """
+    Компилирует правило
+
+    Returns:
+        (регулярное выражение, проверять ли его по тексту в нижнем регистре)
+    """
+    if isinstance(rule, dict):
+        pattern = rule["pattern"]
+        if rule.get("ignore_case"):
+            # Без IGNORECASE движок re использует быстрый поиск по литеральному
+            # префиксу, поэтому паттерн в нижнем регистре ищем по тексту в нижнем регистре
+            if pattern == pattern.lower():
+                return re.compile(pattern), True
+            return re.compile(pattern, re.IGNORECASE), False
+        return re.compile(pattern), False
+    return re.compile(rule), False
+
+
+class RuleSet:
+    """
+    Набор правил, скомпилированный один раз
+
+    Правило срабатывает, если его паттерн найден в тексте. Текст приводится к
+    нижнему регистру один раз для всех регистронезависимых правил, каждое
+    правило останавливается на первом совпадении. Объединение правил в одно
+    регулярное выражение в движке re оказалось медленнее: у альтернативы нет
+    оптимизации по литеральному префиксу.
+    """
+
+    def __init__(self, rules: Optional[Dict[str, Any]] = None):
+        self.rules = copy.deepcopy(rules or DEFAULT_RULES)
+        # Версия меняется при любом изменении правил проверки
+        checked = {section: self.rules.get(section) for section in CHECK_SECTIONS}
+        self.version = hashlib.sha256(
+            json.dumps(checked, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()[:16]
+
+        # Идентификатор правила: "decorators:<паттерн>", "aaa:has_arrange", ...
+        named = [(f"decorators:{pattern}", pattern) for pattern in self.rules.get("decorators", [])]
+        for section in ("aaa", "structure", "hints"):
+            named += [(f"{section}:{name}", rule) for name, rule in self.rules.get(section, {}).items()]
+
+        self.compiled: Dict[str, Tuple[re.Pattern, bool]] = {}
+        for rule_id, rule in named:
+            try:
+                self.compiled[rule_id] = _compile_rule(rule)
+            except re.error as e:
+                raise ValueError(f"Некорректный паттерн правила {rule_id}: {e}") from e
+
+    @property
+    def decorators(self) -> List[str]:
+        return list(self.rules.get("decorators", []))
+
+    def rule_ids(self, *sections: str) -> FrozenSet[str]:
+        """Идентификаторы правил указанных разделов"""
+        return frozenset(r for r in self.compiled if r.split(":", 1)[0] in sections)
+
+    def scan(self, source: str, rule_ids: Optional[FrozenSet[str]] = None) -> Set[str]:
+        """
+        Находит правила, которые срабатывают в тексте
+
+        Args:
+            source: Исходный код
+            rule_ids: Какие правила проверять (по умолчанию все)
+
+        Returns:
+            Идентификаторы сработавших правил
+        """
+        lowered: Optional[str] = None
+        found: Set[str] = set()
+        for rule_id in (self.compiled if rule_ids is None else rule_ids):
+            pattern, on_lowered = self.compiled[rule_id]
+            if on_lowered and lowered is None:
+                lowered = source.lower()
+            if pattern.search(lowered if on_lowered else source):
+                found.add(rule_id)
+        return found
+
+
+def resolve_fix_templates(
+    rules: Dict[str, Any],
+    values: Optional[Dict[str, str]] = None
+) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Шаблоны декораторов и значения для автоисправления с учетом значений по умолчанию
+
+    Args:
+        rules: Правила (раздел "fixes" дополняет DEFAULT_RULES["fixes"])
+        values: Значения из запроса, переопределяющие значения правил
+
+    Returns:
+        (шаблоны декораторов по паттерну, значения для подстановки)
+
+    Raises:
+        ValueError: Шаблон некорректен или ссылается на значение, которого нет
+    """
+    fixes = rules.get("fixes") or {}
+    templates = {**DEFAULT_RULES["fixes"]["decorators"], **(fixes.get("decorators") or {})}
+    resolved = {**DEFAULT_RULES["fixes"]["values"], **(fixes.get("values") or {}), **(values or {})}
+    for template in templates.values():
+        try:
+            fields = {field for _, field, _, _ in string.Formatter().parse(template) if field is not None}
+        except ValueError as e:
+            raise ValueError(f"Некорректный шаблон декоратора {template}: {e}") from e
+        unknown = sorted(fields - set(resolved))
+        if unknown:
+            raise ValueError(
+                f"Шаблон декоратора {template} ссылается на неизвестные значения: {', '.join(unknown)}. "
+                f"Доступные: {', '.join(sorted(resolved))}"
+            )
+    return templates, resolved
+
+
+def load_team_rules(team: str) -> Dict[str, Any]:
+    """
+    Загружает правила команды из STANDARDS_RULES_DIR/<team>.json|.yaml|.yml
+
+    Разделы файла заменяют соответствующие разделы DEFAULT_RULES целиком.
+    Шаблоны автоисправления проверяются сразу (см. resolve_fix_templates).
+    """
+    if not re.fullmatch(r"[\w-]+", team):
+        raise ValueError(f"Некорректное имя команды: {team}")
+    rules_dir = os.getenv("STANDARDS_RULES_DIR", "standards_rules")
+    for extension in ("json", "yaml", "yml"):
+        path = os.path.join(rules_dir, f"{team}.{extension}")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                overrides = json.load(f) if extension == "json" else yaml.safe_load(f)
+            rules = {**copy.deepcopy(DEFAULT_RULES), **(overrides or {})}
+            resolve_fix_templates(rules)
+            return rules
+    raise ValueError(f"Правила команды не найдены: {team}")
@@ -0,0 +1,240 @@
+"""
+Проверка стандартов для целого репозитория тестов из tar/zip архива
+"""
+from typing import Dict, Any, List, Optional, Iterator, AsyncIterator, Tuple, BinaryIO
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import fnmatch
+import json
+import os
+import posixpath
+import tarfile
+import tempfile
+import zipfile
+from .standards_checker import StandardsChecker
+
+
+class ArchiveTooLargeError(ValueError):
+    """Загруженный архив больше STANDARDS_ARCHIVE_MAX_BYTES"""
+
+
+async def spool_upload(chunks: AsyncIterator[bytes], max_bytes: Optional[int] = None) -> BinaryIO:
+    """
+    Сохраняет поток загрузки во временный файл
+
+    Файл держится в памяти до STANDARDS_ARCHIVE_SPOOL_BYTES (по умолчанию 16 МБ),
+    дальше сбрасывается на диск.
+
+    Args:
+        chunks: Поток байтов тела запроса
+        max_bytes: Максимальный размер (по умолчанию STANDARDS_ARCHIVE_MAX_BYTES, 500 МБ)
+
+    Returns:
+        Файл, позиционированный на начало
+    """
+    if max_bytes is None:
+        max_bytes = int(os.getenv("STANDARDS_ARCHIVE_MAX_BYTES", str(500 * 1024 * 1024)))
+    spool = tempfile.SpooledTemporaryFile(
+        max_size=int(os.getenv("STANDARDS_ARCHIVE_SPOOL_BYTES", str(16 * 1024 * 1024)))
+    )
+    size = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise ArchiveTooLargeError(f"Архив больше {max_bytes} байт")
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def detect_archive_format(fileobj: BinaryIO) -> str:
+    """
+    Определяет формат архива по содержимому
+
+    Returns:
+        "zip" или "tar" (в том числе tar.gz, tar.bz2, tar.xz)
+    """
+    try:
+        if zipfile.is_zipfile(fileobj):
+            return "zip"
+        fileobj.seek(0)
+        try:
+            with tarfile.open(fileobj=fileobj, mode="r:*") as tar:
+                tar.next()
+            return "tar"
+        except tarfile.TarError:
+            pass
+        raise ValueError("Неподдерживаемый формат архива: ожидается tar (gz/bz2/xz) или zip")
+    finally:
+        fileobj.seek(0)
+
+
+def iter_archive_sources(
+    fileobj: BinaryIO,
+    pattern: str = "*.py",
+    max_file_bytes: Optional[int] = None
+) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+    """
+    Читает файлы архива по одному, не распаковывая архив целиком
+
+    tar читается в потоковом режиме, zip — по оглавлению.
+
+    Args:
+        fileobj: Файл архива
+        pattern: Маска имени файла (fnmatch), по умолчанию *.py
+        max_file_bytes: Максимальный размер файла (по умолчанию STANDARDS_ARCHIVE_MAX_FILE_BYTES, 5 МБ)
+
+    Yields:
+        (путь, исходный код, None) или (путь, None, причина пропуска)
+    """
+    if max_file_bytes is None:
+        max_file_bytes = int(os.getenv("STANDARDS_ARCHIVE_MAX_FILE_BYTES", str(5 * 1024 * 1024)))
+
+    def decode(path: str, data: bytes) -> Tuple[str, Optional[str], Optional[str]]:
+        if len(data) > max_file_bytes:
+            return path, None, f"Файл больше {max_file_bytes} байт"
+        try:
+            return path, data.decode("utf-8"), None
+        except UnicodeDecodeError:
+            return path, None, "Файл не в кодировке UTF-8"
+
+    if detect_archive_format(fileobj) == "zip":
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not fnmatch.fnmatch(posixpath.basename(info.filename), pattern):
+                    continue
+                if info.file_size > max_file_bytes:
+                    yield info.filename, None, f"Файл больше {max_file_bytes} байт"
+                    continue
+                with archive.open(info) as member:
+                    # Размер из оглавления может не совпадать с реальным
+                    yield decode(info.filename, member.read(max_file_bytes + 1))
+        return
+
+    with tarfile.open(fileobj=fileobj, mode="r|*") as archive:
+        for info in archive:
+            if not info.isfile() or not fnmatch.fnmatch(posixpath.basename(info.name), pattern):
+                continue
+            if info.size > max_file_bytes:
+                yield info.name, None, f"Файл больше {max_file_bytes} байт"
+                continue
+            member = archive.extractfile(info)
+            yield decode(info.name, member.read() if member is not None else b"")
+
+
+# Проверки по правилам в процессе пула; ключ — правила в JSON
+_worker_checkers: Dict[str, StandardsChecker] = {}
+
+
+def _scan_chunk(rules_json: str, chunk: List[Tuple[str, str]]) -> List[Tuple[str, Dict[str, Any]]]:
+    """Статическая проверка группы файлов (выполняется в процессе пула)"""
+    checker = _worker_checkers.get(rules_json)
+    if checker is None:
+        checker = _worker_checkers[rules_json] = StandardsChecker.static_only(json.loads(rules_json))
+    return [(path, checker._build_result(checker._static_check(source), None)) for path, source in chunk]
+
+
+_scan_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _scan_workers() -> int:
+    return int(os.getenv("STANDARDS_SCAN_WORKERS", str(os.cpu_count() or 1)))
+
+
+def get_scan_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Возвращает общий пул процессов для статических проверок
+
+    Размер задается STANDARDS_SCAN_WORKERS (по умолчанию число CPU);
+    0 — проверки выполняются в потоке без пула процессов.
+    """
+    global _scan_pool
+    workers = _scan_workers()
+    if workers <= 0:
+        return None
+    if _scan_pool is None:
+        _scan_pool = ProcessPoolExecutor(max_workers=workers)
+    return _scan_pool
+
+
+def shutdown_scan_pool() -> None:
+    """Останавливает пул процессов (при остановке приложения)"""
+    global _scan_pool
+    if _scan_pool is not None:
+        _scan_pool.shutdown(cancel_futures=True)
+        _scan_pool = None
+
+
+async def iter_archive_scan(
+    checker: StandardsChecker,
+    fileobj: BinaryIO,
+    pattern: str = "*.py"
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Проверяет файлы архива статическими правилами, отдавая результаты по мере готовности
+
+    Файлы читаются из архива в потоке и группами по STANDARDS_SCAN_CHUNK_FILES
+    (по умолчанию 32) отправляются в пул процессов. В работе одновременно не
+    больше двух групп на процесс, поэтому в памяти находится лишь небольшая
+    часть архива.
+
+    Args:
+        checker: Проверка с правилами (команды или по умолчанию)
+        fileobj: Файл архива
+        pattern: Маска имени проверяемых файлов
+
+    Yields:
+        {"path", "result"} для проверенного файла или {"path", "skipped"} для пропущенного
+    """
+    rules_json = json.dumps(
+        {**checker.rules_config, "decorators": list(checker.required_decorators)},
+        ensure_ascii=False
+    )
+    chunk_files = max(1, int(os.getenv("STANDARDS_SCAN_CHUNK_FILES", "32")))
+    pool = get_scan_pool()
+    max_inflight = 2 * max(1, _scan_workers())
+    loop = asyncio.get_running_loop()
+    sources = iter_archive_sources(fileobj, pattern)
+
+    def next_chunk() -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]], bool]:
+        chunk, skipped = [], []
+        for path, source, reason in sources:
+            if source is None:
+                skipped.append((path, reason))
+            else:
+                chunk.append((path, source))
+                if len(chunk) >= chunk_files:
+                    return chunk, skipped, False
+        return chunk, skipped, True
+
+    pending = set()
+    exhausted = False
+    try:
+        while not exhausted or pending:
+            while not exhausted and len(pending) < max_inflight:
+                chunk, skipped, exhausted = await asyncio.to_thread(next_chunk)
+                for path, reason in skipped:
+                    yield {"path": path, "skipped": reason}
+                if chunk:
+                    if pool is not None:
+                        pending.add(loop.run_in_executor(pool, _scan_chunk, rules_json, chunk))
+                    else:
+                        pending.add(asyncio.ensure_future(asyncio.to_thread(_scan_chunk, rules_json, chunk)))
+            if pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    for path, result in future.result():
+                        yield {"path": path, "result": result}
+    finally:
+        # Клиент отключился от потока — оставшиеся группы не нужны
+        for future in pending:
+            future.cancel()
+        try:
+            sources.close()
+        except ValueError:
+            # Чтение архива еще идет в потоке; генератор закроется сборщиком мусора
+            pass
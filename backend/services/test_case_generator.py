@@ -1,8 +1,11 @@
 """
 Генератор ручных тест-кейсов в формате Allure TestOps as Code
 """
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator, Optional
 from .llm_service import LLMService
+from .code_fence import strip_code_fence, strip_code_fence_stream
+from .openapi_fanout import iter_fanout_generation
+from .ref_resolver import get_ref_resolver, describe_schema, request_body_schema, response_schema
 
 
 class TestCaseGenerator:
@@ -55,17 +58,7 @@ class TestCaseGenerator:
         Returns:
             Python код тест-кейса
         """
-        prompt = f"""Сгенерируй тест-кейсы в формате Allure TestOps as Code на основе следующих требований:
-
-{requirements}
-
-Параметры:
-- test_type: {test_type}
-- feature: {feature}
-- story: {story}
-- owner: {owner}
-
-Сгенерируй несколько тест-кейсов, покрывающих основные сценарии. Используй паттерн AAA."""
+        prompt = self._build_requirements_prompt(requirements, test_type, feature, story, owner)
         
         code = await self.llm_service.generate(
             prompt=prompt,
@@ -75,17 +68,59 @@ class TestCaseGenerator:
         )
         
         # Очистка кода от markdown форматирования если есть
-        if "```python" in code:
-            code = code.split("```python")[1].split("```")[0]
-        elif "```" in code:
-            code = code.split("```")[1].split("```")[0]
+        return strip_code_fence(code)
+    
+    async def stream_from_requirements(
+        self,
+        requirements: str,
+        test_type: str = "manual",
+        feature: str = "Default Feature",
+        story: str = "Default Story",
+        owner: str = "QA Team"
+    ) -> AsyncIterator[str]:
+        """
+        Потоковая версия generate_from_requirements
         
-        return code.strip()
+        Yields:
+            Фрагменты Python кода без markdown-обрамления
+        """
+        prompt = self._build_requirements_prompt(requirements, test_type, feature, story, owner)
+        
+        chunks = self.llm_service.generate_stream(
+            prompt=prompt,
+            system_prompt=self._get_system_prompt(),
+            temperature=0.3,
+            max_tokens=4000
+        )
+        async for text in strip_code_fence_stream(chunks):
+            yield text
+    
+    def _build_requirements_prompt(
+        self,
+        requirements: str,
+        test_type: str,
+        feature: str,
+        story: str,
+        owner: str
+    ) -> str:
+        """Промпт для генерации тест-кейсов по требованиям"""
+        return f"""Сгенерируй тест-кейсы в формате Allure TestOps as Code на основе следующих требований:
+
+{requirements}
+
+Параметры:
+- test_type: {test_type}
+- feature: {feature}
+- story: {story}
+- owner: {owner}
+
+Сгенерируй несколько тест-кейсов, покрывающих основные сценарии. Используй паттерн AAA."""
     
     async def generate_from_openapi(
         self,
         openapi_spec: Dict[str, Any],
-        endpoint: str = None
+        endpoint: str = None,
+        spec_description: Optional[str] = None
     ) -> str:
         """
         Генерирует тест-кейсы из OpenAPI спецификации
@@ -93,12 +128,15 @@ class TestCaseGenerator:
         Args:
             openapi_spec: OpenAPI спецификация (dict)
             endpoint: Конкретный endpoint для генерации (опционально)
+            spec_description: Готовое описание спецификации (например, из
+                реестра); если задано, openapi_spec не форматируется заново
         
         Returns:
             Python код тест-кейсов
         """
         # Формируем описание из OpenAPI
-        spec_description = self._format_openapi_spec(openapi_spec, endpoint)
+        if spec_description is None:
+            spec_description = self._format_openapi_spec(openapi_spec, endpoint)
         
         return await self.generate_from_requirements(
             requirements=spec_description,
@@ -107,6 +145,30 @@ class TestCaseGenerator:
             story="API Test Cases"
         )
     
+    def stream_from_openapi_fanout(
+        self,
+        openapi_spec: Dict[str, Any],
+        group_by: str = "tag",
+        max_group_size: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Генерирует тест-кейсы по группам endpoints параллельно (fan-out)
+        
+        Каждая группа (тег или ресурс) генерируется отдельным запросом к LLM,
+        результаты объединяются в один модуль (см. iter_fanout_generation).
+        
+        Yields:
+            События готовности групп и итоговое событие с объединенным модулем
+        """
+        return iter_fanout_generation(
+            openapi_spec,
+            self.generate_from_openapi,
+            group_by=group_by,
+            max_group_size=max_group_size,
+            concurrency=concurrency
+        )
+    
     def _format_openapi_spec(self, spec: Dict[str, Any], endpoint: str = None) -> str:
         """Форматирует OpenAPI спецификацию в текстовое описание"""
         description = f"OpenAPI спецификация версии {spec.get('openapi', 'unknown')}\n\n"
@@ -117,7 +179,9 @@ class TestCaseGenerator:
         
         if 'paths' in spec:
             description += "Доступные endpoints:\n"
-            for path, methods in spec['paths'].items():
+            # Ленивое представление: $ref разворачиваются только для выводимых схем
+            view = get_ref_resolver(spec).view()
+            for path, methods in view['paths'].items():
                 if endpoint and endpoint not in path:
                     continue
                 description += f"\n{path}:\n"
@@ -127,7 +191,17 @@ class TestCaseGenerator:
                         if 'parameters' in details:
                             description += "    Параметры:\n"
                             for param in details['parameters']:
-                                description += f"      - {param.get('name')}: {param.get('description', '')}\n"
+                                if param.get('in') == 'body':
+                                    continue
+                                param_type = describe_schema(param['schema']) if 'schema' in param else param.get('type', '')
+                                description += f"      - {param.get('name')} ({param.get('in', '')}, {param_type}): {param.get('description', '')}\n"
+                        body_schema = request_body_schema(details)
+                        if body_schema is not None:
+                            description += f"    Тело запроса: {describe_schema(body_schema)}\n"
+                        for status, response in (details.get('responses') or {}).items():
+                            schema = response_schema(response)
+                            if schema is not None:
+                                description += f"    Ответ {status}: {describe_schema(schema)}\n"
         
         return description
 
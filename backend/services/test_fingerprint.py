@@ -0,0 +1,298 @@
+"""
+Структурные отпечатки тест-кейсов Allure TestOps as Code на основе AST
+"""
+from typing import Dict, Any, List, Optional
+import ast
+import hashlib
+import threading
+
+
+# Корни имен, которые сохраняются при абстрагировании (модули, а не переменные)
+KNOWN_MODULES = {
+    "allure", "allure_step", "pytest", "requests", "httpx", "json", "re", "os", "time",
+    "selenium", "webdriver", "playwright", "expect", "By", "EC"
+}
+
+# Имена признаков в векторе fingerprint["features"]
+FEATURE_NAMES = [
+    "classes",
+    "test_functions",
+    "decorators",
+    "allure_decorators",
+    "steps",
+    "asserts",
+    "calls",
+    "with_blocks",
+    "loops",
+    "branches",
+    "literals",
+    "max_depth",
+]
+
+
+# В CPython 3.11 ast.parse хранит глубину рекурсии конвертера AST в общем для
+# интерпретатора состоянии. Если во время конвертации сборщик мусора отпустит
+# GIL, параллельный ast.parse из другого потока падает с SystemError
+# "AST constructor recursion depth mismatch". Все проверки парсят код через
+# ParsedTestCase, поэтому блокировка стоит здесь.
+_PARSE_LOCK = threading.Lock()
+
+
+def parse_source(source: str) -> ast.Module:
+    """ast.parse, безопасный при вызове из нескольких потоков"""
+    with _PARSE_LOCK:
+        return ast.parse(source)
+
+
+class ParsedTestCase:
+    """Тест-кейс, распарсенный один раз для всех проверок"""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.tree: Optional[ast.Module] = None
+        self.syntax_error: Optional[str] = None
+        try:
+            self.tree = parse_source(source)
+        except SyntaxError as e:
+            self.syntax_error = f"{e.msg} (строка {e.lineno})"
+
+    @property
+    def ok(self) -> bool:
+        return self.tree is not None
+
+
+def dotted_name(node: ast.AST) -> str:
+    """Имя вида `allure.label` для Name/Attribute/Call, иначе пустая строка"""
+    if isinstance(node, ast.Call):
+        return dotted_name(node.func)
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        base = dotted_name(node.value)
+        return f"{base}.{node.attr}" if base else node.attr
+    return ""
+
+
+def _abstract_name(name: str) -> str:
+    """Заменяет корень имени на `_`, если это не известный модуль"""
+    if not name:
+        return "_"
+    root, _, rest = name.partition(".")
+    if root in KNOWN_MODULES:
+        return name
+    return f"_.{rest}" if rest else "_"
+
+
+def _first_str_arg(call: ast.AST) -> Optional[str]:
+    if isinstance(call, ast.Call) and call.args:
+        arg = call.args[0]
+        if isinstance(arg, ast.Constant) and isinstance(arg.value, str):
+            return arg.value
+        if isinstance(arg, ast.JoinedStr):
+            return "".join(
+                v.value if isinstance(v, ast.Constant) else "{}" for v in arg.values
+            )
+    return None
+
+
+def is_step_call(node: ast.AST) -> bool:
+    """Вызов `allure.step(...)` или `allure_step(...)`"""
+    return isinstance(node, ast.Call) and dotted_name(node) in ("allure.step", "allure_step")
+
+
+def decorator_key(node: ast.AST) -> str:
+    """Нормализованное имя декоратора: `allure.label(owner)`, `allure.feature`, ..."""
+    name = dotted_name(node)
+    if name == "allure.label":
+        label = _first_str_arg(node)
+        if label:
+            return f"{name}({label})"
+    return name
+
+
+class _StructureVisitor(ast.NodeVisitor):
+    """Собирает структурные признаки за один обход дерева"""
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.decorators: List[str] = []
+        self.steps: List[str] = []
+        self.asserts: List[str] = []
+        self.calls: List[str] = []
+        self.counts = dict.fromkeys(FEATURE_NAMES, 0)
+        self._depth = 0
+
+    def generic_visit(self, node: ast.AST) -> None:
+        self._depth += 1
+        self.counts["max_depth"] = max(self.counts["max_depth"], self._depth)
+        self.parts.append(self._token(node))
+        super().generic_visit(node)
+        self.parts.append(")")
+        self._depth -= 1
+
+    def _token(self, node: ast.AST) -> str:
+        # Литералы и идентификаторы абстрагируются до типа/заглушки
+        if isinstance(node, ast.Constant):
+            self.counts["literals"] += 1
+            return f"Const[{type(node.value).__name__}]("
+        if isinstance(node, ast.Name):
+            return f"Name[{node.id if node.id in KNOWN_MODULES else '_'}]("
+        if isinstance(node, ast.Attribute):
+            return f"Attr[{node.attr}]("
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            return "Func("
+        if isinstance(node, ast.ClassDef):
+            return "Class("
+        if isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+            # Докстринги не влияют на структуру
+            return "Doc("
+        return f"{type(node).__name__}("
+
+    def _visit_decorated(self, node: ast.AST) -> None:
+        for decorator in node.decorator_list:
+            key = decorator_key(decorator)
+            self.decorators.append(key)
+            self.counts["decorators"] += 1
+            if key.startswith("allure."):
+                self.counts["allure_decorators"] += 1
+            if is_step_call(decorator):
+                self._add_step(decorator)
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.counts["classes"] += 1
+        self._visit_decorated(node)
+        self.generic_visit(node)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        if node.name.startswith("test"):
+            self.counts["test_functions"] += 1
+        self._visit_decorated(node)
+        self.generic_visit(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_With(self, node: ast.With) -> None:
+        self.counts["with_blocks"] += 1
+        for item in node.items:
+            if is_step_call(item.context_expr):
+                self._add_step(item.context_expr)
+        self.generic_visit(node)
+
+    visit_AsyncWith = visit_With
+
+    def visit_Assert(self, node: ast.Assert) -> None:
+        self.counts["asserts"] += 1
+        shape = _StructureVisitor()
+        shape.visit(node.test)
+        self.asserts.append("".join(shape.parts))
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call) -> None:
+        self.counts["calls"] += 1
+        self.calls.append(_abstract_name(dotted_name(node)))
+        self.generic_visit(node)
+
+    def visit_For(self, node: ast.AST) -> None:
+        self.counts["loops"] += 1
+        self.generic_visit(node)
+
+    visit_AsyncFor = visit_For
+    visit_While = visit_For
+
+    def visit_If(self, node: ast.AST) -> None:
+        self.counts["branches"] += 1
+        self.generic_visit(node)
+
+    visit_IfExp = visit_If
+
+    def _add_step(self, call: ast.AST) -> None:
+        self.counts["steps"] += 1
+        self.steps.append(_first_str_arg(call) or "")
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def fingerprint(test_case: "str | ParsedTestCase") -> Dict[str, Any]:
+    """
+    Строит отпечаток тест-кейса
+
+    Args:
+        test_case: Исходный код или уже распарсенный ParsedTestCase
+
+    Returns:
+        {
+            "parsed": удалось ли распарсить код,
+            "exact_hash": хэш AST (не зависит от форматирования и комментариев),
+            "structural_hash": хэш структуры с абстрагированными литералами и именами,
+            "decorators": отсортированный набор декораторов,
+            "steps": заголовки allure.step по порядку,
+            "assertions": формы assert-выражений,
+            "calls": вызываемые функции по порядку (корни-переменные заменены на `_`),
+            "features": вектор признаков в порядке FEATURE_NAMES
+        }
+    """
+    parsed = test_case if isinstance(test_case, ParsedTestCase) else ParsedTestCase(test_case)
+
+    if not parsed.ok:
+        # Без AST сравниваем хотя бы нормализованный по пробелам текст
+        normalized = _sha256(" ".join(parsed.source.split()))
+        return {
+            "parsed": False,
+            "error": parsed.syntax_error,
+            "exact_hash": normalized,
+            "structural_hash": normalized,
+            "decorators": [],
+            "steps": [],
+            "assertions": [],
+            "calls": [],
+            "features": [0] * len(FEATURE_NAMES)
+        }
+
+    visitor = _StructureVisitor()
+    visitor.visit(parsed.tree)
+    structure = "".join(visitor.parts)
+
+    return {
+        "parsed": True,
+        "exact_hash": _sha256(ast.dump(parsed.tree, annotate_fields=False)),
+        "structural_hash": _sha256(structure + "|" + "|".join(sorted(visitor.decorators))),
+        "decorators": sorted(set(visitor.decorators)),
+        "steps": visitor.steps,
+        "assertions": visitor.asserts,
+        "calls": visitor.calls,
+        "features": [visitor.counts[name] for name in FEATURE_NAMES]
+    }
+
+
+def group_by_fingerprint(test_cases: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Группирует точные и структурные дубликаты по хэш-бакетам за O(n)
+
+    Точные дубликаты совпадают по AST; структурные — отличаются только
+    литералами и именами. Структурная группа возвращается, только если
+    в ней есть кейсы с разным AST (иначе она совпадает с точной).
+
+    Returns:
+        {"exact": [{"test_cases": [...], "hash": ...}], "structural": [...]}
+    """
+    exact: Dict[str, List[int]] = {}
+    structural: Dict[str, List[int]] = {}
+    exact_of: List[str] = []
+    for index, test_case in enumerate(test_cases):
+        fp = fingerprint(test_case)
+        exact.setdefault(fp["exact_hash"], []).append(index)
+        structural.setdefault(fp["structural_hash"], []).append(index)
+        exact_of.append(fp["exact_hash"])
+
+    return {
+        "exact": [
+            {"test_cases": ids, "hash": h}
+            for h, ids in exact.items() if len(ids) > 1
+        ],
+        "structural": [
+            {"test_cases": ids, "hash": h}
+            for h, ids in structural.items() if len({exact_of[i] for i in ids}) > 1
+        ]
+    }
@@ -1,16 +1,29 @@
 """
 Модуль оптимизации тест-кейсов
 """
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable
 from .llm_service import LLMService
+from .duplicate_detector import DuplicateDetector
+from .test_fingerprint import group_by_fingerprint
+from .coverage_engine import CoverageEngine, split_requirements
+from .prompt_budget import estimate_tokens, pack_by_budget, truncate_to_budget
+import asyncio
+import os
 import re
 
 
+# Части анализа, которые выполняет run_optimization
+OPTIMIZATION_PARTS = ("coverage", "duplicates", "improvements")
+
+
 class TestOptimizer:
     """Оптимизатор тест-кейсов"""
     
-    def __init__(self):
+    def __init__(self, chunk_tokens: Optional[int] = None, map_concurrency: Optional[int] = None):
         self.llm_service = LLMService()
+        # Бюджет части набора в токенах и число параллельных запросов в режиме map-reduce
+        self.chunk_tokens = chunk_tokens
+        self.map_concurrency = map_concurrency
     
     async def analyze_coverage(
         self,
@@ -27,9 +40,14 @@ class TestOptimizer:
         Returns:
             Результат анализа покрытия
         """
-        test_cases_text = "\n\n".join(test_cases)
+        # Матрица покрытия считается локально, LLM получает только слабые места
+        coverage = await asyncio.to_thread(self._coverage_matrix, test_cases, requirements)
+        low_coverage = [
+            item for item in coverage["requirements"] if not item["covered"]
+        ][:int(os.getenv("COVERAGE_GAP_MAX_ITEMS", "30"))]
         
-        prompt = f"""Проанализируй покрытие функционала тестами.
+        def map_prompt(test_cases_text: str, part: str) -> str:
+            return f"""Проанализируй покрытие функционала тестами{part}.
 
 Требования:
 {requirements}
@@ -45,61 +63,131 @@ class TestOptimizer:
 
 Ответь в структурированном формате."""
         
-        analysis = await self.llm_service.generate(
-            prompt=prompt,
-            system_prompt="Ты эксперт по анализу покрытия тестами. Анализируй тест-кейсы и требования.",
-            temperature=0.2,
-            max_tokens=2000
+        def reduce_prompt(partials_text: str) -> str:
+            return f"""Объедини частичные результаты анализа покрытия, полученные для частей набора тест-кейсов.
+
+Требования:
+{requirements}
+
+Частичные результаты:
+{partials_text}
+
+Составь единый анализ без повторов и определи:
+1. Что покрыто тестами
+2. Что не покрыто тестами (пробелы)
+3. Критичность непокрытых сценариев
+4. Рекомендации по улучшению покрытия
+
+Ответь в структурированном формате."""
+        
+        # Основной анализ и поиск пробелов независимы — выполняем параллельно
+        analysis, gaps = await asyncio.gather(
+            self._map_reduce(
+                test_cases,
+                map_prompt=map_prompt,
+                reduce_prompt=reduce_prompt,
+                system_prompt="Ты эксперт по анализу покрытия тестами. Анализируй тест-кейсы и требования.",
+                temperature=0.2,
+                max_tokens=2000,
+                context_tokens=estimate_tokens(requirements)
+            ),
+            self._identify_gaps(test_cases, low_coverage)
         )
         
         return {
-            "analysis": analysis,
-            "coverage_percentage": self._estimate_coverage(test_cases, requirements),
-            "gaps": await self._identify_gaps(test_cases, requirements)
+            "analysis": analysis["text"],
+            "coverage_percentage": coverage["coverage_percentage"],
+            "gaps": gaps,
+            "coverage_matrix": coverage,
+            "chunks": analysis["chunks"],
+            "failed_chunks": analysis["failed_chunks"],
+            "reduce_failed": analysis["reduce_failed"]
         }
     
+    def _coverage_matrix(self, test_cases: List[str], requirements: str) -> Dict[str, Any]:
+        """Покрытие атомарных пунктов требований (см. CoverageEngine)"""
+        engine = CoverageEngine(
+            threshold=float(os.getenv("COVERAGE_THRESHOLD", "0.15")),
+            n_features=int(os.getenv("COVERAGE_FEATURES", "512"))
+        )
+        return engine.analyze(split_requirements(requirements), test_cases)
+    
     async def find_duplicates(
         self,
         test_cases: List[str]
-    ) -> List[Dict[str, Any]]:
+    ) -> Dict[str, Any]:
         """
         Находит дублирующиеся тест-кейсы
         
+        Кандидаты ищутся локально (MinHash + LSH), LLM только объясняет
+        найденные кластеры, поэтому размер набора не ограничен контекстом модели.
+        
         Args:
             test_cases: Список тест-кейсов
         
         Returns:
-            Список найденных дубликатов
+            Анализ LLM, дубликаты по названиям, кластеры почти-дубликатов,
+            точные и структурные дубликаты по AST-отпечаткам
         """
         if len(test_cases) < 2:
             return []
         
-        test_cases_text = "\n\n---TEST CASE---\n\n".join(test_cases)
+        detector = DuplicateDetector(threshold=float(os.getenv("DUPLICATE_THRESHOLD", "0.8")))
+        clusters = await asyncio.to_thread(detector.find_clusters, test_cases)
+        # Точные и структурные дубликаты по AST-отпечаткам, без LLM
+        structural = await asyncio.to_thread(group_by_fingerprint, test_cases)
         
-        prompt = f"""Найди дублирующиеся, устаревшие или конфликтующие тест-кейсы:
-
-{test_cases_text}
-
-Для каждого дубликата укажи:
-1. Номера тест-кейсов
-2. Причину дублирования
-3. Рекомендацию (объединить/удалить/оставить)"""
-        
-        analysis = await self.llm_service.generate(
-            prompt=prompt,
-            system_prompt="Ты эксперт по оптимизации тест-кейсов. Находи дубликаты и конфликты.",
-            temperature=0.2,
-            max_tokens=2000
-        )
+        if clusters:
+            analysis = await self.llm_service.generate(
+                prompt=self._build_duplicates_prompt(test_cases, clusters),
+                system_prompt="Ты эксперт по оптимизации тест-кейсов. Находи дубликаты и конфликты.",
+                temperature=0.2,
+                max_tokens=2000
+            )
+        else:
+            analysis = "Почти-дубликаты не найдены"
         
         # Простой анализ на основе названий тестов
         duplicates = self._simple_duplicate_check(test_cases)
         
         return {
             "llm_analysis": analysis,
-            "detected_duplicates": duplicates
+            "detected_duplicates": duplicates,
+            "clusters": clusters,
+            "exact_duplicates": structural["exact"],
+            "structural_duplicates": structural["structural"]
         }
     
+    def _build_duplicates_prompt(
+        self,
+        test_cases: List[str],
+        clusters: List[Dict[str, Any]]
+    ) -> str:
+        """Промпт с кандидатами в дубликаты (ограниченный по размеру)"""
+        max_clusters = int(os.getenv("DUPLICATE_LLM_MAX_CLUSTERS", "10"))
+        max_chars = int(os.getenv("DUPLICATE_LLM_MAX_CASE_CHARS", "1500"))
+        
+        parts = []
+        for number, cluster in enumerate(clusters[:max_clusters], start=1):
+            cases = "\n\n".join(
+                f"[Тест-кейс {index}]\n{test_cases[index][:max_chars]}"
+                for index in cluster["test_cases"][:3]
+            )
+            parts.append(
+                f"---КЛАСТЕР {number} (сходство {cluster['similarity']:.2f}, "
+                f"тест-кейсы {cluster['test_cases']})---\n{cases}"
+            )
+        clusters_text = "\n\n".join(parts)
+        
+        return f"""Локальный анализ нашел группы похожих тест-кейсов:
+
+{clusters_text}
+
+Для каждой группы укажи:
+1. Являются ли тест-кейсы дубликатами, устаревшими или конфликтующими
+2. Причину дублирования
+3. Рекомендацию (объединить/удалить/оставить)"""
+    
     async def suggest_improvements(
         self,
         test_cases: List[str],
@@ -115,14 +203,13 @@ class TestOptimizer:
         Returns:
             Рекомендации по улучшению
         """
-        test_cases_text = "\n\n".join(test_cases)
-        
         # Формируем часть с историей дефектов отдельно, чтобы избежать проблемы с \n в f-string
         defect_history_part = ""
         if defect_history:
             defect_history_part = f"История дефектов:\n{defect_history}\n"
         
-        prompt = f"""Проанализируй тест-кейсы и предложи улучшения:
+        def map_prompt(test_cases_text: str, part: str) -> str:
+            return f"""Проанализируй тест-кейсы{part} и предложи улучшения:
 
 Тест-кейсы:
 {test_cases_text}
@@ -133,34 +220,179 @@ class TestOptimizer:
 3. Оптимизацию критических сценариев
 4. Улучшение структуры тестов"""
         
-        suggestions = await self.llm_service.generate(
-            prompt=prompt,
+        def reduce_prompt(partials_text: str) -> str:
+            return f"""Объедини рекомендации по улучшению, полученные для частей набора тест-кейсов:
+
+{partials_text}
+
+Убери повторы, сгруппируй похожие рекомендации и предложи:
+1. Улучшения на основе типовых дефектов
+2. Дополнительные проверки
+3. Оптимизацию критических сценариев
+4. Улучшение структуры тестов"""
+        
+        suggestions = await self._map_reduce(
+            test_cases,
+            map_prompt=map_prompt,
+            reduce_prompt=reduce_prompt,
             system_prompt="Ты эксперт по улучшению тест-кейсов. Анализируй и предлагай практические улучшения.",
             temperature=0.3,
-            max_tokens=2000
+            max_tokens=2000,
+            context_tokens=estimate_tokens(defect_history_part)
         )
         
         return {
-            "suggestions": suggestions,
-            "priority_improvements": await self._identify_priority_improvements(test_cases)
+            "suggestions": suggestions["text"],
+            "priority_improvements": await self._identify_priority_improvements(test_cases),
+            "chunks": suggestions["chunks"],
+            "failed_chunks": suggestions["failed_chunks"],
+            "reduce_failed": suggestions["reduce_failed"]
         }
     
-    def _estimate_coverage(self, test_cases: List[str], requirements: str) -> float:
-        """Простая оценка покрытия (можно улучшить)"""
-        # Базовая эвристика: количество тест-кейсов относительно требований
-        req_keywords = len(re.findall(r'\b(?:проверить|тест|сценарий|кейс)\b', requirements, re.IGNORECASE))
-        coverage = min(100, (len(test_cases) / max(1, req_keywords)) * 100)
-        return round(coverage, 2)
+    def _chunk_budget(self) -> int:
+        return self.chunk_tokens or int(os.getenv("OPTIMIZER_CHUNK_TOKENS", "12000"))
     
-    async def _identify_gaps(self, test_cases: List[str], requirements: str) -> List[str]:
-        """Идентифицирует пробелы в покрытии"""
-        prompt = f"""Найди пробелы в покрытии тестами:
-
-Требования:
-{requirements}
+    def _map_concurrency(self) -> int:
+        return self.map_concurrency or int(os.getenv("OPTIMIZER_MAP_CONCURRENCY", "4"))
+    
+    async def _map_reduce(
+        self,
+        test_cases: List[str],
+        map_prompt: Callable[[str, str], str],
+        reduce_prompt: Callable[[str], str],
+        system_prompt: str,
+        temperature: float,
+        max_tokens: int,
+        context_tokens: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Анализирует набор тест-кейсов целиком, даже если он не помещается в контекст
+        
+        Набор разбивается на части по бюджету токенов, части анализируются
+        параллельно (map), затем частичные результаты объединяются (reduce).
+        Если частичных результатов слишком много для одного промпта, они
+        объединяются в несколько уровней; результаты, каждый из которых
+        занимает весь бюджет, обрезаются. Если объединение не удалось,
+        результатом становятся сами частичные результаты. Набор, помещающийся
+        в бюджет, анализируется одним запросом, как раньше.
+        
+        Args:
+            test_cases: Список тест-кейсов
+            map_prompt: Промпт для части: (текст тест-кейсов, метка части) -> промпт
+            reduce_prompt: Промпт объединения: (частичные результаты) -> промпт
+            system_prompt: Системный промпт
+            temperature: Температура генерации
+            max_tokens: Максимальное количество токенов ответа
+            context_tokens: Размер общей части промпта (требования и т.п.)
+        
+        Returns:
+            {"text": итоговый ответ, "chunks": число частей, "failed_chunks": номера упавших частей,
+            "reduce_failed": объединение не удалось и text — частичные результаты подряд}
+        """
+        budget = self._chunk_budget()
+        # Общая часть повторяется в каждом промпте, но на тест-кейсы оставляем не меньше четверти
+        groups = pack_by_budget(test_cases, max(budget - context_tokens, budget // 4))
+        
+        if len(groups) <= 1:
+            text = await self.llm_service.generate(
+                prompt=map_prompt("\n\n".join(test_cases), ""),
+                system_prompt=system_prompt,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+            return {"text": text, "chunks": len(groups), "failed_chunks": [], "reduce_failed": False}
+        
+        prompts = [
+            map_prompt(
+                "\n\n".join(f"[Тест-кейс {i}]\n{test_cases[i]}" for i in group),
+                f" (часть {number} из {len(groups)}, тест-кейсы {group[0]}–{group[-1]})"
+            )
+            for number, group in enumerate(groups, start=1)
+        ]
+        results = await self.llm_service.generate_batch_detailed(
+            prompts,
+            system_prompt=system_prompt,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            concurrency=self._map_concurrency()
+        )
+        
+        partials = [
+            f"---ЧАСТЬ {r['index'] + 1} (тест-кейсы {groups[r['index']][0]}–{groups[r['index']][-1]})---\n{r['result']}"
+            for r in results if r["status"] == "ok"
+        ]
+        failed = [r["index"] + 1 for r in results if r["status"] != "ok"]
+        if not partials:
+            raise Exception(f"Не удалось проанализировать ни одной части набора: {results[0]['error']}")
+        
+        if len(partials) == 1:
+            # Уцелела только одна часть — ее ответ и есть результат
+            ok = [r["result"] for r in results if r["status"] == "ok"]
+            return {"text": ok[0], "chunks": len(groups), "failed_chunks": failed, "reduce_failed": False}
+        
+        # Иерархическое объединение, пока частичные результаты не сведутся к одному.
+        # Ошибка объединения, как и ошибка части, не прерывает анализ: вместо
+        # ответа LLM остаются сами частичные результаты
+        part_budget = max(budget - context_tokens, budget // 4)
+        reduce_failed = False
+        while len(partials) > 1 and not reduce_failed:
+            partial_groups = pack_by_budget(partials, part_budget)
+            if len(partial_groups) == len(partials):
+                # Каждый результат занимает весь бюджет: обрезаем, чтобы объединять хотя бы по два
+                partials = [truncate_to_budget(partial, part_budget // 2 - 8) for partial in partials]
+                partial_groups = pack_by_budget(partials, part_budget)
+            merged = await self.llm_service.generate_batch_detailed(
+                [reduce_prompt("\n\n".join(partials[i] for i in group)) for group in partial_groups],
+                system_prompt=system_prompt,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                concurrency=self._map_concurrency()
+            )
+            next_partials = []
+            for group, r in zip(partial_groups, merged):
+                if r["status"] == "ok":
+                    next_partials.append(r["result"])
+                else:
+                    reduce_failed = True
+                    next_partials.append("\n\n".join(partials[i] for i in group))
+            partials = next_partials
+        
+        return {
+            "text": "\n\n".join(partials),
+            "chunks": len(groups),
+            "failed_chunks": failed,
+            "reduce_failed": reduce_failed
+        }
+    
+    async def _identify_gaps(
+        self,
+        test_cases: List[str],
+        low_coverage: List[Dict[str, Any]]
+    ) -> List[str]:
+        """
+        Идентифицирует пробелы в покрытии
+        
+        LLM видит только слабо покрытые пункты требований и ближайшие к ним
+        тест-кейсы, поэтому размер промпта не зависит от размера набора.
+        """
+        if not low_coverage:
+            return []
+        
+        max_chars = int(os.getenv("COVERAGE_GAP_MAX_CASE_CHARS", "800"))
+        parts = []
+        for item in low_coverage:
+            index = item["best_test"]
+            if index is not None and item["score"] > 0:
+                nearest = f"[Тест-кейс {index}]\n{test_cases[index][:max_chars]}"
+            else:
+                nearest = "нет похожих тест-кейсов"
+            parts.append(f"- {item['text']} (сходство {item['score']:.2f})\n{nearest}")
+        items_text = "\n\n".join(parts)
+        
+        prompt = f"""Найди пробелы в покрытии тестами.
 
-Тест-кейсы:
-{chr(10).join(test_cases[:5])}
+Пункты требований со слабым покрытием и ближайшие к ним тест-кейсы:
+{items_text}
 
 Укажи конкретные пробелы в покрытии."""
         
@@ -176,20 +408,21 @@ class TestOptimizer:
     def _simple_duplicate_check(self, test_cases: List[str]) -> List[Dict[str, Any]]:
         """Простая проверка дубликатов по названиям"""
         duplicates = []
-        test_names = []
+        first_seen: Dict[str, int] = {}
         
         for i, test_case in enumerate(test_cases):
             # Извлекаем название теста
             name_match = re.search(r'def\s+(\w+)', test_case)
             if name_match:
                 test_name = name_match.group(1)
-                if test_name in test_names:
+                if test_name in first_seen:
                     duplicates.append({
-                        "test_case_1": test_names.index(test_name),
+                        "test_case_1": first_seen[test_name],
                         "test_case_2": i,
                         "name": test_name
                     })
-                test_names.append(test_name)
+                else:
+                    first_seen[test_name] = i
         
         return duplicates
     
@@ -202,3 +435,61 @@ class TestOptimizer:
             "Добавить негативные тест-кейсы"
         ]
 
+
+
+async def run_optimization(
+    optimizer: TestOptimizer,
+    test_cases: List[str],
+    requirements: str,
+    defect_history: str = "",
+    timeouts: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """
+    Выполняет анализ покрытия, поиск дубликатов и предложения по улучшению параллельно
+    
+    Каждая часть ограничена своим таймаутом. Ошибка или таймаут одной части
+    не отменяет остальные: ее результат будет None, а причина попадет в errors.
+    
+    Args:
+        optimizer: Оптимизатор тест-кейсов
+        test_cases: Список тест-кейсов
+        requirements: Описание требований
+        defect_history: История дефектов (опционально)
+        timeouts: Таймауты частей в секундах {"coverage": ..., "duplicates": ..., "improvements": ...};
+            по умолчанию OPTIMIZER_PART_TIMEOUT
+    
+    Returns:
+        {"coverage", "duplicates", "improvements", "errors", "partial"}
+    """
+    default_timeout = float(os.getenv("OPTIMIZER_PART_TIMEOUT", "180"))
+    timeouts = timeouts or {}
+    
+    parts = {
+        "coverage": optimizer.analyze_coverage(test_cases=test_cases, requirements=requirements),
+        "duplicates": optimizer.find_duplicates(test_cases),
+        "improvements": optimizer.suggest_improvements(test_cases=test_cases, defect_history=defect_history)
+    }
+    
+    async def run_part(name: str, coro) -> Any:
+        return await asyncio.wait_for(coro, timeout=timeouts.get(name, default_timeout))
+    
+    outcomes = await asyncio.gather(
+        *(run_part(name, coro) for name, coro in parts.items()),
+        return_exceptions=True
+    )
+    
+    result: Dict[str, Any] = {}
+    errors: Dict[str, str] = {}
+    for name, outcome in zip(parts, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            result[name] = None
+            errors[name] = "Превышен таймаут анализа"
+        elif isinstance(outcome, BaseException):
+            result[name] = None
+            errors[name] = str(outcome)
+        else:
+            result[name] = outcome
+    
+    result["errors"] = errors
+    result["partial"] = bool(errors)
+    return result
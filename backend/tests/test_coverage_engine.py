@@ -0,0 +1,68 @@
+import asyncio
+
+from services.coverage_engine import CoverageEngine, split_requirements
+
+
+REQUIREMENTS = """Требования к форме входа:
+1. Пользователь может войти по логину и паролю.
+2) При неверном пароле показывается сообщение об ошибке; после пяти попыток аккаунт блокируется
+- Администратор может экспортировать отчет о платежах в PDF
+"""
+
+LOGIN_CASE = '''@allure.title("Вход по логину и паролю")
+def test_login_with_password(page):
+    with allure.step("Ввести логин и пароль пользователя"):
+        page.fill("login", "user")
+        page.fill("password", "secret")
+    assert page.is_logged_in()
+'''
+
+WRONG_PASSWORD_CASE = '''@allure.title("Ошибка при неверном пароле")
+def test_wrong_password(page):
+    with allure.step("Ввести неверный пароль"):
+        page.fill("password", "wrong")
+    assert page.has_text("Сообщение об ошибке")
+'''
+
+VM_CASE = '''def test_create_vm(compute):
+    resp = compute.post("/vms", json={"flavor_id": "small"})
+    assert resp.status_code == 201
+'''
+
+
+def test_split_requirements_into_atomic_items():
+    items = split_requirements(REQUIREMENTS)
+
+    assert items == [
+        "Требования к форме входа:",
+        "Пользователь может войти по логину и паролю.",
+        "При неверном пароле показывается сообщение об ошибке",
+        "после пяти попыток аккаунт блокируется",
+        "Администратор может экспортировать отчет о платежах в PDF",
+    ]
+
+
+def test_coverage_matrix_finds_uncovered_items_and_orphans():
+    items = split_requirements(REQUIREMENTS)[1:]
+    cases = [VM_CASE, WRONG_PASSWORD_CASE, LOGIN_CASE]
+
+    result = CoverageEngine(batch_size=2).analyze(items, cases)
+
+    by_text = {r["text"]: r for r in result["requirements"]}
+    assert by_text[items[0]]["covered"] and by_text[items[0]]["tests"][0] == 2
+    assert by_text[items[1]]["covered"] and by_text[items[1]]["tests"][0] == 1
+    assert not by_text[items[3]]["covered"]
+    assert 3 in result["uncovered_requirements"]
+    assert result["orphan_tests"] == [0]
+    assert result["coverage_percentage"] == round(result["covered_count"] / 4 * 100, 2)
+
+
+def test_analyze_coverage_sends_only_low_coverage_items_to_gaps(fake_llm, make_optimizer):
+    optimizer = make_optimizer(fake_llm(reply="ОТВЕТ"))
+
+    result = asyncio.run(optimizer.analyze_coverage([LOGIN_CASE, WRONG_PASSWORD_CASE], REQUIREMENTS))
+
+    assert result["coverage_percentage"] == result["coverage_matrix"]["coverage_percentage"]
+    gaps_prompt = next(p for p in optimizer.llm_service.prompts if p.startswith("Найди пробелы"))
+    assert "экспортировать отчет" in gaps_prompt
+    assert "войти по логину" not in gaps_prompt
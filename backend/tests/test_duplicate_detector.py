@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+from services.duplicate_detector import DuplicateDetector
+
+
+LOGIN_CASE = '''@allure.title("Успешный вход")
+def test_login_valid(self):
+    with allure.step("Открыть страницу входа"):
+        page.open("/login")
+    with allure.step("Ввести логин и пароль"):
+        page.fill("username", "admin")
+        page.fill("password", "secret")
+    with allure.step("Нажать кнопку входа"):
+        page.click("submit")
+    assert page.is_logged_in()
+'''
+
+VM_CASE = '''def test_create_vm(compute):
+    body = {"name": "vm-1", "flavor_id": "small"}
+    resp = compute.post("/vms", json=body)
+    assert resp.status_code == 201
+'''
+
+
+@pytest.fixture
+def optimizer(fake_llm, make_optimizer):
+    return make_optimizer(fake_llm(reply="EXPLANATION"))
+
+
+def test_near_duplicates_are_clustered():
+    cases = [
+        LOGIN_CASE,
+        VM_CASE,
+        LOGIN_CASE.replace('"admin"', '"root"'),
+        "# комментарий не влияет\n" + LOGIN_CASE.upper(),
+    ]
+
+    clusters = DuplicateDetector(threshold=0.7).find_clusters(cases)
+
+    assert len(clusters) == 1
+    assert clusters[0]["test_cases"] == [0, 2, 3]
+    assert 0.7 <= clusters[0]["similarity"] <= 1
+    exact = [p for p in clusters[0]["pairs"] if p["test_case_2"] == 3]
+    assert exact[0]["similarity"] == 1.0
+
+
+def test_find_duplicates_asks_llm_only_about_clusters(optimizer):
+    cases = [LOGIN_CASE, VM_CASE, LOGIN_CASE]
+
+    result = asyncio.run(optimizer.find_duplicates(cases))
+
+    assert result["llm_analysis"] == "EXPLANATION"
+    assert result["clusters"][0]["test_cases"] == [0, 2]
+    assert result["detected_duplicates"] == [{"test_case_1": 0, "test_case_2": 2, "name": "test_login_valid"}]
+    assert len(optimizer.llm_service.prompts) == 1
+    assert "test_create_vm" not in optimizer.llm_service.prompts[0]
+
+
+def test_find_duplicates_skips_llm_without_clusters(optimizer):
+    result = asyncio.run(optimizer.find_duplicates([LOGIN_CASE, VM_CASE]))
+
+    assert result["clusters"] == []
+    assert optimizer.llm_service.prompts == []
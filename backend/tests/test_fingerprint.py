@@ -0,0 +1,98 @@
+import gc
+import threading
+import time
+
+from services.standards_checker import StandardsChecker
+from services.test_fingerprint import FEATURE_NAMES, fingerprint, group_by_fingerprint, parse_source
+
+
+CASE = '''import allure
+import pytest
+
+
+@allure.manual
+@allure.label("owner", "QA Team")
+@allure.feature("Auth")
+class TestLogin:
+    @allure.title("Успешный вход")
+    def test_login(self):
+        """Пользователь входит по логину и паролю"""
+        with allure_step("Открыть страницу входа"):
+            page.open("/login")
+        with allure.step("Ввести данные"):
+            page.fill("user", "admin")
+        assert page.status == 200
+'''
+
+
+def test_fingerprint_extracts_allure_structure():
+    fp = fingerprint(CASE)
+
+    assert fp["parsed"] is True
+    assert fp["decorators"] == ["allure.feature", "allure.label(owner)", "allure.manual", "allure.title"]
+    assert fp["steps"] == ["Открыть страницу входа", "Ввести данные"]
+    assert len(fp["assertions"]) == 1
+    assert "_.fill" in fp["calls"] and "allure.step" in fp["calls"]
+    features = dict(zip(FEATURE_NAMES, fp["features"]))
+    assert features["classes"] == 1
+    assert features["test_functions"] == 1
+    assert features["steps"] == 2
+
+
+def test_hashes_ignore_formatting_and_abstract_literals():
+    reformatted = CASE.replace("        with allure_step", "        # комментарий\n        with allure_step")
+    renamed = CASE.replace('"admin"', '"root"').replace("page", "browser").replace("test_login", "test_signin")
+
+    assert fingerprint(reformatted)["exact_hash"] == fingerprint(CASE)["exact_hash"]
+    assert fingerprint(renamed)["exact_hash"] != fingerprint(CASE)["exact_hash"]
+    assert fingerprint(renamed)["structural_hash"] == fingerprint(CASE)["structural_hash"]
+    assert fingerprint(CASE.replace("== 200", "!= 200"))["structural_hash"] != fingerprint(CASE)["structural_hash"]
+
+
+def test_group_by_fingerprint_buckets():
+    renamed = CASE.replace('"admin"', '"root"')
+    groups = group_by_fingerprint([CASE, "def broken(:", CASE, renamed, "x = 1"])
+
+    assert [g["test_cases"] for g in groups["exact"]] == [[0, 2]]
+    assert [g["test_cases"] for g in groups["structural"]] == [[0, 2, 3]]
+
+
+def test_standards_structure_check_uses_ast():
+    checker = StandardsChecker.__new__(StandardsChecker)
+
+    result = checker._check_structure(CASE)
+
+    assert result["passed"] is True
+    # Без докстринга описание не найдено
+    no_doc = CASE.replace('"""Пользователь входит по логину и паролю"""', 'note = "без описания"')
+    assert checker._check_structure(no_doc)["missing"] == ["has_description"]
+
+
+def test_parsing_is_safe_from_several_threads():
+    # Сборщик мусора отпускает GIL посреди ast.parse: без блокировки
+    # CPython 3.11 падает с "AST constructor recursion depth mismatch"
+    source = "\n".join(f"def test_{i}(a):\n    return [b for b in a if b]\n" for i in range(300))
+    errors = []
+
+    def parse_many():
+        for _ in range(20):
+            try:
+                parse_source(source)
+            except SystemError as e:
+                errors.append(e)
+                return
+
+    def switch_threads(phase, info):
+        time.sleep(0)
+
+    gc.callbacks.append(switch_threads)
+    try:
+        threads = [threading.Thread(target=parse_many) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        gc.callbacks.remove(switch_threads)
+
+    assert errors == []
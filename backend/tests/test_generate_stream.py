@@ -0,0 +1,65 @@
+import asyncio
+import json
+
+from services.code_fence import StreamingCodeFenceStripper, strip_code_fence
+
+
+def _feed_by_char(text):
+    stripper = StreamingCodeFenceStripper()
+    emitted = [stripper.feed(ch) for ch in text]
+    emitted.append(stripper.finish())
+    return "".join(emitted), stripper
+
+
+def test_stripper_drops_preamble_and_fences():
+    answer = "Вот тесты:\n```python\nimport allure\n\ndef test_login():\n    assert True\n```\nГотово."
+
+    streamed, stripper = _feed_by_char(answer)
+
+    assert streamed.strip() == strip_code_fence(answer)
+    assert stripper.code == strip_code_fence(answer)
+    assert "```" not in streamed
+
+
+def test_stripper_emits_code_before_stream_ends():
+    stripper = StreamingCodeFenceStripper()
+
+    assert stripper.feed("```python\nimport pytest\n") == "import pytest\n"
+    assert stripper.feed("def test_x():\n    ass") == "def test_x():\n    ass"
+    assert stripper.feed("ert 1\n``") == "ert 1\n"
+    assert stripper.feed("`\ntrailing prose") == ""
+    assert stripper.finish() == ""
+
+
+def test_stripper_without_fences_returns_everything():
+    answer = "import allure\n\n\nclass TestX:\n    pass"
+
+    streamed, _ = _feed_by_char(answer)
+
+    assert streamed == answer
+
+
+def test_generate_test_case_stream_endpoint(monkeypatch):
+    import main
+
+    class FakeLLM:
+        async def generate_stream(self, **kwargs):
+            for chunk in ["```py", "thon\nimport allure\n", "def test_a():\n", "    pass\n```"]:
+                yield chunk
+
+    class FakeGenerator(main.TestCaseGenerator):
+        def __init__(self):
+            self.llm_service = FakeLLM()
+
+    monkeypatch.setattr(main, "test_case_generator", FakeGenerator())
+
+    async def run():
+        request = main.GenerateTestCaseRequest(requirements="login form")
+        response = await main.generate_test_case_stream(request)
+        return [json.loads(line) async for line in response.body_iterator]
+
+    events = asyncio.run(run())
+
+    assert events[-1] == {"done": True, "code": "import allure\ndef test_a():\n    pass", "success": True}
+    assert "".join(e["content"] for e in events[:-1]).strip() == events[-1]["code"]
+    assert len(events) > 2
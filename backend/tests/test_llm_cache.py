@@ -0,0 +1,78 @@
+import asyncio
+import time
+
+from services.llm_cache import LLMResponseCache, make_cache_key
+
+
+def test_cache_key_normalizes_and_separates_params():
+    base = make_cache_key("m", "sys", "prompt", 0.2, 1000)
+
+    assert make_cache_key("m", " sys\n", "prompt  ", 0.2, 1000) == base
+    assert make_cache_key("m", "sys", "prompt", 0.3, 1000) != base
+    assert make_cache_key("m", "sys", "prompt", 0.2, 999) != base
+    assert make_cache_key("other", "sys", "prompt", 0.2, 1000) != base
+
+
+def test_memory_lru_eviction_and_ttl():
+    cache = LLMResponseCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.stats()["evictions"] == 1
+
+    cache._memory["a"] = ("1", time.time() - 120)
+    assert cache.get("a") is None
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / "llm_cache.sqlite")
+    LLMResponseCache(db_path=db_path).set("k", "value")
+
+    restarted = LLMResponseCache(db_path=db_path)
+    assert restarted.get("k") == "value"
+    assert restarted.stats()["disk_hits"] == 1
+    assert restarted.get("k") == "value"
+    assert restarted.stats()["memory_hits"] == 1
+
+    assert restarted.invalidate("k") == 1
+    assert LLMResponseCache(db_path=db_path).get("k") is None
+
+
+def test_generate_uses_cache_for_low_temperature(monkeypatch):
+    import services.llm_cache as llm_cache
+    from services.llm_service import LLMService
+
+    monkeypatch.setenv("CLOUD_RU_API_KEY", "test-key")
+    monkeypatch.setattr(llm_cache, "_llm_cache", LLMResponseCache())
+    llm = LLMService()
+    calls = []
+
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            calls.append(kwargs)
+            message = type("M", (), {"content": f"answer {len(calls)}"})
+            choice = type("C", (), {"message": message})
+            return type("R", (), {"choices": [choice]})
+
+    fake_client = type("Client", (), {"chat": type("Chat", (), {"completions": FakeCompletions()})})
+    monkeypatch.setattr(LLMService, "client", fake_client)
+
+    async def run():
+        first = await llm.generate("check", temperature=0.2)
+        second = await llm.generate("check", temperature=0.2)
+        bypassed = await llm.generate("check", temperature=0.2, use_cache=False)
+        creative = await llm.generate("check", temperature=0.7)
+        return first, second, bypassed, creative
+
+    first, second, bypassed, creative = asyncio.run(run())
+
+    assert first == second == "answer 1"
+    assert bypassed == "answer 2"
+    assert creative == "answer 3"
+    stats = llm_cache.get_llm_cache().stats()
+    assert stats["hits"] == 1
+    assert stats["bypassed"] == 2
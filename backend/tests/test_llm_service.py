@@ -0,0 +1,223 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+STUB_DELAY = 0.5
+
+
+class _StubCompletionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        time.sleep(STUB_DELAY)
+        body = json.dumps({
+            "id": "stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": payload.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": payload["messages"][-1]["content"].upper()},
+                "finish_reason": "stop"
+            }]
+        }).encode()
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Клиент отвалился по таймауту
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 64
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    server = _StubServer(("127.0.0.1", 0), _StubCompletionHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("CLOUD_RU_API_KEY", "test-key")
+    monkeypatch.setenv("CLOUD_RU_API_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setenv("CLOUD_RU_MAX_RETRIES", "0")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_generate_does_not_block_event_loop(stub_llm):
+    from services.llm_service import LLMService, close_shared_http_client
+
+    llm = LLMService()
+    concurrency = 8
+
+    async def run():
+        # Прогрев: ленивые импорты SDK и первое соединение не должны влиять на замер
+        await llm.generate("warmup")
+        started = time.perf_counter()
+        results = await asyncio.gather(*(llm.generate(f"prompt {i}") for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        await close_shared_http_client()
+        return results, elapsed
+
+    results, elapsed = asyncio.run(run())
+
+    assert results == [f"PROMPT {i}" for i in range(concurrency)]
+    # Последовательно это заняло бы concurrency * STUB_DELAY
+    assert elapsed < STUB_DELAY * 3
+
+
+def test_generate_per_call_timeout(stub_llm):
+    from services.llm_service import LLMService, close_shared_http_client
+
+    llm = LLMService()
+
+    async def run():
+        try:
+            with pytest.raises(Exception, match="Таймаут"):
+                await llm.generate("slow", timeout=0.1)
+        finally:
+            await close_shared_http_client()
+
+    asyncio.run(run())
+
+
+def _fake_llm(monkeypatch, delays):
+    from services.llm_service import LLMService
+
+    monkeypatch.setenv("CLOUD_RU_API_KEY", "test-key")
+    llm = LLMService()
+    state = {"active": 0, "peak": 0}
+
+    async def fake_generate(prompt, system_prompt=None, temperature=0.7, max_tokens=300, timeout=None):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        try:
+            await asyncio.sleep(delays.get(prompt, 0.05))
+            if prompt.startswith("bad"):
+                raise Exception("upstream failure")
+            return f"answer:{prompt}"
+        finally:
+            state["active"] -= 1
+
+    llm.generate = fake_generate
+    return llm, state
+
+
+def test_generate_batch_returns_texts_and_raises_on_error(monkeypatch):
+    llm, state = _fake_llm(monkeypatch, {"p0": 0.1, "slow": 5})
+
+    assert asyncio.run(llm.generate_batch(["p0", "p1", "p2"], concurrency=2)) == ["answer:p0", "answer:p1", "answer:p2"]
+    assert state["peak"] == 2
+
+    started = time.perf_counter()
+    with pytest.raises(Exception, match="upstream failure"):
+        asyncio.run(llm.generate_batch(["slow", "bad1"]))
+    assert time.perf_counter() - started < 1  # медленный запрос отменен
+    assert state["active"] == 0
+
+
+def test_generate_batch_detailed_ordered_with_errors_and_cap(monkeypatch):
+    llm, state = _fake_llm(monkeypatch, {"p0": 0.15, "p3": 0.01})
+    prompts = ["p0", "p1", "bad2", "p3", "p4", "p5"]
+
+    results = asyncio.run(llm.generate_batch_detailed(prompts, concurrency=3))
+
+    assert [r["index"] for r in results] == list(range(len(prompts)))
+    assert results[0] == {"index": 0, "status": "ok", "result": "answer:p0", "error": None}
+    assert results[2]["status"] == "error"
+    assert "upstream failure" in results[2]["error"]
+    assert [r["status"] for r in results].count("ok") == 5
+    assert state["peak"] == 3
+
+
+def test_generate_batch_detailed_deadline_returns_partial(monkeypatch):
+    llm, _ = _fake_llm(monkeypatch, {"slow": 5})
+
+    started = time.perf_counter()
+    results = asyncio.run(llm.generate_batch_detailed(["fast", "slow"], deadline=0.3))
+
+    assert time.perf_counter() - started < 1
+    assert results[0]["status"] == "ok"
+    assert results[1]["status"] == "timeout"
+    assert results[1]["result"] is None
+
+
+def test_identical_inflight_requests_are_coalesced(monkeypatch):
+    from services.llm_service import LLMService
+
+    monkeypatch.setenv("CLOUD_RU_API_KEY", "test-key")
+    llm = LLMService()
+    calls = []
+
+    class FakeCompletions:
+        async def create(self, **kwargs):
+            calls.append(kwargs["messages"][-1]["content"])
+            await asyncio.sleep(0.1)
+            if kwargs["messages"][-1]["content"] == "broken":
+                raise Exception("500 Internal Server Error")
+            message = type("M", (), {"content": f"answer {len(calls)}"})
+            return type("R", (), {"choices": [type("C", (), {"message": message})]})
+
+    fake_client = type("Client", (), {"chat": type("Chat", (), {"completions": FakeCompletions()})})
+    monkeypatch.setattr(LLMService, "client", fake_client)
+
+    async def run():
+        same = await asyncio.gather(*(llm.generate("optimize suite", temperature=0.2) for _ in range(5)))
+        failed = await asyncio.gather(
+            *(llm.generate("broken", temperature=0.2) for _ in range(3)), return_exceptions=True
+        )
+        # Запросы с высокой температурой и разными таймаутами не объединяются
+        sampled = await asyncio.gather(*(llm.generate("brainstorm", temperature=0.9) for _ in range(2)))
+        timeouts = await asyncio.gather(
+            llm.generate("check", temperature=0, timeout=5), llm.generate("check", temperature=0, timeout=60)
+        )
+        return same, failed, sampled, timeouts
+
+    same, failed, _, _ = asyncio.run(run())
+
+    assert same == ["answer 1"] * 5
+    assert calls[:2] == ["optimize suite", "broken"]
+    assert all(isinstance(e, Exception) and "500" in str(e) for e in failed)
+    assert calls[2:] == ["brainstorm", "brainstorm", "check", "check"]
+
+
+def test_shared_call_is_cancelled_with_its_last_waiter():
+    from services.singleflight import SingleFlight
+
+    flight = SingleFlight()
+    state = {"finished": False}
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        state["finished"] = True
+        return "answer"
+
+    async def run():
+        waiters = [asyncio.create_task(flight.do("key", slow)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        waiters[0].cancel()
+        await asyncio.sleep(0.01)
+        assert flight.stats()["inflight"] == 1
+        waiters[1].cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        await asyncio.sleep(0.3)
+
+    asyncio.run(run())
+
+    assert not state["finished"]
+    assert flight.stats() == {"calls": 1, "coalesced": 1, "cancelled": 1, "inflight": 0}
@@ -0,0 +1,138 @@
+import asyncio
+
+import httpx
+import pytest
+
+from services import spec_cache, spec_fetcher
+from services.loop_bound_client import LoopBoundClient
+from services.openapi_parser import OpenAPIParser
+
+
+SPEC_YAML = b"""openapi: 3.0.0
+info:
+  title: Compute
+  version: "1"
+paths:
+  /vms:
+    get:
+      summary: List VMs
+"""
+
+
+class FakeServer:
+    """Отдает спецификацию и отвечает 304 на совпавший If-None-Match"""
+
+    def __init__(self, body, etag='"v1"', last_modified=None):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.requests = []
+
+    def handle(self, request: httpx.Request) -> httpx.Response:
+        conditional = {
+            name: request.headers[name]
+            for name in ("If-None-Match", "If-Modified-Since")
+            if name in request.headers
+        }
+        self.requests.append(conditional)
+        if self.etag and conditional.get("If-None-Match") == self.etag:
+            return httpx.Response(304)
+        headers = {"content-type": "application/yaml"}
+        if self.etag:
+            headers["ETag"] = self.etag
+        if self.last_modified:
+            headers["Last-Modified"] = self.last_modified
+        return httpx.Response(200, content=self.body, headers=headers)
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(spec_cache, "_spec_cache", None)
+    fake = FakeServer(SPEC_YAML)
+    monkeypatch.setattr(
+        spec_fetcher,
+        "get_spec_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(fake.handle))
+    )
+    return fake
+
+
+def test_not_modified_returns_cached_spec_without_parsing(server, monkeypatch):
+    parser = OpenAPIParser()
+    first = parser.parse_from_url("https://api.example.com/openapi.yaml")
+
+    monkeypatch.setattr("services.openapi_parser.load_yaml", lambda *_: pytest.fail("повторный парсинг"))
+    second = parser.parse_from_url("https://api.example.com/openapi.yaml")
+
+    assert second is first
+    assert server.requests == [{}, {"If-None-Match": '"v1"'}]
+    stats = spec_cache.get_spec_cache().stats()
+    assert (stats["hits"], stats["misses"], stats["bytes_saved"]) == (1, 1, len(SPEC_YAML))
+
+
+def test_changed_spec_is_downloaded_again(server):
+    parser = OpenAPIParser()
+    parser.parse_from_url("https://api.example.com/openapi.yaml")
+
+    server.body = SPEC_YAML.replace(b"List VMs", b"List virtual machines")
+    server.etag = '"v2"'
+    spec = parser.parse_from_url("https://api.example.com/openapi.yaml")
+
+    assert spec["paths"]["/vms"]["get"]["summary"] == "List virtual machines"
+    assert spec_cache.get_spec_cache().stats()["misses"] == 2
+
+
+def test_same_content_without_validators_is_not_parsed_twice(server, monkeypatch):
+    server.etag = None
+    server.last_modified = None
+    parser = OpenAPIParser()
+    first = parser.parse_from_url("https://a.example.com/openapi.yaml")
+
+    monkeypatch.setattr("services.openapi_parser.load_yaml", lambda *_: pytest.fail("повторный парсинг"))
+    second = parser.parse_from_url("https://b.example.com/openapi.yaml")
+
+    assert second is first
+    assert spec_cache.get_spec_cache().stats()["content_hits"] == 1
+
+
+def test_lru_evicts_oldest_url(server, monkeypatch):
+    monkeypatch.setenv("OPENAPI_CACHE_MAX_ENTRIES", "2")
+    parser = OpenAPIParser()
+
+    for name in ("a", "b", "a", "c"):
+        server.body = SPEC_YAML + f"x-name: {name}\n".encode()
+        parser.parse_from_url(f"https://{name}.example.com/openapi.yaml")
+
+    cache = spec_cache.get_spec_cache()
+    assert cache.get("https://b.example.com/openapi.yaml") is None
+    assert cache.get("https://a.example.com/openapi.yaml") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_sync_parse_inside_event_loop_fails_clearly(server):
+    async def run():
+        OpenAPIParser().parse_from_url("https://api.example.com/openapi.yaml")
+
+    with pytest.raises(RuntimeError, match="parse_from_url_async"):
+        asyncio.run(run())
+
+
+def test_client_of_previous_event_loop_is_closed():
+    created = []
+
+    def factory():
+        created.append(httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(200))))
+        return created[-1]
+
+    clients = LoopBoundClient(factory)
+
+    async def use():
+        await clients.get().get("https://api.example.com/")
+        await asyncio.sleep(0)  # даем закрыться клиенту прошлого цикла
+
+    asyncio.run(use())
+    asyncio.run(use())
+    assert len(created) == 2 and created[0].is_closed and not created[1].is_closed
+
+    asyncio.run(clients.aclose())
+    assert created[1].is_closed
@@ -0,0 +1,147 @@
+import ast
+import asyncio
+import json
+
+import pytest
+
+from services.code_merge import merge_test_modules
+from services.openapi_fanout import group_endpoints, iter_fanout_generation, resource_name
+
+
+def make_spec(vms=20, disks=3):
+    paths = {}
+    for index in range(vms):
+        paths[f"/v3/vms/{index}"] = {"get": {"tags": ["vms"], "summary": f"Get vm {index}"}}
+    for index in range(disks):
+        paths[f"/v3/disks/{index}"] = {"delete": {"summary": f"Delete disk {index}"}}
+    paths["/v3/flavors"] = {"get": {"tags": ["flavors"]}, "post": {"tags": ["flavors"]}}
+    return {"openapi": "3.0.0", "info": {"title": "Compute", "version": "1"}, "paths": paths}
+
+
+VMS_MODULE = '''"""API тесты VMs"""
+import pytest
+import requests
+from helpers import check_status
+
+
+BASE_URL = "https://compute.api.cloud.ru"
+
+
+@pytest.fixture
+def session():
+    return requests.Session()
+
+
+def test_get_vm(session):
+    check_status(session.get(BASE_URL + "/v3/vms/1"), 200)
+'''
+
+DISKS_MODULE = '''import pytest
+import requests
+from helpers import check_json
+
+
+BASE_URL = "https://compute.api.cloud.ru"
+
+
+@pytest.fixture
+def session():
+    return requests.Session()
+
+
+# Повторное имя теста из другой группы
+def test_get_vm(session):
+    check_json(session.get(BASE_URL + "/v3/disks/1"))
+
+
+class TestDisks:
+    def test_delete(self, session):
+        assert session.delete(BASE_URL + "/v3/disks/1").status_code == 204
+'''
+
+
+def test_merge_deduplicates_imports_fixtures_and_constants():
+    merged = merge_test_modules([("vms", VMS_MODULE), ("disks", DISKS_MODULE), ("broken", "def test_x(:\n")])
+
+    head, broken = merged.split("# --- broken")
+    tree = ast.parse(head)
+    names = [node.name for node in tree.body if isinstance(node, (ast.FunctionDef, ast.ClassDef))]
+    assert names == ["session", "test_get_vm", "test_get_vm_2", "TestDisks"]
+    assert head.startswith('"""API тесты VMs"""\n\n\nimport pytest\nimport requests\nfrom helpers import check_status, check_json\n')
+    assert head.count("BASE_URL = ") == 1
+    assert "# Повторное имя теста из другой группы\ndef test_get_vm_2(session):" in head
+    assert "def test_x(:" in broken
+
+
+def test_endpoints_are_grouped_by_tag_and_split():
+    groups = group_endpoints(make_spec(), "tag", max_group_size=8)
+
+    assert [(group["name"], len(group["operations"])) for group in groups] == [
+        ("vms (1/3)", 8), ("vms (2/3)", 8), ("vms (3/3)", 4), ("disks", 3), ("flavors", 2)
+    ]
+    assert groups[3]["operations"][0] == ("/v3/disks/0", "DELETE")
+    assert [group["name"] for group in group_endpoints(make_spec(), "resource", 100)] == ["vms", "disks", "flavors"]
+    assert resource_name("/api/v1.2/{project}/servers/{id}") == "servers"
+    with pytest.raises(ValueError, match="Неизвестный способ группировки"):
+        group_endpoints(make_spec(), "operation")
+
+
+def test_groups_are_generated_concurrently_and_streamed_as_they_finish():
+    state = {"running": 0, "max_running": 0}
+
+    async def generate_group(group_spec):
+        state["running"] += 1
+        state["max_running"] = max(state["max_running"], state["running"])
+        paths = list(group_spec["paths"])
+        # Группа flavors — самая быстрая, disks падает
+        await asyncio.sleep(0.01 if "flavors" in paths[0] else 0.1)
+        state["running"] -= 1
+        if "disks" in paths[0]:
+            raise RuntimeError("LLM недоступна")
+        name = paths[0].split("/")[2]
+        return f"import pytest\n\n\ndef test_{name}():\n    assert {len(paths)}\n"
+
+    async def run():
+        events = iter_fanout_generation(make_spec(), generate_group, max_group_size=8, concurrency=3)
+        return [event async for event in events]
+
+    events = asyncio.run(run())
+
+    assert state["max_running"] == 3
+    # flavors стартует вместе с disks, но завершается раньше и приходит первой
+    assert [e["group"] for e in events[:-1]] == ["vms (1/3)", "vms (2/3)", "vms (3/3)", "flavors", "disks"]
+    assert "error" in events[4] and "code" in events[3]
+    assert events[-1]["done"] and events[-1]["failed"] == ["disks"] and not events[-1]["success"]
+    merged = events[-1]["code"]
+    assert merged.count("import pytest") == 1
+    assert [n.name for n in ast.parse(merged).body if isinstance(n, ast.FunctionDef)] == [
+        "test_vms", "test_vms_2", "test_vms_3", "test_flavors"
+    ]
+
+
+def test_fanout_endpoint_streams_group_events(monkeypatch):
+    import main
+
+    class FakeLLM:
+        async def generate(self, prompt, **kwargs):
+            name = "flavors" if "/v3/flavors" in prompt else "vms"
+            return f"```python\nimport requests\n\n\ndef test_{name}():\n    requests.get('/{name}')\n```"
+
+    class FakeGenerator(main.AutomatedTestGenerator):
+        def __init__(self):
+            self.llm_service = FakeLLM()
+
+    monkeypatch.setattr(main, "automated_test_generator", FakeGenerator())
+
+    async def run():
+        request = main.GenerateAPITestFanoutRequest(openapi_spec=make_spec(vms=2, disks=0), concurrency=4)
+        response = await main.generate_api_test_fanout(request)
+        return [json.loads(line) async for line in response.body_iterator]
+
+    events = asyncio.run(run())
+
+    assert sorted(e["group"] for e in events[:-1]) == ["flavors", "vms"]
+    assert events[-1]["code"] == (
+        "import requests\n\n\n# --- vms ---\ndef test_vms():\n    requests.get('/vms')\n\n\n"
+        "# --- flavors ---\ndef test_flavors():\n    requests.get('/flavors')\n"
+    )
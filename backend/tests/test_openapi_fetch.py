@@ -0,0 +1,132 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from services import spec_cache, spec_fetcher
+from services.openapi_parser import OpenAPIParser
+
+
+ROOT = b"""openapi: 3.0.0
+info: {title: Pets, version: "1"}
+paths:
+  /pets:
+    get:
+      responses:
+        "200":
+          content:
+            application/json:
+              schema: {$ref: "models/pet.yaml#/Pet"}
+components:
+  schemas:
+    Error: {type: object}
+"""
+
+PET = b"""Pet:
+  type: object
+  properties:
+    owner: {$ref: "../common.yaml#/Owner"}
+    error: {$ref: "../openapi.yaml#/components/schemas/Error"}
+    sibling: {$ref: "#/Tag"}
+Tag: {type: string}
+"""
+
+COMMON = b"""Owner: {type: object, properties: {name: {type: string}}}
+"""
+
+DOCUMENTS = {
+    "/api/openapi.yaml": ROOT,
+    "/api/models/pet.yaml": PET,
+    "/api/common.yaml": COMMON,
+}
+
+
+@pytest.fixture
+def transport(monkeypatch):
+    """Подменяет пул загрузки спецификаций клиентом с MockTransport"""
+    monkeypatch.setattr(spec_cache, "_spec_cache", None)
+    requests_seen = []
+    state = {"delay": 0.0}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests_seen.append(request.url.path)
+        await asyncio.sleep(state["delay"])
+        body = DOCUMENTS.get(request.url.path)
+        if body is None:
+            return httpx.Response(404)
+        return httpx.Response(200, content=body, headers={"content-type": "application/yaml"})
+
+    def client():
+        return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    monkeypatch.setattr(spec_fetcher, "get_spec_http_client", client)
+    return requests_seen, state
+
+
+def test_multi_file_spec_is_bundled_with_local_refs(transport):
+    spec = asyncio.run(OpenAPIParser().parse_from_url_async("https://specs.example.com/api/openapi.yaml"))
+
+    pet_url = "https:~1~1specs.example.com~1api~1models~1pet.yaml"
+    common_url = "https:~1~1specs.example.com~1api~1common.yaml"
+    schema = spec["paths"]["/pets"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert schema == {"$ref": f"#/x-external/{pet_url}/Pet"}
+    pet = spec["x-external"]["https://specs.example.com/api/models/pet.yaml"]["Pet"]["properties"]
+    assert pet["owner"] == {"$ref": f"#/x-external/{common_url}/Owner"}
+    assert pet["error"] == {"$ref": "#/components/schemas/Error"}
+    assert pet["sibling"] == {"$ref": f"#/x-external/{pet_url}/Tag"}
+    assert set(spec["x-external"]) == {
+        "https://specs.example.com/api/models/pet.yaml",
+        "https://specs.example.com/api/common.yaml",
+    }
+    # Закэшированная исходная спецификация не изменилась
+    cached = spec_cache.get_spec_cache().get("https://specs.example.com/api/openapi.yaml").spec
+    assert "x-external" not in cached
+
+
+def test_external_refs_to_other_hosts_are_rejected(transport, monkeypatch):
+    monkeypatch.setitem(DOCUMENTS, "/api/models/pet.yaml", b'Pet: {$ref: "https://evil.example.org/x.yaml"}\n')
+
+    with pytest.raises(ValueError, match="недопустимый адрес"):
+        asyncio.run(OpenAPIParser().parse_from_url_async("https://specs.example.com/api/openapi.yaml"))
+
+
+def test_download_is_limited_by_size(transport, monkeypatch):
+    monkeypatch.setenv("OPENAPI_MAX_SPEC_BYTES", "100")
+
+    with pytest.raises(ValueError, match="больше 100 байт"):
+        asyncio.run(OpenAPIParser().parse_from_url_async("https://specs.example.com/api/openapi.yaml"))
+
+
+def test_many_urls_are_fetched_concurrently(transport):
+    requests_seen, state = transport
+    state["delay"] = 0.2
+    urls = [f"https://specs.example.com/api/common.yaml?v={i}" for i in range(5)]
+    urls.append("https://specs.example.com/api/missing.yaml")
+
+    started = time.perf_counter()
+    results = asyncio.run(OpenAPIParser().parse_many_from_urls(urls))
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 0.6
+    assert [r["url"] for r in results] == urls
+    assert all(r["spec"]["Owner"]["type"] == "object" for r in results[:5])
+    assert "не найдена" in results[5]["error"]
+
+
+def test_changed_external_document_changes_spec_id(transport, monkeypatch):
+    import main
+    from services import spec_registry
+
+    monkeypatch.setattr(spec_registry, "_spec_registry", None)
+    request = main.OpenAPIParseRequest(url="https://specs.example.com/api/openapi.yaml")
+    first = asyncio.run(main.parse_openapi(request))
+    assert asyncio.run(main.parse_openapi(request))["spec_id"] == first["spec_id"]
+
+    # Корневой документ тот же, изменился только документ по внешнему $ref
+    monkeypatch.setitem(DOCUMENTS, "/api/common.yaml", COMMON.replace(b"name", b"full_name"))
+    second = asyncio.run(main.parse_openapi(request))
+
+    assert second["spec_id"] != first["spec_id"]
+    owner = spec_registry.get_spec_registry().get(second["spec_id"]).spec["x-external"]
+    assert "full_name" in owner["https://specs.example.com/api/common.yaml"]["Owner"]["properties"]
@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+import pytest
+import yaml
+
+from services import openapi_parser
+from services.openapi_parser import OpenAPIParser
+
+
+SPEC_YAML = """openapi: 3.0.0
+info:
+  title: "Compute: VMs"
+  version: '1'
+paths:
+  /vms/{id}:
+    get:
+      tags: [vms]
+      parameters:
+        - {name: id, in: path, required: true, schema: {type: string}}
+      responses:
+        '200': {description: OK}
+"""
+
+
+@pytest.mark.parametrize("content, expected", [
+    ('  \n\t{"openapi": "3.0.0"}', "json"),
+    ("﻿[1]", "json"),
+    (b'\xef\xbb\xbf\r\n {"a": 1}', "json"),
+    (b"openapi: 3.0.0\n", "yaml"),
+    ("   ", "yaml"),
+])
+def test_detect_format_skips_leading_whitespace(content, expected):
+    assert OpenAPIParser()._detect_format(content) == expected
+
+
+def test_fast_loaders_match_reference_parsers():
+    parser = OpenAPIParser()
+
+    assert parser.parse(SPEC_YAML) == yaml.safe_load(SPEC_YAML)
+    assert parser.parse(SPEC_YAML.encode("utf-8")) == yaml.safe_load(SPEC_YAML)
+    assert parser.parse(b'{"openapi": "3.0.0", "x": [1.5, null]}') == {"openapi": "3.0.0", "x": [1.5, None]}
+
+
+def test_json_falls_back_to_stdlib_for_non_strict_documents():
+    # orjson не принимает NaN, стандартный json — принимает
+    spec = OpenAPIParser().parse('{"x-limit": NaN, "big": 123456789012345678901234567890}')
+
+    assert spec["big"] == 123456789012345678901234567890
+    assert spec["x-limit"] != spec["x-limit"]
+
+
+def test_invalid_json_keeps_detailed_error():
+    with pytest.raises(ValueError, match="Ошибка парсинга JSON") as error:
+        OpenAPIParser().parse(b'{"openapi": ')
+
+    assert 'Первые 100 символов содержимого: {"openapi": ' in str(error.value)
+
+
+def test_parse_async_runs_in_worker_thread(monkeypatch):
+    calls = []
+    original = openapi_parser.load_yaml
+
+    def load_yaml(content):
+        calls.append(threading.get_ident())
+        return original(content)
+
+    monkeypatch.setattr(openapi_parser, "load_yaml", load_yaml)
+
+    spec = asyncio.run(OpenAPIParser().parse_async(SPEC_YAML))
+
+    assert spec["info"]["title"] == "Compute: VMs"
+    assert calls and calls[0] != threading.get_ident()
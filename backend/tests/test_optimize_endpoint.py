@@ -26,3 +26,35 @@ def test_optimize_endpoint(monkeypatch):
     assert res['coverage']['analysis'] == 'ANALYSIS'
     assert 'duplicates' in res
     assert 'improvements' in res
+
+
+class SlowOptimizer:
+    async def analyze_coverage(self, test_cases, requirements):
+        await asyncio.sleep(0.3)
+        return {"analysis": "ANALYSIS", "coverage_percentage": 80, "gaps": []}
+
+    async def find_duplicates(self, test_cases):
+        await asyncio.sleep(0.3)
+        raise Exception("LLM недоступна")
+
+    async def suggest_improvements(self, test_cases, defect_history=""):
+        await asyncio.sleep(5)
+        return {"suggestions": "late"}
+
+
+def test_optimize_runs_parts_concurrently_with_partial_result(monkeypatch):
+    import time
+
+    monkeypatch.setattr('main.test_optimizer', SlowOptimizer())
+
+    req = OptimizeRequest(test_cases=["t1"], requirements="reqs", part_timeout=0.5)
+    started = time.perf_counter()
+    res = asyncio.run(__import__('main').optimize_tests(req))
+
+    assert time.perf_counter() - started < 1.5
+    assert res['success'] is True
+    assert res['partial'] is True
+    assert res['coverage']['analysis'] == 'ANALYSIS'
+    assert res['duplicates'] is None
+    assert res['improvements'] is None
+    assert set(res['errors']) == {'duplicates', 'improvements'}
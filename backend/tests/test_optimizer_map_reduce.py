@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from services.prompt_budget import estimate_tokens, pack_by_budget, truncate_to_budget
+
+
+def make_case(index):
+    return f'def test_case_{index}(page):\n    page.open("/item/{index}")\n    assert page.has_text("item {index}")\n'
+
+
+def partial_analysis(prompt, number):
+    return "ИТОГ" if prompt.startswith("Объедини") else f"ЧАСТИЧНЫЙ АНАЛИЗ {number}"
+
+
+@pytest.fixture
+def optimizer_for(make_optimizer):
+    def make(llm, chunk_tokens):
+        return make_optimizer(llm, chunk_tokens=chunk_tokens, map_concurrency=3)
+    return make
+
+
+def test_pack_by_budget_keeps_order_and_budget():
+    items = ["a" * 30, "b" * 30, "c" * 300, "d" * 30]
+
+    assert pack_by_budget(items, budget_tokens=30) == [[0, 1], [2], [3]]
+    assert truncate_to_budget("x" * 30, 30) == "x" * 30
+    assert estimate_tokens(truncate_to_budget("x" * 3000, 100)) <= 100
+
+
+def test_small_suite_is_analyzed_in_one_request(fake_llm, optimizer_for):
+    llm = fake_llm(reply=partial_analysis, delay=0.01)
+    optimizer = optimizer_for(llm, chunk_tokens=100_000)
+
+    result = asyncio.run(optimizer.suggest_improvements([make_case(i) for i in range(5)]))
+
+    assert result["chunks"] == 1
+    assert len(llm.prompts) == 1
+    assert "[Тест-кейс" not in llm.prompts[0]
+
+
+def test_large_suite_is_fully_analyzed_with_bounded_concurrency(fake_llm, optimizer_for):
+    llm = fake_llm(reply=partial_analysis, delay=0.01)
+    cases = [make_case(i) for i in range(2000)]
+    optimizer = optimizer_for(llm, chunk_tokens=4000)
+
+    result = asyncio.run(optimizer.suggest_improvements(cases))
+
+    map_prompts = [p for p in llm.prompts if not p.startswith("Объедини")]
+    assert result["chunks"] == len(map_prompts) > 1
+    assert result["suggestions"] == "ИТОГ"
+    assert result["failed_chunks"] == []
+    assert llm.max_active <= 3
+    # Каждый тест-кейс попал ровно в одну часть
+    seen = "".join(map_prompts)
+    assert all(f"def test_case_{i}(" in seen for i in range(2000))
+    assert seen.count("def test_case_1999(") == 1
+
+
+def test_failed_chunk_is_reported_and_rest_is_reduced(fake_llm, optimizer_for):
+    llm = fake_llm(reply=partial_analysis, delay=0.01, fail_on="(часть 2 из")
+    optimizer = optimizer_for(llm, chunk_tokens=400)
+
+    result = asyncio.run(optimizer.suggest_improvements([make_case(i) for i in range(30)]))
+
+    assert result["failed_chunks"] == [2]
+    assert result["suggestions"] == "ИТОГ"
+    reduce_prompt = [p for p in llm.prompts if p.startswith("Объедини")][-1]
+    assert "---ЧАСТЬ 2 " not in reduce_prompt
+
+
+def test_failed_reduce_falls_back_to_partial_results(fake_llm, optimizer_for):
+    llm = fake_llm(reply=partial_analysis, fail_on="Объедини")
+    optimizer = optimizer_for(llm, chunk_tokens=400)
+
+    result = asyncio.run(optimizer.suggest_improvements([make_case(i) for i in range(30)]))
+
+    assert result["reduce_failed"] and result["failed_chunks"] == []
+    assert result["suggestions"].startswith("---ЧАСТЬ 1 ")
+    assert result["suggestions"].count("ЧАСТИЧНЫЙ АНАЛИЗ") == result["chunks"]
+
+
+def test_oversized_partials_are_reduced_within_budget(fake_llm, optimizer_for):
+    def verbose(prompt, number):
+        return "ИТОГ " * 300 if prompt.startswith("Объедини") else "АНАЛИЗ " * 600
+
+    llm = fake_llm(reply=verbose)
+    optimizer = optimizer_for(llm, chunk_tokens=1000)
+
+    result = asyncio.run(optimizer.suggest_improvements([make_case(i) for i in range(100)]))
+
+    reduce_prompts = [p for p in llm.prompts if p.startswith("Объедини")]
+    assert len(reduce_prompts) > 1 and not result["reduce_failed"]
+    # Промпт объединения не превышает бюджет (плюс шаблон промпта)
+    assert max(estimate_tokens(p) for p in reduce_prompts) <= 1000 + 150
+    assert result["suggestions"] == "ИТОГ " * 300
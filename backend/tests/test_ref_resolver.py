@@ -0,0 +1,162 @@
+import json
+
+from services import ref_resolver, test_case_generator
+from services.automated_test_generator import AutomatedTestGenerator
+from services.openapi_parser import OpenAPIParser
+from services.ref_resolver import RefResolver, describe_schema, get_ref_resolver
+
+
+def make_spec():
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": "Pets", "version": "1"},
+        "paths": {
+            "/pets/{id}": {
+                "get": {
+                    "summary": "Get pet",
+                    "parameters": [{"$ref": "#/components/parameters/PetId"}],
+                    "responses": {
+                        "200": {"$ref": "#/components/responses/PetResponse"},
+                        "404": {"description": "Not found"},
+                    },
+                },
+                "put": {
+                    "summary": "Update pet",
+                    "requestBody": {"content": {"application/json": {"schema": {"$ref": "#/components/schemas/Pet"}}}},
+                    "responses": {"204": {"description": "Updated"}},
+                },
+            }
+        },
+        "components": {
+            "parameters": {
+                "PetId": {"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}
+            },
+            "responses": {
+                "PetResponse": {
+                    "description": "Pet",
+                    "content": {"application/json": {"schema": {"$ref": "#/components/schemas/Pet"}}},
+                }
+            },
+            "schemas": {
+                "Pet": {
+                    "type": "object",
+                    "required": ["id"],
+                    "properties": {
+                        "id": {"type": "integer", "format": "int64"},
+                        "owner": {"$ref": "#/components/schemas/Owner"},
+                        "parent": {"$ref": "#/components/schemas/Pet"},
+                    },
+                },
+                "Owner": {
+                    "type": "object",
+                    "properties": {"pets": {"type": "array", "items": {"$ref": "#/components/schemas/Pet"}}},
+                },
+                "Alias": {"$ref": "#/components/schemas/Owner"},
+            },
+        },
+    }
+
+
+def test_recursive_schemas_get_cycle_markers():
+    spec = make_spec()
+    resolver = RefResolver(spec)
+
+    pet = resolver.resolve("#/components/schemas/Pet")
+
+    circular = {"$ref": "#/components/schemas/Pet", "x-circular-ref": True}
+    assert pet["properties"]["parent"] == circular
+    assert pet["properties"]["owner"]["properties"]["pets"]["items"] == circular
+    json.dumps(pet)  # конечная структура без циклов
+    assert spec["components"]["schemas"]["Pet"]["properties"]["parent"] == {"$ref": "#/components/schemas/Pet"}
+
+
+def test_each_pointer_is_expanded_once():
+    resolver = RefResolver(make_spec())
+
+    first = resolver.resolve("#/components/schemas/Pet")
+    expansions = resolver.expansions
+    endpoints = [resolver.deref(op) for op in make_spec()["paths"]["/pets/{id}"].values()]
+
+    assert resolver.resolve("#/components/schemas/Pet") is first
+    assert resolver.expansions == expansions + 2  # PetId и PetResponse
+    assert endpoints[1]["requestBody"]["content"]["application/json"]["schema"] is first
+    assert resolver.resolve("#/components/schemas/Alias")["type"] == "object"
+
+
+def test_unresolvable_refs_are_left_as_is():
+    resolver = RefResolver({"a": {"$ref": "#/missing"}, "b": {"$ref": "other.yaml#/X"}})
+
+    assert resolver.deref(resolver.spec) == {"a": {"$ref": "#/missing"}, "b": {"$ref": "other.yaml#/X"}}
+
+
+def test_lazy_view_resolves_only_touched_refs():
+    resolver = RefResolver(make_spec())
+    view = resolver.view()
+
+    response = view["paths"]["/pets/{id}"]["get"]["responses"]["200"]
+    pet = response["content"]["application/json"]["schema"]
+
+    assert response["description"] == "Pet"
+    assert pet.ref == "#/components/schemas/Pet" and not pet.circular
+    assert pet["properties"]["parent"].circular
+    assert set(resolver._targets) == {"#/components/responses/PetResponse", "#/components/schemas/Pet"}
+    assert resolver.expansions == 0
+
+
+def test_describe_schema_marks_recursion():
+    view = RefResolver(make_spec()).view()
+
+    pet = view["paths"]["/pets/{id}"]["put"]["requestBody"]["content"]["application/json"]["schema"]
+
+    assert describe_schema(pet) == (
+        "Pet{id*: integer(int64), owner: Owner{pets: array[Pet (рекурсия)]}, parent: Pet (рекурсия)}"
+    )
+
+
+def test_extract_endpoints_can_resolve_refs():
+    endpoints = OpenAPIParser().extract_endpoints(make_spec(), resolve_refs=True)
+
+    get_pet = endpoints[0]
+    assert get_pet["parameters"] == [{"name": "id", "in": "path", "required": True, "schema": {"type": "integer"}}]
+    assert get_pet["responses"]["200"]["content"]["application/json"]["schema"]["required"] == ["id"]
+    assert OpenAPIParser().extract_endpoints(make_spec())[0]["parameters"] == [{"$ref": "#/components/parameters/PetId"}]
+
+
+def test_resolver_is_shared_per_spec(monkeypatch):
+    monkeypatch.setattr(ref_resolver, "_resolvers", ref_resolver.OrderedDict())
+    monkeypatch.setenv("OPENAPI_RESOLVER_CACHE_SIZE", "1")
+    spec = make_spec()
+
+    resolver = get_ref_resolver(spec)
+    assert get_ref_resolver(spec) is resolver
+    get_ref_resolver(make_spec())
+    assert get_ref_resolver(spec) is not resolver
+
+
+def test_subsets_share_the_parent_resolver_memo(monkeypatch):
+    monkeypatch.setattr(ref_resolver, "_resolvers", ref_resolver.OrderedDict())
+    monkeypatch.setenv("OPENAPI_RESOLVER_CACHE_SIZE", "1")
+    spec = make_spec()
+    parser = OpenAPIParser()
+    resolver = get_ref_resolver(spec)
+    pet = resolver.resolve("#/components/schemas/Pet")
+
+    subsets = [parser.subset_spec(spec, [("/pets/{id}", method)]) for method in ("get", "put")]
+    subset_resolvers = [get_ref_resolver(subset) for subset in subsets]
+
+    assert [item.spec for item in subset_resolvers] == subsets
+    assert all(item.resolve("#/components/schemas/Pet") is pet for item in subset_resolvers)
+    assert get_ref_resolver(spec) is resolver
+    assert len(ref_resolver._resolvers) == 1
+
+
+def test_prompts_include_referenced_schemas():
+    spec = make_spec()
+
+    api_prompt = AutomatedTestGenerator._format_openapi_spec(None, spec)
+    manual_prompt = test_case_generator.TestCaseGenerator._format_openapi_spec(None, spec)
+
+    assert "200: Pet\n      Schema: Pet{id*: integer(int64)" in api_prompt
+    assert "    Schema: Pet{id*: integer(int64)" in api_prompt
+    assert "      - id (path, integer): " in manual_prompt
+    assert "    Тело запроса: Pet{id*: integer(int64)" in manual_prompt
@@ -0,0 +1,210 @@
+import asyncio
+import copy
+import re
+
+import pytest
+
+from services import incremental_generation
+from services.spec_diff import diff_specs, fingerprint_operations
+
+
+def make_spec():
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": "Compute", "version": "1"},
+        "paths": {
+            "/v3/vms": {
+                "get": {"tags": ["vms"], "responses": {"200": {"$ref": "#/components/responses/VmList"}}},
+                "post": {
+                    "tags": ["vms"],
+                    "requestBody": {"content": {"application/json": {"schema": {"$ref": "#/components/schemas/Vm"}}}}
+                }
+            },
+            "/v3/disks/{id}": {
+                "parameters": [{"name": "id", "in": "path", "required": True, "schema": {"type": "string"}}],
+                "get": {"tags": ["disks"], "responses": {"200": {"description": "Диск"}}},
+                "delete": {"tags": ["disks"]}
+            }
+        },
+        "components": {
+            "responses": {
+                "VmList": {
+                    "description": "Список VM",
+                    "content": {"application/json": {"schema": {"type": "array", "items": {"$ref": "#/components/schemas/Vm"}}}}
+                }
+            },
+            "schemas": {
+                "Vm": {"type": "object", "properties": {"flavor": {"$ref": "#/components/schemas/Flavor"}}},
+                "Flavor": {"type": "object", "properties": {"cpu": {"type": "integer"}}}
+            }
+        }
+    }
+
+
+class CountingLLM:
+    """Отвечает тестом на каждую операцию из промпта"""
+
+    def __init__(self):
+        self.prompts = []
+
+    async def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        tests = []
+        for method, path in re.findall(r"^(GET|POST|DELETE) (/\S+)$", prompt, re.MULTILINE):
+            name = f"{method.lower()}_{path.split('/')[2]}"
+            tests.append(f"def test_{name}():\n    requests.get('/{name}')\n")
+        return "```python\nimport requests\n\n\n" + "\n\n".join(tests) + "```"
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    monkeypatch.setenv("GENERATED_TESTS_CACHE_ENABLED", "true")
+    monkeypatch.delenv("GENERATED_TESTS_CACHE_DB_PATH", raising=False)
+    monkeypatch.setattr(incremental_generation, "_generated_tests_cache", None)
+
+
+def test_transitive_schema_change_marks_only_dependent_operations():
+    old = make_spec()
+    new = copy.deepcopy(old)
+    new["components"]["schemas"]["Flavor"]["properties"]["ram"] = {"type": "integer"}
+    new["paths"]["/v3/disks/{id}"]["parameters"][0]["schema"]["format"] = "uuid"
+    del new["paths"]["/v3/disks/{id}"]["delete"]
+    new["paths"]["/v3/flavors"] = {"get": {"tags": ["flavors"]}}
+
+    assert list(fingerprint_operations(old)) == ["GET /v3/vms", "POST /v3/vms", "GET /v3/disks/{id}", "DELETE /v3/disks/{id}"]
+    # Порядок ключей в документе на хэш не влияет
+    reordered = dict(reversed(list(old["components"]["schemas"].items())))
+    assert fingerprint_operations({**old, "components": {**old["components"], "schemas": reordered}}) == fingerprint_operations(old)
+    assert diff_specs(old, new) == {
+        "added": ["GET /v3/flavors"],
+        "changed": ["GET /v3/vms", "POST /v3/vms", "GET /v3/disks/{id}"],
+        "removed": ["DELETE /v3/disks/{id}"],
+        "unchanged": []
+    }
+    assert diff_specs(None, old)["added"] == list(fingerprint_operations(old))
+
+
+def test_prompt_context_and_security_changes_are_detected():
+    old = make_spec()
+    described = copy.deepcopy(old)
+    described["info"]["description"] = "Compute API v2"
+    secured = copy.deepcopy(old)
+    secured["paths"]["/v3/vms"]["post"]["security"] = [{"bearer": []}]
+    schemes = copy.deepcopy(old)
+    schemes["components"]["securitySchemes"] = {"bearer": {"type": "http", "scheme": "bearer"}}
+
+    assert diff_specs(old, described)["changed"] == list(fingerprint_operations(old))
+    assert diff_specs(old, secured)["changed"] == ["POST /v3/vms"]
+    assert diff_specs(old, schemes)["unchanged"] == []
+
+
+def test_only_changed_operations_are_regenerated(fresh_cache, monkeypatch):
+    import main
+
+    llm = CountingLLM()
+
+    class FakeGenerator(main.AutomatedTestGenerator):
+        def __init__(self):
+            self.llm_service = llm
+
+    monkeypatch.setattr(main, "automated_test_generator", FakeGenerator())
+    old = make_spec()
+    new = copy.deepcopy(old)
+    new["paths"]["/v3/disks/{id}"]["get"]["summary"] = "Получить диск"
+    del new["paths"]["/v3/disks/{id}"]["delete"]
+
+    first = asyncio.run(main.generate_api_test_incremental(
+        main.IncrementalAPITestRequest(openapi_spec=old, base_url="https://compute.api.cloud.ru")
+    ))
+    # Первая генерация — по запросу на группу, а не на операцию
+    assert len(llm.prompts) == 2 and first["success"]
+    assert first["diff"]["added"] == first["regenerated"] == list(fingerprint_operations(old))
+    assert [group["name"] for group in first["groups"]] == ["vms", "disks"]
+
+    llm.prompts.clear()
+    second = asyncio.run(main.generate_api_test_incremental(main.IncrementalAPITestRequest(
+        openapi_spec=new, previous_spec=old, base_url="https://compute.api.cloud.ru"
+    )))
+
+    assert len(llm.prompts) == 1 and "GET /v3/disks/{id}" in llm.prompts[0]
+    assert second["diff"] == {
+        "added": [],
+        "changed": ["GET /v3/disks/{id}"],
+        "removed": ["DELETE /v3/disks/{id}"],
+        "unchanged": ["GET /v3/vms", "POST /v3/vms"]
+    }
+    assert second["groups"] == [
+        {"name": "vms", "operations": ["GET /v3/vms", "POST /v3/vms"], "status": "reused"},
+        {"name": "disks", "operations": ["GET /v3/disks/{id}"], "status": "regenerated"}
+    ]
+    assert second["regenerated"] == ["GET /v3/disks/{id}"]
+    assert second["reused"] == ["GET /v3/vms", "POST /v3/vms"]
+    assert second["cache_misses"] == []
+    assert second["code"].count("import requests") == 1
+    assert "def test_get_disks" in second["code"] and "def test_delete_disks" not in second["code"]
+    assert second["code"].index("# --- vms ---") < second["code"].index("# --- disks ---")
+
+    # Без изменений, но другой состав групп: кода в кэше нет, это видно в ответе
+    llm.prompts.clear()
+    third = asyncio.run(main.generate_api_test_incremental(main.IncrementalAPITestRequest(
+        openapi_spec=new, previous_spec=new, base_url="https://compute.api.cloud.ru", max_group_size=1
+    )))
+    assert len(llm.prompts) == 2
+    assert third["regenerated"] == third["cache_misses"] == ["GET /v3/vms", "POST /v3/vms"]
+    assert third["reused"] == ["GET /v3/disks/{id}"]  # та же группа из одной операции
+
+    # Описание API попадает в промпт каждой группы — перегенерируются все
+    llm.prompts.clear()
+    described = copy.deepcopy(new)
+    described["info"]["description"] = "Compute API v2"
+    fourth = asyncio.run(main.generate_api_test_incremental(main.IncrementalAPITestRequest(
+        openapi_spec=described, previous_spec=new, base_url="https://compute.api.cloud.ru"
+    )))
+    assert len(llm.prompts) == 2 and fourth["reused"] == []
+    assert fourth["diff"]["changed"] == fourth["regenerated"] == list(fingerprint_operations(new))
+
+    # Другой base_url — другой ключ кэша
+    llm.prompts.clear()
+    asyncio.run(main.generate_api_test_incremental(main.IncrementalAPITestRequest(openapi_spec=new)))
+    assert len(llm.prompts) == 2
+
+
+def test_previous_spec_id_uses_same_filters_and_failures_are_reported(fresh_cache, monkeypatch):
+    import main
+    from services.spec_registry import get_spec_registry
+
+    class FailingDisksLLM(CountingLLM):
+        async def generate(self, prompt, **kwargs):
+            if "/v3/disks" in prompt:
+                raise RuntimeError("LLM недоступна")
+            return await super().generate(prompt, **kwargs)
+
+    class FakeGenerator(main.AutomatedTestGenerator):
+        def __init__(self):
+            self.llm_service = FailingDisksLLM()
+
+    monkeypatch.setattr(main, "automated_test_generator", FakeGenerator())
+    old = make_spec()
+    new = copy.deepcopy(old)
+    new["components"]["schemas"]["Flavor"]["properties"]["gpu"] = {"type": "boolean"}
+    registry = get_spec_registry()
+    old_id = registry.register(old, "spec-diff-old").spec_id
+    new_id = registry.register(new, "spec-diff-new").spec_id
+
+    result = asyncio.run(main.generate_api_test_incremental(main.IncrementalAPITestRequest(
+        spec_id=new_id, previous_spec_id=old_id, tag="disks"
+    )))
+
+    assert result["diff"]["unchanged"] == ["GET /v3/disks/{id}", "DELETE /v3/disks/{id}"]
+    assert result["diff"]["removed"] == []
+    assert [(item["group"], item["operations"]) for item in result["failed"]] == [
+        ("disks", ["GET /v3/disks/{id}", "DELETE /v3/disks/{id}"])
+    ]
+    assert result["cache_misses"] == [] and result["groups"][0]["status"] == "failed"
+    assert not result["success"] and result["code"] == ""
+
+    with pytest.raises(main.HTTPException) as error:
+        asyncio.run(main.generate_api_test_incremental(main.IncrementalAPITestRequest(
+            spec_id=new_id, previous_spec_id="missing"
+        )))
+    assert error.value.status_code == 404
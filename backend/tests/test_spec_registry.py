@@ -0,0 +1,179 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from services import spec_fetcher, spec_registry
+from services.spec_registry import SpecRegistry
+
+
+def make_spec(paths=30):
+    operations = {}
+    for index in range(paths):
+        group = "vms" if index % 3 else "disks"
+        operations[f"/v1/{group}/{index}"] = {
+            "get": {
+                "operationId": f"get{index}",
+                "summary": f"Get {index}",
+                "tags": [group],
+                "responses": {"200": {"$ref": "#/components/responses/Ok"}},
+            },
+            "delete": {"operationId": f"delete{index}", "tags": [group, "danger"]},
+        }
+    return {
+        "openapi": "3.0.0",
+        "info": {"title": "Compute", "version": "1"},
+        "paths": operations,
+        "components": {"responses": {"Ok": {"description": "OK"}}, "schemas": {"Vm": {"type": "object"}}},
+    }
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(spec_registry, "_spec_registry", None)
+    return spec_registry.get_spec_registry()
+
+
+def test_filters_are_intersected_and_paginated(registry):
+    entry = registry.register(make_spec(), "hash-1")
+
+    page = entry.list_endpoints(tag="vms", method="get", offset=5, limit=3)
+
+    assert page["total"] == 20
+    assert [item["operation_id"] for item in page["items"]] == ["get8", "get10", "get11"]
+    assert set(page["items"][0]) == {"path", "method", "summary", "operation_id", "tags"}
+    assert entry.list_endpoints(path_prefix="/v1/disks/1")["total"] == 6  # 12, 15, 18 × 2 метода
+    assert entry.list_endpoints(operation_id="delete4")["items"][0]["path"] == "/v1/vms/4"
+    assert entry.list_endpoints(tag="danger", path_prefix="/v1/vms")["total"] == 20
+    assert entry.list_endpoints(tag="missing")["total"] == 0
+
+
+def test_field_selection_and_ref_resolution(registry):
+    entry = registry.register(make_spec(), "hash-1")
+
+    raw = entry.list_endpoints(operation_id="get1", fields=["responses"])["items"][0]
+    resolved = entry.list_endpoints(operation_id="get1", fields=["responses"], resolve_refs=True)["items"][0]
+
+    assert raw == {"responses": {"200": {"$ref": "#/components/responses/Ok"}}}
+    assert resolved == {"responses": {"200": {"description": "OK"}}}
+    with pytest.raises(ValueError, match="Неизвестные поля endpoint: spec"):
+        entry.list_endpoints(fields=["path", "spec"])
+
+
+def test_same_content_reuses_index_and_lru_evicts():
+    registry = SpecRegistry(max_entries=2)
+
+    first = registry.register(make_spec(), "a")
+    assert registry.register(make_spec(), "a") is first
+    registry.register(make_spec(), "b")
+    registry.get(first.spec_id)
+    registry.register(make_spec(), "c")
+
+    assert registry.get(first.spec_id) is first
+    assert registry.stats()["reused"] == 1
+    assert registry.stats()["evictions"] == 1
+
+
+def test_parse_endpoint_returns_spec_only_on_request(registry):
+    import main
+
+    content = json.dumps(make_spec(200))
+    response = asyncio.run(main.parse_openapi(main.OpenAPIParseRequest(spec_content=content, endpoints_limit=10)))
+
+    assert "spec" not in response
+    assert response["endpoints_count"] == 400
+    assert len(response["endpoints"]) == 10
+    assert response["tags"] == {"disks": 134, "vms": 266, "danger": 200}
+    assert len(json.dumps(response)) < len(content) / 10
+
+    full = asyncio.run(main.parse_openapi(main.OpenAPIParseRequest(spec_content=content, include_spec=True)))
+    assert full["spec_id"] == response["spec_id"]
+    assert full["spec"]["info"]["title"] == "Compute"
+
+    page = asyncio.run(main.list_spec_endpoints(response["spec_id"], tag="disks", offset=130, limit=10))
+    assert (page["total"], len(page["items"])) == (134, 4)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(main.list_spec_endpoints("unknown"))
+    assert error.value.status_code == 404
+
+
+def test_reparsing_the_same_document_keeps_spec_id(registry, monkeypatch):
+    import main
+
+    monkeypatch.setenv("OPENAPI_CACHE_ENABLED", "false")
+    body = json.dumps(make_spec()).encode()
+    monkeypatch.setattr(
+        spec_fetcher,
+        "get_spec_http_client",
+        lambda: httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, content=body, headers={"content-type": "application/json"})
+        ))
+    )
+    url_request = main.OpenAPIParseRequest(url="https://api.example.com/openapi.json")
+
+    first = asyncio.run(main.parse_openapi(url_request))
+    assert asyncio.run(main.parse_openapi(url_request))["spec_id"] == first["spec_id"]
+
+    content_request = main.OpenAPIParseRequest(spec_content=body.decode())
+    by_content = asyncio.run(main.parse_openapi(content_request))
+    monkeypatch.setattr(main.openapi_parser, "parse_async", lambda *_: pytest.fail("повторный парсинг"))
+    assert asyncio.run(main.parse_openapi(content_request))["spec_id"] == by_content["spec_id"]
+    assert registry.stats()["entries"] == 2
+
+
+class RecordingLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return "```python\ndef test_ok():\n    pass\n```"
+
+
+def test_generation_by_spec_id_uses_filtered_subset(registry, monkeypatch):
+    import main
+
+    llm = RecordingLLM()
+
+    class FakeApiGenerator(main.AutomatedTestGenerator):
+        def __init__(self):
+            self.llm_service = llm
+
+    class FakeCaseGenerator(main.TestCaseGenerator):
+        def __init__(self):
+            self.llm_service = llm
+
+    generator = FakeApiGenerator()
+    formatted = []
+    original = generator._format_openapi_spec
+    monkeypatch.setattr(generator, "_format_openapi_spec", lambda spec: formatted.append(spec) or original(spec))
+    monkeypatch.setattr(main, "automated_test_generator", generator)
+    monkeypatch.setattr(main, "test_case_generator", FakeCaseGenerator())
+    spec_id = registry.register(make_spec(), "hash-1").spec_id
+
+    request = main.GenerateAPITestRequest(spec_id=spec_id, tag="disks", method="delete")
+    for _ in range(2):
+        assert asyncio.run(main.generate_api_test(request))["code"] == "def test_ok():\n    pass"
+
+    assert len(formatted) == 1  # повторная генерация не форматирует спецификацию заново
+    assert sorted(formatted[0]["paths"]) == [f"/v1/disks/{i}" for i in sorted(range(0, 30, 3), key=str)]
+    assert all(list(item) == ["delete"] for item in formatted[0]["paths"].values())
+    assert "DELETE /v1/disks/3" in llm.prompts[0] and "/v1/vms/" not in llm.prompts[0]
+
+    asyncio.run(main.generate_test_case_from_openapi(
+        main.GenerateFromOpenAPIRequest(spec_id=spec_id, operation_id="get4")
+    ))
+    assert "/v1/vms/4:" in llm.prompts[-1] and "/v1/disks/" not in llm.prompts[-1]
+
+    for bad_request, status in (
+        (main.GenerateAPITestRequest(spec_id="unknown"), 404),
+        (main.GenerateAPITestRequest(spec_id=spec_id, tag="missing"), 400),
+        (main.GenerateAPITestRequest(openapi_spec=make_spec(), tag="vms"), 400),
+        (main.GenerateAPITestRequest(), 400),
+    ):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(main.generate_api_test(bad_request))
+        assert error.value.status_code == status
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import re
+
+import pytest
+
+from services.standards_checker import StandardsChecker
+
+
+@pytest.fixture(autouse=True)
+def _no_result_cache(monkeypatch):
+    # Одинаковые кейсы в разных тестах не должны попадать в кэш результатов
+    monkeypatch.setenv("STANDARDS_CACHE_ENABLED", "false")
+
+
+def _checker(llm):
+    checker = StandardsChecker()
+    checker.llm_service = llm
+    return checker
+
+
+def test_check_batch_runs_llm_checks_concurrently_and_keeps_order(fake_llm, good_case, bad_case):
+    llm = fake_llm(delay=0.1)
+    checker = _checker(llm)
+    cases = [good_case, bad_case] * 10
+
+    result = asyncio.run(checker.check_batch(cases, concurrency=5, deep_review=True))
+
+    assert llm.max_active == 5
+    assert result["total_tests"] == 20
+    assert [r["score"] for r in result["results"]] == [100.0, 20.0] * 10
+    assert result["summary"] == {"passed": 10, "needs_improvement": 0, "failed": 10}
+    assert result["results"][0]["quality_analysis"]["is_valid"] is True
+
+
+def test_check_batch_keeps_static_result_when_llm_fails(fake_llm, good_case, bad_case):
+    checker = _checker(fake_llm(fail_on="def helper"))
+
+    result = asyncio.run(checker.check_batch([good_case, bad_case], deep_review=True))
+
+    assert result["results"][1]["quality_analysis"]["error"] == "LLM недоступна"
+    assert result["results"][1]["score"] == 20.0
+    assert "error" not in result["results"][0]["quality_analysis"]
+
+
+def test_check_standards_stream_endpoint(monkeypatch, fake_llm, good_case, bad_case):
+    import main
+
+    monkeypatch.setattr(main, "standards_checker", _checker(fake_llm()))
+
+    async def run():
+        request = main.CheckStandardsRequest(test_cases=[good_case, bad_case, good_case])
+        response = await main.check_standards_stream(request)
+        return [json.loads(line) async for line in response.body_iterator]
+
+    events = asyncio.run(run())
+
+    assert sorted(e["index"] for e in events[:-1]) == [0, 1, 2]
+    assert events[-1] == {
+        "done": True,
+        "total_tests": 3,
+        "average_score": 73.33,
+        "summary": {"passed": 2, "needs_improvement": 0, "failed": 1},
+        "tiers": {"static": 3, "llm": 0},
+        "cached": 0,
+        "success": True
+    }
+
+
+def test_llm_review_runs_only_for_uncertain_scores(fake_llm, good_case, bad_case, uncertain_case):
+    checker = _checker(fake_llm())
+
+    result = asyncio.run(checker.check_batch([good_case, bad_case, uncertain_case]))
+
+    assert [r["score"] for r in result["results"]] == [100.0, 20.0, 86.67]
+    assert [r["tier"] for r in result["results"]] == ["static", "static", "llm"]
+    assert result["results"][0]["quality_analysis"] is None
+    assert result["tiers"] == {"static": 2, "llm": 1}
+
+
+def test_deep_review_and_band_are_configurable(monkeypatch, fake_llm, good_case, uncertain_case):
+    checker = _checker(fake_llm())
+
+    deep = asyncio.run(checker.check_test_case(good_case, deep_review=True))
+    assert deep["tier"] == "llm"
+    assert deep["quality_analysis"]["is_valid"] is True
+
+    monkeypatch.setenv("STANDARDS_UNCERTAIN_MAX", "80")
+    assert asyncio.run(checker.check_test_case(uncertain_case))["tier"] == "static"
+
+    monkeypatch.setenv("STANDARDS_LLM_TIERING", "false")
+    assert asyncio.run(checker.check_test_case(good_case))["tier"] == "llm"
+
+
+class PackingLLM:
+    """Отвечает JSON-вердиктами на упакованные промпты, пропуская кейсы из skip"""
+
+    def __init__(self, skip=()):
+        self.skip = set(skip)
+        self.prompts = []
+
+    async def generate(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        ids = [int(i) for i in re.findall(r"---ТЕСТ-КЕЙС id=(\d+)---", prompt)]
+        if not ids:
+            return "Тест-кейс соответствует стандартам"
+        verdicts = [{"id": i, "is_valid": i % 2 == 0, "analysis": f"вердикт {i}"} for i in ids if i not in self.skip]
+        verdicts.append({"id": 999, "is_valid": True, "analysis": "лишний"})
+        return "Результат:\n```json\n" + json.dumps(verdicts, ensure_ascii=False) + "\n```"
+
+
+def test_packed_review_splits_verdicts_and_falls_back_for_omitted(monkeypatch, uncertain_case):
+    monkeypatch.setenv("STANDARDS_LLM_PACK_MAX_CASES", "10")
+    llm = PackingLLM(skip={3})
+    checker = _checker(llm)
+
+    result = asyncio.run(checker.check_batch([uncertain_case] * 25))
+
+    # 3 упакованных запроса вместо 25 одиночных + 1 одиночный для пропущенного кейса
+    assert len(llm.prompts) == 4
+    quality = [r["quality_analysis"] for r in result["results"]]
+    assert quality[0] == {"analysis": "вердикт 0", "is_valid": True, "packed": True}
+    assert quality[1]["is_valid"] is False
+    assert quality[3] == {"analysis": "Тест-кейс соответствует стандартам", "is_valid": True}
+    assert all(r["tier"] == "llm" for r in result["results"])
+
+
+def test_packing_can_be_disabled(monkeypatch, uncertain_case):
+    monkeypatch.setenv("STANDARDS_LLM_PACK_TOKENS", "0")
+    llm = PackingLLM()
+
+    asyncio.run(_checker(llm).check_batch([uncertain_case] * 4))
+
+    assert len(llm.prompts) == 4
+    assert not any("---ТЕСТ-КЕЙС" in p for p in llm.prompts)
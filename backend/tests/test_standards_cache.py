@@ -0,0 +1,121 @@
+import asyncio
+
+import pytest
+
+from services import standards_cache
+from services.standards_cache import normalize_source
+from services.standards_checker import StandardsChecker
+
+
+# Балл 86.67: без @allure.suite и @pytest.mark.manual — нужна LLM проверка
+UNCERTAIN_CASE = '''import allure
+
+
+@allure.manual
+@allure.label("owner", "QA Team")
+@allure.feature("Auth")
+@allure.story("Login")
+class TestLogin:
+    def test_login(self):
+        """Пользователь входит по логину и паролю"""
+        with allure.step("Arrange: подготовить пользователя"):
+            user = create_user()
+        with allure.step("Act: выполнить вход"):
+            perform_login(user)
+        with allure.step("Assert: проверить вход"):
+            assert is_logged_in(user)
+'''
+
+# Тот же кейс с комментариями и другим форматированием
+REFORMATTED_CASE = "# CI: auth\n" + UNCERTAIN_CASE.replace(
+    "user = create_user()", "user  =  create_user()   # TODO"
+).replace("class TestLogin:", "\n\nclass TestLogin:")
+
+
+class CountingLLM:
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    async def generate(self, prompt, **kwargs):
+        self.calls += 1
+        if self.fail:
+            raise Exception("LLM недоступна")
+        return "Тест-кейс соответствует стандартам"
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    monkeypatch.setenv("STANDARDS_CACHE_ENABLED", "true")
+    monkeypatch.setattr(standards_cache, "_standards_cache", None)
+
+
+def _checker(llm):
+    checker = StandardsChecker()
+    checker.llm_service = llm
+    return checker
+
+
+def test_normalize_source_ignores_comments_and_whitespace():
+    assert normalize_source(REFORMATTED_CASE) == normalize_source(UNCERTAIN_CASE)
+    assert normalize_source("x = '# не комментарий'  # комментарий\n") == "x = '# не комментарий'"
+    assert normalize_source("if a:\n    b()\n") != normalize_source("if a:\nb()\n")
+    # Пробелы внутри строк и докстрингов значимы
+    assert normalize_source('x = "a  b"\n') != normalize_source('x = "a b"\n')
+    docstring = UNCERTAIN_CASE.replace("входит по логину", "входит  по логину")
+    assert normalize_source(docstring) != normalize_source(UNCERTAIN_CASE)
+    assert normalize_source("x = (1 +\n     2)\n") == normalize_source("x = (1 + 2)\n")
+    # Код, который не разбирается на токены, сравнивается как есть
+    assert normalize_source('x = """не закрыта\n') == 'x = """не закрыта\n'
+
+
+def test_unchanged_case_is_served_from_cache(fresh_cache):
+    llm = CountingLLM()
+    checker = _checker(llm)
+
+    first = asyncio.run(checker.check_batch([UNCERTAIN_CASE]))
+    second = asyncio.run(checker.check_batch([REFORMATTED_CASE]))
+    single = asyncio.run(checker.check_test_case(REFORMATTED_CASE))
+
+    assert llm.calls == 1
+    assert first["cached"] == 0 and second["cached"] == 1
+    assert second["results"][0] == {**first["results"][0], "cached": True}
+    assert single["quality_analysis"] == first["results"][0]["quality_analysis"]
+
+
+def test_rule_change_and_deep_review_bypass_stale_entries(fresh_cache):
+    llm = CountingLLM()
+    checker = _checker(llm)
+    good_case = UNCERTAIN_CASE.replace("class TestLogin:", '@allure.suite("UI")\n@pytest.mark.manual\nclass TestLogin:')
+
+    asyncio.run(checker.check_batch([good_case]))
+    assert llm.calls == 0
+
+    # Статический вердикт из кэша не подходит для глубокой проверки
+    deep = asyncio.run(checker.check_test_case(good_case, deep_review=True))
+    assert deep["tier"] == "llm" and deep["cached"] is False
+    assert llm.calls == 1
+
+    checker.required_decorators.append(r'@allure\.tag\(')
+    result = asyncio.run(checker.check_test_case(good_case, deep_review=True))
+    assert result["cached"] is False
+    assert r'@allure\.tag\(' in result["decorators"]["missing"]
+    assert llm.calls == 2
+
+
+def test_llm_errors_are_not_cached_and_results_persist(fresh_cache, tmp_path, monkeypatch):
+    monkeypatch.setenv("STANDARDS_CACHE_DB_PATH", str(tmp_path / "standards.db"))
+
+    failed = asyncio.run(_checker(CountingLLM(fail=True)).check_batch([UNCERTAIN_CASE]))
+    assert failed["results"][0]["quality_analysis"]["error"] == "LLM недоступна"
+
+    asyncio.run(_checker(CountingLLM()).check_batch([UNCERTAIN_CASE]))
+
+    # Новый процесс: память пуста, запись читается из SQLite
+    monkeypatch.setattr(standards_cache, "_standards_cache", None)
+    llm = CountingLLM()
+    result = asyncio.run(_checker(llm).check_test_case(UNCERTAIN_CASE))
+
+    assert llm.calls == 0
+    assert result["cached"] is True
+    assert standards_cache.get_standards_cache().stats()["disk_hits"] == 1
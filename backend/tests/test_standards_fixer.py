@@ -0,0 +1,109 @@
+import ast
+import asyncio
+
+import pytest
+
+from services.standards_checker import StandardsChecker
+from services.standards_fixer import StandardsFixer
+from services.standards_rules import DEFAULT_RULES
+
+
+BARE_CASE = '''"""Тесты входа"""
+
+
+class TestLogin:
+    def test_login(self):
+        """Пользователь входит по логину и паролю"""
+        user = create_user()
+        # Вход через форму
+        token = login(
+            user,
+            note="""многострочная
+строка""",
+        )
+        assert token
+        assert user.logged_in
+'''
+
+
+def test_fix_adds_decorators_imports_and_steps():
+    result = StandardsFixer().fix(BARE_CASE, values={"owner": "Payments QA", "feature": 'Auth "v2"'})
+    fixed = result["fixed_source"]
+
+    ast.parse(fixed)
+    assert result["changed"] is True
+    assert fixed.startswith('"""Тесты входа"""\nimport allure\nimport pytest\n')
+    assert '@allure.label("owner", "Payments QA")\n' in fixed
+    assert '@allure.feature("Auth \\"v2\\"")\n' in fixed
+    assert '@allure.story("TestLogin")\n' in fixed
+    assert '@pytest.mark.manual\nclass TestLogin:' in fixed
+    assert '        with allure.step("Arrange: подготовить данные"):\n            user = create_user()\n' in fixed
+    assert '        # Вход через форму\n        with allure.step("Act: выполнить действие"):\n' in fixed
+    # Содержимое многострочной строки не меняется
+    assert 'note="""многострочная\nстрока""",' in fixed
+    assert '            assert token\n            assert user.logged_in\n' in fixed
+    assert result["diff"].startswith("--- original.py\n+++ fixed.py\n")
+    assert result["score_before"] < result["score_after"] == 100
+
+
+def test_fix_is_idempotent_and_keeps_existing_steps():
+    fixed = StandardsFixer().fix(BARE_CASE)["fixed_source"]
+
+    again = StandardsFixer().fix(fixed)
+
+    assert again["changed"] is False
+    assert again["diff"] == ""
+    assert again["applied"] == []
+
+
+def test_fix_targets_module_functions_and_reports_what_it_skipped():
+    source = "import allure\n\ndef test_a():\n    x = 1; assert x\n\ndef test_b(): pass\n"
+    checker = StandardsChecker()
+    checker.required_decorators = [r'@allure\.manual', r'@allure\.tag\(']
+
+    result = StandardsFixer(checker).fix(source)
+
+    assert result["fixed_source"] == (
+        "import allure\n\n"
+        "@allure.manual\n"
+        "def test_a():\n"
+        '    with allure.step("Act: выполнить действие"):\n'
+        "        x = 1; assert x\n\n"
+        "@allure.manual\n"
+        "def test_b(): pass\n"
+    )
+    assert result["skipped"] == [
+        r"Декоратор @allure\.tag\(: нет шаблона в правилах (fixes.decorators)",
+        "Шаги test_b: тело на одной строке с def"
+    ]
+
+
+def test_fix_leaves_invalid_python_untouched():
+    result = StandardsFixer().fix("def test_x(:\n    pass\n")
+
+    assert result["changed"] is False
+    assert result["fixed_source"] == "def test_x(:\n    pass\n"
+    assert result["skipped"][0].startswith("Синтаксическая ошибка")
+
+
+def test_unknown_template_placeholder_is_rejected_with_400(tmp_path, monkeypatch):
+    import main
+
+    (tmp_path / "billing.yaml").write_text(
+        "fixes:\n  decorators:\n    '@allure\\.feature\\(': '@allure.feature(\"{component}\")'\n",
+        encoding="utf-8"
+    )
+    monkeypatch.setenv("STANDARDS_RULES_DIR", str(tmp_path))
+
+    with pytest.raises(main.HTTPException) as error:
+        asyncio.run(main.fix_standards(main.FixStandardsRequest(test_case=BARE_CASE, team="billing")))
+    assert error.value.status_code == 400
+    assert "неизвестные значения: component" in error.value.detail
+
+    # Значение из запроса закрывает плейсхолдер
+    template = {r'@allure\.feature\(': '@allure.feature("{component}")'}
+    checker = StandardsChecker(rules={**DEFAULT_RULES, "fixes": {"decorators": template}})
+    fixed = StandardsFixer(checker).fix(BARE_CASE, values={"component": "Billing"})["fixed_source"]
+    assert '@allure.feature("Billing")' in fixed
+    with pytest.raises(ValueError):
+        StandardsFixer(checker).fix(BARE_CASE)
@@ -0,0 +1,112 @@
+import asyncio
+import re
+
+import pytest
+
+from services.standards_checker import StandardsChecker
+from services.standards_rules import DEFAULT_RULES, RuleSet, load_team_rules
+
+
+CASE = '''import allure
+import pytest
+
+
+@allure.manual
+@allure.label("owner", "QA Team")
+@allure.feature("Auth")
+class TestLogin:
+    def test_login(self):
+        """Пользователь входит по логину и паролю"""
+        with allure.step("Подготовить пользователя"):
+            user = create_user()
+        with allure.step("Выполнить вход"):
+            perform_login(user)
+        assert user.logged_in
+'''
+
+
+def test_scan_matches_per_rule_search():
+    rule_set = RuleSet()
+    samples = [CASE, CASE.upper(), "def broken(:\n    SHOULD work", "", "contact = 1\n'''doc'''"]
+
+    for source in samples:
+        expected = {f"decorators:{p}" for p in DEFAULT_RULES["decorators"] if re.search(p, source)}
+        for section in ("aaa", "structure", "hints"):
+            for name, rule in DEFAULT_RULES[section].items():
+                pattern, flags = (rule["pattern"], re.I) if isinstance(rule, dict) else (rule, 0)
+                if re.search(pattern, source, flags):
+                    expected.add(f"{section}:{name}")
+        assert rule_set.scan(source) == expected
+
+
+def test_static_check_result_shape():
+    result = StandardsChecker()._static_check(CASE)
+
+    assert result["structure"]["passed"] is True
+    assert result["decorators"]["missing"] == [r'@allure\.story\(', r'@allure\.suite\(', r'@pytest\.mark\.manual']
+    assert result["decorators"]["coverage"] == 50
+    assert result["aaa_pattern"] == {"passed": True, "has_arrange": True, "has_act": True, "has_assert": True}
+    assert result["score"] == 80
+
+
+def test_large_file_uses_text_structure_rules(monkeypatch):
+    monkeypatch.setenv("STANDARDS_AST_MAX_BYTES", "100")
+    checker = StandardsChecker()
+
+    result = checker._check_structure(CASE.replace('"""Пользователь входит по логину и паролю"""', "pass"))
+
+    assert result["missing"] == ["has_description"]
+
+
+def test_rule_set_is_rebuilt_when_decorators_change():
+    checker = StandardsChecker()
+    version = checker.rule_set.version
+
+    checker.required_decorators.append(r'@allure\.tag\(')
+
+    assert checker.rule_set.version != version
+    assert r'@allure\.tag\(' in checker._check_decorators(CASE)["missing"]
+
+
+def test_fixer_settings_do_not_change_rule_version():
+    fixes = {"values": {"owner": "Payments QA"}}
+
+    assert RuleSet({**DEFAULT_RULES, "fixes": fixes}).version == RuleSet(DEFAULT_RULES).version
+    assert RuleSet({**DEFAULT_RULES, "hints": {}}).version != RuleSet(DEFAULT_RULES).version
+
+
+def test_team_rules_override_sections(tmp_path, monkeypatch):
+    (tmp_path / "payments.yaml").write_text(
+        "decorators:\n  - '@allure\\.manual'\n  - '@allure\\.feature\\('\n", encoding="utf-8"
+    )
+    monkeypatch.setenv("STANDARDS_RULES_DIR", str(tmp_path))
+
+    checker = StandardsChecker.for_team("payments")
+
+    assert checker._check_decorators(CASE) == {
+        "passed": True,
+        "found": [r'@allure\.manual', r'@allure\.feature\('],
+        "missing": [],
+        "coverage": 100.0
+    }
+    assert checker.rules_config["aaa"] == DEFAULT_RULES["aaa"]
+    with pytest.raises(ValueError):
+        load_team_rules("../etc/passwd")
+
+
+def test_unknown_team_is_rejected_with_400_everywhere(tmp_path, monkeypatch):
+    import main
+
+    monkeypatch.setenv("STANDARDS_RULES_DIR", str(tmp_path))
+
+    calls = [
+        lambda: main.check_standards(main.CheckStandardsRequest(test_case=CASE, team="missing")),
+        lambda: main.check_standards_stream(main.CheckStandardsRequest(test_case=CASE, team="missing")),
+        lambda: main.check_standards_archive(None, team="missing"),
+        lambda: main.fix_standards(main.FixStandardsRequest(test_case=CASE, team="missing")),
+    ]
+    for call in calls:
+        with pytest.raises(main.HTTPException) as error:
+            asyncio.run(call())
+        assert error.value.status_code == 400
+        assert "Правила команды не найдены: missing" in error.value.detail
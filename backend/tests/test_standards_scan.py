@@ -0,0 +1,132 @@
+import asyncio
+import io
+import json
+import tarfile
+import zipfile
+
+import pytest
+from starlette.requests import Request
+
+from services import standards_scan
+from services.standards_checker import StandardsChecker
+from services.standards_scan import iter_archive_scan
+
+
+@pytest.fixture
+def files(good_case, bad_case):
+    return {
+        "tests/auth/test_login.py": good_case.encode("utf-8"),
+        "tests/auth/test_helper.py": bad_case.encode("utf-8"),
+        "tests/README.md": b"# not a test",
+        "tests/test_cp1251.py": "# кириллица".encode("cp1251"),
+        "tests/test_huge.py": b"x = 1\n" * 200,
+    }
+
+
+def make_tar(files):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+
+def make_zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture(autouse=True)
+def scan_env(monkeypatch):
+    monkeypatch.setenv("STANDARDS_CACHE_ENABLED", "false")
+    monkeypatch.setenv("STANDARDS_ARCHIVE_MAX_FILE_BYTES", "1000")
+    monkeypatch.setenv("STANDARDS_SCAN_CHUNK_FILES", "1")
+    yield
+    standards_scan.shutdown_scan_pool()
+
+
+def _scan(archive, **kwargs):
+    async def run():
+        return [event async for event in iter_archive_scan(StandardsChecker(), archive, **kwargs)]
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("workers, make_archive", [("0", make_tar), ("2", make_zip)])
+def test_archive_scan_matches_check_batch(monkeypatch, workers, make_archive, files, good_case, bad_case):
+    monkeypatch.setenv("STANDARDS_SCAN_WORKERS", workers)
+
+    events = _scan(make_archive(files))
+
+    results = {e["path"]: e["result"] for e in events if "result" in e}
+    skipped = {e["path"]: e["skipped"] for e in events if "skipped" in e}
+    assert skipped == {
+        "tests/test_cp1251.py": "Файл не в кодировке UTF-8",
+        "tests/test_huge.py": "Файл больше 1000 байт",
+    }
+    expected = asyncio.run(StandardsChecker().check_batch([good_case, bad_case]))
+    assert results["tests/auth/test_login.py"] == expected["results"][0]
+    assert results["tests/auth/test_helper.py"] == expected["results"][1]
+    summary = StandardsChecker.summarize(list(results.values()))
+    assert summary == {k: v for k, v in expected.items() if k != "results"}
+
+
+def test_archive_scan_pattern_filters_files(monkeypatch, files):
+    monkeypatch.setenv("STANDARDS_SCAN_WORKERS", "0")
+
+    events = _scan(make_tar(files), pattern="test_login.py")
+
+    assert [e["path"] for e in events] == ["tests/auth/test_login.py"]
+
+
+def _raw_request(body: bytes) -> Request:
+    chunks = [body[i:i + 100] for i in range(0, len(body), 100)] or [b""]
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1}
+        for i, chunk in enumerate(chunks)
+    ]
+
+    async def receive():
+        return messages.pop(0)
+
+    scope = {"type": "http", "method": "POST", "path": "/", "headers": [], "query_string": b""}
+    return Request(scope, receive)
+
+
+def test_archive_endpoint_streams_results_and_summary(monkeypatch, files):
+    import main
+
+    monkeypatch.setenv("STANDARDS_SCAN_WORKERS", "0")
+    body = make_tar(files).getvalue()
+
+    async def run():
+        response = await main.check_standards_archive(_raw_request(body))
+        return [json.loads(line) async for line in response.body_iterator]
+
+    events = asyncio.run(run())
+
+    assert events[-1] == {
+        "done": True,
+        "total_tests": 2,
+        "average_score": 60.0,
+        "summary": {"passed": 1, "needs_improvement": 0, "failed": 1},
+        "tiers": {"static": 2, "llm": 0},
+        "cached": 0,
+        "skipped_files": 2,
+        "success": True
+    }
+
+
+def test_archive_endpoint_rejects_non_archives():
+    import main
+
+    with pytest.raises(main.HTTPException) as error:
+        asyncio.run(main.check_standards_archive(_raw_request(b"plain text, not an archive")))
+
+    assert error.value.status_code == 400
@@ -15,7 +15,9 @@ async function request<T>(path: string, options: RequestInit): Promise<T> {
   });
   if (!resp.ok) {
     const text = await resp.text();
-    throw new Error(text || `Request failed with status ${resp.status}`);
+    const error: any = new Error(text || `Request failed with status ${resp.status}`);
+    error.status = resp.status;
+    throw error;
   }
   return resp.json() as Promise<T>;
 }
@@ -44,8 +46,16 @@ export async function generateUiTests(data: {
   );
 }
 
-export async function generateApiTests(data: {
-  openapi_spec: any;
+export type SpecReference = {
+  spec_id?: string;
+  tag?: string;
+  method?: string;
+  path_prefix?: string;
+  operation_id?: string;
+};
+
+export async function generateApiTests(data: SpecReference & {
+  openapi_spec?: any;
   test_cases?: string;
   base_url?: string;
 }) {
@@ -55,7 +65,43 @@ export async function generateApiTests(data: {
   );
 }
 
-export async function generateTestCaseFromOpenapi(data: {
+// spec_id of specs the backend has already parsed, keyed by spec content:
+// a spec is uploaded once, later generations send only spec_id and filters
+const SPEC_IDS_LIMIT = 8;
+const specIds = new Map<string, string>();
+
+function specContentOf(spec: any): string {
+  return typeof spec === 'string' ? spec : JSON.stringify(spec);
+}
+
+export async function ensureSpecId(spec: any, format: 'json' | 'yaml' | 'auto' = 'auto') {
+  const specContent = specContentOf(spec);
+  const known = specIds.get(specContent);
+  if (known) return known;
+  const parsed = await parseOpenapi({ spec_content: specContent, format, endpoints_limit: 0 });
+  specIds.set(specContent, parsed.spec_id);
+  if (specIds.size > SPEC_IDS_LIMIT) {
+    specIds.delete(specIds.keys().next().value as string);
+  }
+  return parsed.spec_id;
+}
+
+export async function generateApiTestsFromSpec(spec: any, data: Omit<SpecReference, 'spec_id'> & {
+  test_cases?: string;
+  base_url?: string;
+}) {
+  const specId = await ensureSpecId(spec);
+  try {
+    return await generateApiTests({ ...data, spec_id: specId });
+  } catch (err: any) {
+    // The backend registry evicted the spec (or restarted): parse it again once
+    if (err?.status !== 404) throw err;
+    specIds.delete(specContentOf(spec));
+    return generateApiTests({ ...data, spec_id: await ensureSpecId(spec) });
+  }
+}
+
+export async function generateTestCaseFromOpenapi(data: SpecReference & {
   spec_content?: string;
   format?: 'json' | 'yaml' | 'auto';
   url?: string;
@@ -70,16 +116,21 @@ export async function parseOpenapi(data: {
   spec_content?: string;
   format?: 'json' | 'yaml' | 'auto';
   url?: string;
+  include_spec?: boolean;
+  endpoints_limit?: number;
 }) {
   return request<{
     success: boolean;
+    spec_id: string;
     validation: any;
+    title: string;
     endpoints: any[];
     endpoints_count: number;
     schemas: string[];
     schemas_count: number;
     security_schemes: string[];
-    spec: any;
+    tags: Record<string, number>;
+    spec?: any;
   }>(
     `${BACKEND_BASE}/api/v1/parse-openapi`,
     { method: 'POST', body: JSON.stringify(data) }
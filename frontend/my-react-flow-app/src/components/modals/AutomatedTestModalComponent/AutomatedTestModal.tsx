@@ -2,7 +2,7 @@ import React, { useState, useEffect } from 'react';
 import { AutomatedTestNodeData } from '../../../types';
 import { ModalBase } from '../ModalBaseComponent/ModalBase';
 import styles from './styles.module.scss';
-import { generateApiTests, generateUiTests } from '../../../api';
+import { generateApiTestsFromSpec, generateUiTests } from '../../../api';
 
 interface AutomatedTestModalProps {
   isOpen: boolean;
@@ -60,10 +60,13 @@ export const AutomatedTestModal: React.FC<AutomatedTestModalProps> = ({
           requirements,
           framework
         })
-      : generateApiTests({
-          openapi_spec: openapiSpec,
+      : generateApiTestsFromSpec(openapiSpec, {
           test_cases: testCases,
-          base_url: baseUrl
+          base_url: baseUrl,
+          tag: initialData.tag,
+          method: initialData.method,
+          path_prefix: initialData.path_prefix,
+          operation_id: initialData.operation_id
         });
 
     action
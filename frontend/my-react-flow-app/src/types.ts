@@ -57,6 +57,10 @@ export interface AutomatedTestNodeData {
   requirements?: string;
   framework?: string;
   openapi_spec?: any;
+  tag?: string;
+  method?: string;
+  path_prefix?: string;
+  operation_id?: string;
   base_url?: string;
   generated_code?: string;
   [key: string]: any;
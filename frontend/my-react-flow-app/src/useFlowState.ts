@@ -11,7 +11,7 @@ import { CustomNode, CustomEdge, Tab, TestGenerationStatistics, StatisticsUtils
 import { 
   generateManualTest,
   generateUiTests,
-  generateApiTests,
+  generateApiTestsFromSpec,
   optimizeTests,
   checkStandards,
   generateTestCaseFromOpenapi
@@ -1174,10 +1174,13 @@ export const useFlowState = () => {
 
             if (openapiSpec) {
               try {
-                const res = await generateApiTests({
-                  openapi_spec: openapiSpec,
+                const res = await generateApiTestsFromSpec(openapiSpec, {
                   test_cases: node.data?.test_cases,
-                  base_url: node.data?.base_url
+                  base_url: node.data?.base_url,
+                  tag: node.data?.tag,
+                  method: node.data?.method,
+                  path_prefix: node.data?.path_prefix,
+                  operation_id: node.data?.operation_id
                 });
                 result = res?.code || res;
                 // Persist generated code/preview to node
@@ -1212,8 +1215,7 @@ export const useFlowState = () => {
           } else if (node.type === 'api') {
             const specContent = inbound[0]?.fileContent || node.data?.spec_content;
             if (specContent) {
-              result = await generateApiTests({
-                openapi_spec: specContent,
+              result = await generateApiTestsFromSpec(specContent, {
                 test_cases: node.data?.test_cases,
                 base_url: node.data?.url
               });